@@ -4,18 +4,22 @@ Powered by NVIDIA Grace Blackwell GB10
 """
 
 import streamlit as st
-from streamlit_agraph import agraph, Node, Edge, Config
 import time
+import functools
+import statistics
+from collections import deque
+from contextlib import contextmanager
 import backend
-import vision
-import cv2
-import tempfile
-import base64
-from fpdf import FPDF
-import torch
-import subprocess
 import os
+import html
+import uuid
 from homepage import render_homepage
+from roster import Roster
+from static_assets import stylesheet_tag
+from telemetry import TelemetrySampler
+
+# Heavy modules (fpdf, streamlit_agraph, cv2 via scan_jobs/frame_store) are
+# imported at first use so the home page renders without paying for them.
 
 # --- PAGE CONFIG ---
 st.set_page_config(
@@ -26,483 +30,245 @@ st.set_page_config(
 )
 
 # --- COMPREHENSIVE CSS ---
-st.markdown("""
-<style>
-    /* Base Styling */
-    .stApp {
-        background-color: #000000;
-        color: #d0e0d0;
-    }
-    
-    /* Typography */
-    h1 {
-        color: #7fff00; 
-        font-weight: 900; 
-        letter-spacing: -1px;
-        text-shadow: 0 0 15px rgba(127,255,0,0.4);
-        margin-bottom: 5px;
-    }
-    h2 {
-        color: #7fb069; 
-        font-weight: 700;
-        border-bottom: 2px solid #2d5a3d; 
-        padding-bottom: 12px;
-        margin-top: 30px;
-    }
-    h3 {
-        color: #7fb069;
-        font-weight: 600;
-        margin-top: 20px;
-    }
-    
-    /* Sidebar Styling */
-    section[data-testid="stSidebar"] {
-        background-color: #0a0a0a !important;
-        border-right: 1px solid #2d5a3d;
-    }
-    section[data-testid="stSidebar"] h1,
-    section[data-testid="stSidebar"] h2,
-    section[data-testid="stSidebar"] h3 {
-        color: #7fb069 !important;
-    }
-    section[data-testid="stSidebar"] hr {
-        border-color: #2d5a3d;
-        margin: 20px 0;
-    }
-    
-    /* Buttons */
-    .stButton>button {
-        background: linear-gradient(135deg, #4a8a5a 0%, #357045 100%);
-        color: white !important;
-        border: 1px solid #5a9a6a;
-        border-radius: 8px;
-        font-weight: 600;
-        padding: 12px 24px;
-        transition: all 0.3s ease;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-        font-size: 14px;
-    }
-    .stButton>button:hover {
-        background: linear-gradient(135deg, #5a9a6a 0%, #458055 100%);
-        border-color: #6aaa7a;
-        transform: translateY(-2px);
-        box-shadow: 0 6px 20px rgba(74,138,90,0.4);
-    }
-    .stButton>button:disabled {
-        background: rgba(45,90,61,0.3);
-        color: rgba(176,192,176,0.5) !important;
-        border: 1px solid rgba(45,90,61,0.5);
-        cursor: not-allowed;
-        transform: none;
-    }
-    
-    /* Download Button */
-    .stDownloadButton>button {
-        background: linear-gradient(135deg, #3d6a4d 0%, #2d5a3d 100%);
-        color: white !important;
-        border: 1px solid #4a7a5a;
-        border-radius: 6px;
-        font-weight: 600;
-        padding: 10px 20px;
-    }
-    .stDownloadButton>button:hover {
-        background: linear-gradient(135deg, #4d7a5d 0%, #3d6a4d 100%);
-        box-shadow: 0 4px 12px rgba(74,138,90,0.3);
-    }
-    
-    /* Info/Alert Boxes */
-    .stAlert, [data-baseweb="notification"] {
-        background: rgba(26,58,42,0.6) !important;
-        border: 1px solid #2d5a3d !important;
-        border-radius: 8px;
-        color: #b0c0b0 !important;
-    }
-    .stSuccess {
-        background: rgba(74,138,90,0.3) !important;
-        border: 1px solid #4a8a5a !important;
-        color: #7fb069 !important;
-    }
-    .stError {
-        background: rgba(139,0,0,0.3) !important;
-        border: 1px solid #8b0000 !important;
-        color: #ff6b6b !important;
-    }
-    .stWarning {
-        background: rgba(204,85,0,0.3) !important;
-        border: 1px solid #cc5500 !important;
-        color: #ffa500 !important;
-    }
-    
-    /* Metrics */
-    [data-testid="stMetricValue"] {
-        color: #7fb069 !important;
-        font-weight: 700;
-        font-size: 24px;
-    }
-    [data-testid="stMetricLabel"] {
-        color: #90b090 !important;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-        font-size: 12px;
-    }
-    
-    /* Progress Bar */
-    .stProgress > div > div > div {
-        background: linear-gradient(90deg, #357045 0%, #4a8a5a 50%, #5a9a6a 100%) !important;
-    }
-    
-    /* File Uploader */
-    [data-testid="stFileUploader"] {
-        background: rgba(26,58,42,0.4);
-        border: 1px solid #2d5a3d;
-        border-radius: 10px;
-        padding: 20px;
-    }
-    [data-testid="stFileUploader"] label {
-        color: #7fb069 !important;
-        font-weight: 600;
-    }
-    
-    /* Expander */
-    .streamlit-expanderHeader {
-        background: rgba(26,58,42,0.5) !important;
-        border: 1px solid #2d5a3d !important;
-        border-radius: 8px !important;
-        color: #7fb069 !important;
-        font-weight: 600;
-    }
-    .streamlit-expanderHeader:hover {
-        background: rgba(26,58,42,0.7) !important;
-        border-color: #4a7c59 !important;
-    }
-    
-    /* Captions */
-    .stCaption {
-        color: #90b090 !important;
-        font-size: 13px;
-        font-style: italic;
-    }
-    
-    /* JSON Display */
-    .stJson {
-        background: rgba(15,30,15,0.8) !important;
-        border: 1px solid #2d5a3d !important;
-        border-radius: 6px;
-    }
-    
-    /* Custom Components */
-    .section-header {
-        background: linear-gradient(90deg, rgba(74,138,90,0.2) 0%, transparent 100%);
-        padding: 15px 20px;
-        border-left: 4px solid #4a8a5a;
-        border-radius: 4px;
-        margin: 20px 0 15px 0;
-    }
-    .section-header h3 {
-        margin: 0;
-        color: #7fb069;
-        font-size: 18px;
-        font-weight: 700;
-    }
-    
-    .status-card {
-        background: linear-gradient(145deg, #1a3a2a 0%, #0f2419 100%);
-        padding: 20px;
-        border-radius: 10px;
-        border: 1px solid #2d5a3d;
-        margin-bottom: 20px;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.3);
-        transition: all 0.3s ease;
-    }
-    .status-card:hover {
-        border-color: #4a7c59;
-        box-shadow: 0 6px 20px rgba(74,138,90,0.2);
-    }
-    
-    .thinking-box {
-        font-family: 'Courier New', monospace; 
-        font-size: 13px; 
-        color: #a0b0a0;
-        background: linear-gradient(135deg, #0f1f15 0%, #1a2f25 100%); 
-        padding: 20px; 
-        border-radius: 10px;
-        border: 1px solid #2d5a3d;
-        max-height: 300px; 
-        overflow-y: auto;
-        margin-bottom: 20px;
-        box-shadow: inset 0 2px 8px rgba(0,0,0,0.4);
-    }
-    
-    .command-box {
-        font-family: 'Courier New', monospace; 
-        font-size: 14px; 
-        color: #d0e0d0;
-        background: linear-gradient(135deg, #1a3a2a 0%, #0f2419 100%); 
-        padding: 20px; 
-        border-radius: 10px;
-        border: 1px solid #4a8a5a;
-        box-shadow: 0 4px 15px rgba(74,138,90,0.2);
-        margin-bottom: 20px;
-    }
-    
-    .command-label {
-        color: #7fb069; 
-        font-size: 11px; 
-        text-transform: uppercase; 
-        letter-spacing: 2px; 
-        margin-bottom: 10px;
-        font-weight: 700;
-        display: block;
-    }
-    
-    .log-entry {
-        font-family: 'Courier New', monospace; 
-        font-size: 13px;
-        margin-bottom: 8px; 
-        padding: 10px 15px;
-        border-radius: 6px;
-        background: rgba(26,58,42,0.3);
-        border-left: 3px solid #4a7c59;
-        transition: all 0.2s ease;
-    }
-    .log-entry:hover {
-        background: rgba(26,58,42,0.5);
-        border-left-color: #5a9a6a;
-    }
-    
-    /* Container Spacing */
-    .block-container {
-        padding-top: 2rem;
-        padding-bottom: 2rem;
-    }
-    
-    /* Image Styling */
-    img {
-        border-radius: 8px;
-    }
-    
-    /* Scrollbar */
-    ::-webkit-scrollbar {
-        width: 10px;
-        height: 10px;
-    }
-    ::-webkit-scrollbar-track {
-        background: #0f1f15;
-    }
-    ::-webkit-scrollbar-thumb {
-        background: #2d5a3d;
-        border-radius: 5px;
-    }
-    ::-webkit-scrollbar-thumb:hover {
-        background: #4a7c59;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(stylesheet_tag("app.css"), unsafe_allow_html=True)
+
+# --- SHARED RESOURCES ---
+@st.cache_resource
+def get_scan_manager():
+    """Process-wide scan job manager; outlives reruns and browser sessions"""
+    from scan_jobs import ScanJobManager
+    return ScanJobManager()
+
+@st.cache_resource
+def get_report_builder():
+    """Process-wide PDF report renderer; finished reports are cached on disk by state version"""
+    from mission_report import ReportBuilder
+    return ReportBuilder()
+
+@st.cache_resource
+def get_command_log():
+    """Process-wide handle on the persistent (SQLite) command history"""
+    from command_log import CommandLog
+    return CommandLog()
+
+@st.cache_resource
+def get_squad_store():
+    """Process-wide, persistent squad rosters, one per mission"""
+    from squad_store import SquadStore
+    return SquadStore(defaults=backend.SQUADS)
+
+def sync_squads():
+    """Refresh the session's read-only roster copy if the mission's squads changed"""
+    store = get_squad_store()
+    if store.version(st.session_state.mission_id) != st.session_state.squads_version:
+        snapshot = store.snapshot(st.session_state.mission_id)
+        st.session_state.squads = Roster.from_dict(snapshot.squads)
+        st.session_state.squad_versions = snapshot.versions
+        st.session_state.squads_version = snapshot.version
+        # Decisions made for the previous squad state can no longer be replayed
+        backend.decision_cache.invalidate(st.session_state.mission_id, st.session_state.squads)
+
+@st.cache_resource
+def get_telemetry():
+    """Process-wide hardware sampler; reruns read its history instead of polling"""
+    return TelemetrySampler().start()
 
 # --- SESSION STATE INITIALIZATION ---
 if 'page' not in st.session_state: 
     st.session_state.page = "home"
 if 'latest_observation' not in st.session_state: 
     st.session_state.latest_observation = "System Ready. Awaiting visual feed..."
-if 'command_log' not in st.session_state: 
-    st.session_state.command_log = []
+if 'mission_id' not in st.session_state: 
+    # Kept in the URL so a browser refresh stays on the same mission and its command history
+    st.session_state.mission_id = st.query_params.get("mission") or uuid.uuid4().hex[:12]
+    st.query_params["mission"] = st.session_state.mission_id
 if 'hazard_level' not in st.session_state: 
     st.session_state.hazard_level = "UNKNOWN"
-if 'processed_frames' not in st.session_state: 
-    st.session_state.processed_frames = []
+if 'frame_store' not in st.session_state: 
+    st.session_state.frame_store = None   # Created on first dashboard visit
+if 'gallery_selected' not in st.session_state: 
+    st.session_state.gallery_selected = None
+if 'scan_job_id' not in st.session_state: 
+    st.session_state.scan_job_id = None
+    st.session_state.scan_job_applied = None
+    reattached_job = get_scan_manager().get(st.query_params["scan_job"]) if "scan_job" in st.query_params else None
+    if reattached_job is not None:
+        # Browser refresh: pick the scan (and its frames) back up
+        st.session_state.scan_job_id = reattached_job.id
+        st.session_state.frame_store = reattached_job.frame_store
 if 'last_thought' not in st.session_state: 
     st.session_state.last_thought = ""
 if 'last_command' not in st.session_state: 
     st.session_state.last_command = ""
 if 'last_reasoning' not in st.session_state: 
     st.session_state.last_reasoning = ""
+if 'last_prompt_usage' not in st.session_state: 
+    st.session_state.last_prompt_usage = None
+if 'last_decision_cached' not in st.session_state: 
+    st.session_state.last_decision_cached = None
+if 'last_decision_rule' not in st.session_state: 
+    st.session_state.last_decision_rule = None
 if 'last_deployed_squad' not in st.session_state: 
     st.session_state.last_deployed_squad = ""
 if 'squads' not in st.session_state: 
-    st.session_state.squads = backend.SQUADS.copy()
+    # Session copy of the mission's shared roster; refreshed by sync_squads(), never written directly
+    st.session_state.squads = Roster()
+    st.session_state.squad_versions = {}
+    st.session_state.squads_version = None
 if 'scan_completed' not in st.session_state: 
     st.session_state.scan_completed = False
 if 'command_executed' not in st.session_state: 
     st.session_state.command_executed = False
 
 # --- UTILITY FUNCTIONS ---
-def get_gpu_metrics():
-    """Fetch GPU telemetry from system"""
+UI_MAX_HZ = 10   # Upper bound on websocket updates per element during scans and streaming
+GALLERY_PAGE_SIZE = 8   # Thumbnails per Mission Gallery page
+COMMAND_LOG_PAGE_SIZE = 20   # Command Log entries rendered per page
+TELEMETRY_REFRESH_SECONDS = 2.0   # Sidebar telemetry fragment timer; other panels rerun on interaction
+RENDER_TIMING_HISTORY = 50   # Render durations kept per panel for the timings readout
+REPORT_POLL_SECONDS = 1.0   # How often a pending mission report is checked for completion
+SQUAD_SYNC_SECONDS = 2.0   # How often the dashboard checks for squad changes made by other operators
+
+class RenderThrottle:
+    """
+    Coalesce rapid UI updates to at most `max_hz` per element.
+
+    Each call replaces the pending update; it is only sent once the interval
+    has elapsed, and an update identical to the last one sent is dropped.
+    Call flush() when the stream ends so the final state is always shown.
+    """
+    def __init__(self, render, max_hz=UI_MAX_HZ):
+        self.render = render
+        self.interval = 1.0 / max_hz
+        self._last_sent = 0.0
+        self._last_args = None
+        self._pending = None
+    
+    def __call__(self, *args):
+        self._pending = args
+        if time.monotonic() - self._last_sent >= self.interval:
+            self.flush()
+    
+    def flush(self):
+        if self._pending is None:
+            return
+        args, self._pending = self._pending, None
+        if args == self._last_args:
+            return
+        self._last_sent = time.monotonic()
+        self._last_args = args
+        self.render(*args)
+
+@contextmanager
+def record_render_time(name):
+    """Record how long a panel (or the whole page) took to render in this session"""
+    start = time.perf_counter()
     try:
-        free, total = torch.cuda.mem_get_info(0)
-        used_gb = (total - free) / 1024**3
-        total_gb = total / 1024**3
-        mem_str = f"{used_gb:.1f} / {total_gb:.1f} GB"
-        
-        result = subprocess.check_output(
-            ["nvidia-smi", "--query-gpu=utilization.gpu", "--format=csv,noheader,nounits"], 
-            encoding="utf-8"
-        )
-        load_str = f"{result.strip()}%"
-    except:
-        load_str = "N/A"
-        mem_str = "N/A"
+        yield
+    finally:
+        timings = st.session_state.setdefault("render_timings", {})
+        timings.setdefault(name, deque(maxlen=RENDER_TIMING_HISTORY)).append(time.perf_counter() - start)
+
+def timed_panel(name):
+    """Decorator: time every run of a dashboard panel, including fragment-only reruns"""
+    def decorator(render):
+        @functools.wraps(render)
+        def wrapper(*args, **kwargs):
+            with record_render_time(name):
+                return render(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def render_timings_table():
+    """Per-panel rerun latency: run count, last and median milliseconds"""
+    timings = st.session_state.get("render_timings", {})
+    return [
+        {"panel": name, "runs": len(samples), "last ms": round(samples[-1] * 1000, 1),
+         "median ms": round(statistics.median(samples) * 1000, 1)}
+        for name, samples in sorted(timings.items())
+    ]
+
+def get_gpu_metrics():
+    """Latest hardware telemetry from the background sampler (GPU via NVML, else host CPU)"""
+    sampler = get_telemetry()
+    sample = sampler.latest()
+
+    if sampler.has_gpu:
+        load = sample.get("gpu_load")
+        used, total = sample.get("gpu_mem_used"), sample.get("gpu_mem_total")
+        mem_label, load_key = ("Unified Memory" if sample.get("gpu_mem_unified") else "VRAM Usage"), "gpu_load"
+        mem_str = f"{used / 1024**3:.1f} / {total / 1024**3:.1f} GB" if used is not None and total else "N/A"
+    else:
+        load = sample.get("cpu_load")
+        rss = sample.get("rss")
+        mem_label, load_key = "Process RSS", "cpu_load"
+        mem_str = f"{rss / 1024**3:.2f} GB" if rss is not None else "N/A"
 
     return {
-        "load": load_str, 
+        "load": f"{load:.0f}%" if load is not None else "N/A",
+        "load_value": (load or 0.0) / 100,
+        "load_label": "GPU Load" if sampler.has_gpu else "CPU Load",
+        "load_history": sampler.history(load_key),
         "mem": mem_str,
-        "name": torch.cuda.get_device_name(0) if torch.cuda.is_available() else "Simulation Mode"
+        "mem_label": mem_label,
+        "name": sampler.device_name if sampler.has_gpu else "Simulation Mode (CPU)",
     }
 
-def generate_pdf_report():
-    """Generate comprehensive mission PDF report"""
-    class PDF(FPDF):
-        def header(self):
-            self.set_font('Arial', 'B', 16)
-            self.cell(0, 10, 'AeroGuard Mission Report', 0, 1, 'C')
-            self.set_font('Arial', 'I', 10)
-            self.cell(0, 10, f'Generated: {time.strftime("%Y-%m-%d %H:%M:%S")}', 0, 1, 'C')
-            self.ln(5)
-        
-        def footer(self):
-            self.set_y(-15)
-            self.set_font('Arial', 'I', 8)
-            self.cell(0, 10, f'Page {self.page_no()} | CONFIDENTIAL | GB10 Edge Gateway', 0, 0, 'C')
-    
-    pdf = PDF()
-    pdf.add_page()
-    pdf.set_text_color(0, 0, 0)
-    
-    # System Status
-    pdf.set_font('Arial', 'B', 14)
-    pdf.cell(0, 10, '1. SYSTEM STATUS', 0, 1)
-    pdf.set_font('Arial', '', 10)
-    pdf.cell(0, 6, f"Latest Observation:", 0, 1)
-    pdf.multi_cell(0, 6, f"{st.session_state.latest_observation}")
-    pdf.cell(0, 6, f"Hazard Level: {st.session_state.hazard_level}", 0, 1)
-    pdf.ln(5)
-    
-    # Squad Assets
-    pdf.set_font('Arial', 'B', 14)
-    pdf.cell(0, 10, '2. SQUAD DEPLOYMENT STATUS', 0, 1)
-    pdf.set_font('Arial', '', 10)
-    for name, data in st.session_state.squads.items():
-        status_str = f"{name} ({data['type']}): {data['status']} @ {data['loc']}"
-        pdf.cell(0, 6, f"  -- {status_str}", 0, 1)
-    pdf.ln(5)
-    
-    # Command Logs
-    pdf.set_font('Arial', 'B', 14)
-    pdf.cell(0, 10, '3. COMMAND HISTORY', 0, 1)
-    pdf.set_font('Arial', '', 9)
-    for log in reversed(st.session_state.command_log):
-        pdf.multi_cell(0, 5, log)
-        pdf.ln(1)
-    
-    return bytes(pdf.output())
+def request_mission_report():
+    """
+    Look up the PDF report for the current mission state, queueing a background build if needed.
+    
+    Returns:
+        tuple: (version, path of the finished report or None, build error or None)
+    """
+    from command_log import format_entry
+    from mission_report import report_version, sample_frame_ids
+    
+    frame_store = st.session_state.frame_store
+    frame_ids = sample_frame_ids(frame_store.frame_ids()) if frame_store is not None else []
+    command_log = get_command_log()
+    mission_id = st.session_state.mission_id
+    log_version = command_log.version(mission_id)
+    state = {
+        "observation": st.session_state.latest_observation,
+        "hazard_level": st.session_state.hazard_level,
+        "squads": st.session_state.squads.to_dict(),
+        "log_version": log_version,
+        "frame_ids": frame_ids,
+    }
+    version = report_version(**state)
+    builder = get_report_builder()
+    path = builder.get(version)
+    if path is None:
+        # Snapshot so later session changes can't leak into a report being written;
+        # the log is read lazily on the report thread, capped at the versioned entry
+        entries = (format_entry(e) for e in command_log.iter_entries(mission_id, until_id=log_version[1] or 0))
+        state.update(command_log=entries, generated_at=time.time())
+        del state["log_version"]
+        builder.request(version, state, frame_store)
+    return version, path, builder.error(version)
+
+@st.fragment(run_every=REPORT_POLL_SECONDS)
+def render_report_pending(version):
+    """Wait for a background report build, then rerun so the download button picks it up"""
+    builder = get_report_builder()
+    if builder.get(version) is not None or builder.error(version) is not None:
+        st.rerun()
 
 def render_dynamic_map():
-    """Renders tactical map with professional geographic positioning"""
-    import random
+    """Tactical map nodes from the session's cached layout; only changed squads are rebuilt"""
+    from streamlit_agraph import Node, Config
+    from map_layout import TacticalMap
     
-    nodes = []
-    edges = []
+    if 'tactical_map' not in st.session_state:
+        st.session_state.tactical_map = TacticalMap(node_factory=Node)
     
-    active_squad_name = st.session_state.last_deployed_squad
-    
-    # Map dimensions
-    MAP_WIDTH = 1000
-    MAP_HEIGHT = 700
-    
-    def get_position(name, seed_offset=0):
-        """Generate consistent position for each squad"""
-        random.seed(hash(name) + seed_offset)
-        x = random.randint(50, MAP_WIDTH - 50)
-        y = random.randint(50, MAP_HEIGHT - 50)
-        return x, y
-    
-    # 1. HQ/Base
-    base_x, base_y = 150, 150
-    nodes.append(Node(
-        id="Base", 
-        label="HQ", 
-        size=45, 
-        shape="box", 
-        color="#2a5a2a",
-        font={'color': '#ffffff', 'size': 14, 'face': 'arial'},
-        x=base_x,
-        y=base_y,
-        fixed=True
-    ))
-    
-    # 2. Impact Zone
-    impact_x, impact_y = MAP_WIDTH - 200, MAP_HEIGHT - 200
-    t_color = "#8b0000" if "CRITICAL" in st.session_state.hazard_level else "#cc5500" if "MODERATE" in st.session_state.hazard_level else "#555555"
-    t_size = 55 if "CRITICAL" in st.session_state.hazard_level else 45
-    t_label = "IMPACT ZONE\n[CRITICAL]" if "CRITICAL" in st.session_state.hazard_level else "IMPACT ZONE\n[MODERATE]" if "MODERATE" in st.session_state.hazard_level else "IMPACT ZONE"
-    
-    nodes.append(Node(
-        id="ImpactZone", 
-        label=t_label, 
-        size=t_size, 
-        shape="box", 
-        color=t_color,
-        font={'color': '#ffffff', 'size': 13, 'face': 'arial'},
-        x=impact_x,
-        y=impact_y,
-        fixed=True
-    ))
-    
-    # 3. Squad Nodes
-    squad_list = list(st.session_state.squads.items())
-    
-    for idx, (name, data) in enumerate(squad_list):
-        base_x_offset, base_y_offset = get_position(name, seed_offset=0)
-        
-        if "Base" in data['loc']:
-            offset_x = (idx % 3) * 120
-            offset_y = (idx // 3) * 100
-            x = base_x + offset_x - 60
-            y = base_y + offset_y + 80
-        elif "Sector 4" in data['loc'] or "Impact" in data['loc']:
-            angle = (idx * 45) * (3.14159 / 180)
-            radius = 180
-            x = impact_x + int(radius * random.uniform(0.7, 1.0) * random.choice([-1, 1]))
-            y = impact_y + int(radius * random.uniform(0.7, 1.0) * random.choice([-1, 1]))
-        else:
-            x = MAP_WIDTH // 2 + (idx * 80) - 200
-            y = MAP_HEIGHT // 2 + ((idx % 2) * 100) - 50
-        
-        x = max(80, min(MAP_WIDTH - 80, x))
-        y = max(80, min(MAP_HEIGHT - 80, y))
-        
-        if name == active_squad_name:
-            s_color = "#ffa500"
-            s_size = 35
-            border_width = 3
-        elif "Sector 4" in data['loc'] or "Impact" in data['loc']:
-            s_color = "#cc3333"
-            s_size = 28
-            border_width = 2
-        elif "Base" in data['loc']:
-            s_color = "#4a7c59"
-            s_size = 25
-            border_width = 1
-        else:
-            s_color = "#6b8e23"
-            s_size = 25
-            border_width = 1
-        
-        s_label = f"{name}\n[{data['type']}]"
-        
-        nodes.append(Node(
-            id=name, 
-            label=s_label, 
-            size=s_size, 
-            shape="dot", 
-            color=s_color,
-            font={'color': '#ffffff', 'size': 11, 'face': 'arial'},
-            borderWidth=border_width,
-            x=x,
-            y=y,
-            fixed=True
-        ))
+    nodes = st.session_state.tactical_map.build(
+        st.session_state.squads,
+        active_squad=st.session_state.last_deployed_squad,
+        hazard_level=st.session_state.hazard_level
+    )
+    edges = []
     
     config = Config(
         width="100%", 
@@ -516,12 +282,485 @@ def render_dynamic_map():
     
     return nodes, edges, config
 
+SCAN_POLL_SECONDS = 0.5
+
+@st.fragment(run_every=SCAN_POLL_SECONDS)
+@timed_panel("scan")
+def render_scan_job(job_id):
+    """Poll a background scan job and render its progress and latest result"""
+    scan_manager = get_scan_manager()
+    job = scan_manager.get(job_id)
+    if job is None:
+        return
+    snap = job.snapshot()
+    
+    if job.active:
+        st.progress(snap["progress"])
+        st.text(f"Processing frame {snap['position']}/{snap['total_frames']}...")
+        if st.button("■ CANCEL SCAN", key=f"cancel_{job_id}", use_container_width=True):
+            scan_manager.cancel(job_id)
+    
+    # Per-feed status panel for multi-feed scans
+    if len(snap["feeds"]) > 1:
+        st.caption(f"{len(snap['feeds'])} feeds · {snap['frames_per_second']:.1f} frames/s analyzed")
+        for feed in snap["feeds"]:
+            name_col, progress_col, stat_col = st.columns([2, 3, 2])
+            with name_col:
+                st.markdown(f"**{feed['name']}**")
+            with progress_col:
+                st.progress(feed["progress"])
+            with stat_col:
+                st.caption(f"{feed['status'].upper()} · {feed['hazard_level'] or '—'} · {feed['analyzed']} frames")
+    
+    if snap["latest_image"]:
+        st.image(
+            snap["latest_image"], 
+            caption="Real-Time SAM 2 Segmentation", 
+            use_container_width=True
+        )
+    
+    stats = snap["latest_stats"]
+    if stats:
+        hazard = stats['hazard_type'].upper()
+        coverage = stats['coverage_pct']
+        tag_color = "#cc3333" if coverage > 20 else "#4a8a5a"
+        
+        st.markdown(f"""
+        <div style='background: linear-gradient(145deg, #1a3a2a 0%, #0f2419 100%); padding: 20px; border-radius: 10px; border: 1px solid {tag_color}; margin-top: 15px;'>
+            <div style='color: {tag_color}; font-size: 20px; font-weight: 700; margin-bottom: 12px;'>
+                DETECTED: {hazard}
+            </div>
+            <div style='color: #b0c0b0; font-size: 14px; line-height: 1.8;'>
+                <strong>Coverage:</strong> {coverage}% of impact zone<br>
+                <strong>Segments:</strong> {stats['mask_count']} active masks<br>
+                <strong>Confidence:</strong> {stats.get('hazard_confidence', 'N/A')}
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+        worst = max(snap["feeds"], key=lambda f: f["aggregate"]["peak_coverage"])["aggregate"]
+        if worst["frames"]:
+            st.caption(
+                f"Clip so far: {worst['ema_coverage']:.1f}% smoothed · peak {worst['peak_coverage']:.1f}% · "
+                f"{worst['seconds_above']['CRITICAL']:.0f}s of {worst['duration']:.0f}s above critical"
+            )
+    
+    if job.active:
+        return
+    
+    # Finished: copy results into the session once, then rerun the full page
+    if st.session_state.scan_job_applied != job_id:
+        st.session_state.scan_job_applied = job_id
+        if snap["hazard_level"]:
+            st.session_state.hazard_level = snap["hazard_level"]
+            st.session_state.latest_observation = snap["observation"]
+        st.session_state.scan_completed = snap["status"] in ("completed", "failed")
+        st.rerun()
+    
+    if snap["status"] == "completed":
+        st.success(f"✓ {snap['message']} Ready for command execution.")
+    else:
+        st.warning(f"⚠ {snap['message']}")
+        if st.button("↻ RESUME SCAN", key=f"resume_{job_id}", use_container_width=True):
+            scan_manager.resume(job_id)
+            st.session_state.scan_job_applied = None
+            st.session_state.scan_completed = False
+            st.rerun()
+    
+    if job.frame_store.evicted:
+        st.warning(f"⚠ Frame storage budget reached. {job.frame_store.evicted} oldest frames evicted; only recent frames saved.")
+    if job.adaptive and snap["baseline"]:
+        st.caption(f"Adaptive sampling analyzed {snap['analyzed']} frames (fixed 1-in-{job.stride} stride: {snap['baseline']}).")
+    if snap["skipped"]:
+        st.caption(f"Pre-filter skipped {snap['skipped']} unusable frames (dark, blurred or blank).")
+
+# --- DASHBOARD PANELS ---
+@st.fragment(run_every=TELEMETRY_REFRESH_SECONDS)
+@timed_panel("telemetry")
+def render_telemetry_panel():
+    """Sidebar hardware telemetry; refreshes on its own timer"""
+    # Hardware Telemetry
+    st.markdown("<div class='section-header'><h3>Hardware Telemetry</h3></div>", unsafe_allow_html=True)
+    
+    gpu_stats = get_gpu_metrics()
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric(gpu_stats["load_label"], gpu_stats["load"])
+    with col2:
+        st.metric(gpu_stats["mem_label"], gpu_stats["mem"])
+    
+    st.progress(min(max(gpu_stats["load_value"], 0.0), 1.0))
+    if len(gpu_stats["load_history"]) > 1:
+        # Sparkline of the sampler's recent history
+        st.area_chart(gpu_stats["load_history"], height=80, use_container_width=True)
+    st.caption(f"**Device:** {gpu_stats['name']}")
+
+@st.fragment
+@timed_panel("vision")
+def render_vision_panel():
+    """Feed selection, scan control and gallery; widgets here rerun only this panel"""
+    st.markdown("<div class='section-header'><h3>Vision Analysis Pipeline</h3></div>", unsafe_allow_html=True)
+    st.caption("Real-time drone feed processing with SAM 2 + CLIP")
+    
+    uploaded_files = st.file_uploader(
+        "Upload Drone Feed", 
+        type=['mp4', 'mov'],
+        accept_multiple_files=True,
+        help="Upload one or more MP4 or MOV videos from drone reconnaissance; multiple feeds are scanned concurrently"
+    )
+    
+    with st.expander("Additional Feeds (local paths)", expanded=False):
+        feed_paths_text = st.text_area(
+            "Video paths, one per line", 
+            placeholder="/data/feeds/drone_north.mp4",
+            help="Local video files standing in for live drone streams"
+        )
+    local_feed_paths = [line.strip() for line in feed_paths_text.splitlines() if line.strip()]
+    missing_paths = [path for path in local_feed_paths if not os.path.exists(path)]
+    if missing_paths:
+        st.caption(f"⚠ Not found: {', '.join(missing_paths)}")
+    local_feed_paths = [path for path in local_feed_paths if path not in missing_paths]
+    
+    scan_manager = get_scan_manager()
+    
+    has_feeds = bool(uploaded_files) or bool(local_feed_paths)
+    if has_feeds and st.button("▶ START HAZARD SCAN", type="primary", use_container_width=True):
+        # Stop the previous scan before clearing, so none of its frames land in the new gallery
+        if st.session_state.scan_job_id:
+            scan_manager.cancel(st.session_state.scan_job_id, wait=True)
+        st.session_state.frame_store.clear()
+        st.session_state.gallery_selected = None
+        st.session_state.scan_completed = False
+        st.session_state.command_executed = False
+        
+        # Streamed to disk in chunks once per clip; rescans reuse the spooled file
+        from upload_cache import spool_upload
+        in_use = scan_manager.active_paths()   # Other sessions' scans keep their clips
+        feed_paths = [spool_upload(f, in_use=in_use) for f in uploaded_files] + local_feed_paths
+        feed_names = [f.name for f in uploaded_files] + [os.path.basename(path) for path in local_feed_paths]
+        
+        # Runs on a background thread so widget reruns and browser refreshes don't kill it
+        st.session_state.scan_job_id = scan_manager.submit(feed_paths, st.session_state.frame_store, names=feed_names)
+        st.session_state.scan_job_applied = None
+        st.query_params["scan_job"] = st.session_state.scan_job_id
+        # Status cards and the commander panel live outside this fragment
+        st.rerun()
+    
+    if st.session_state.scan_job_id:
+        render_scan_job(st.session_state.scan_job_id)
+    
+    frame_store = st.session_state.frame_store
+    if len(frame_store):
+        with st.expander(f"📂 Mission Gallery ({len(frame_store)} frames)", expanded=False):
+            # Thumbnails only, one page at a time; full-size frames load on demand
+            page_count = (len(frame_store) + GALLERY_PAGE_SIZE - 1) // GALLERY_PAGE_SIZE
+            page = 1
+            if page_count > 1:
+                page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+            
+            cols = st.columns(4)
+            for idx, frame_id in enumerate(frame_store.page(page - 1, GALLERY_PAGE_SIZE)):
+                with cols[idx % 4]: 
+                    st.image(frame_store.thumbnail(frame_id), caption=frame_store.caption(frame_id), use_container_width=True)
+                    if st.button("View", key=f"gallery_view_{frame_id}", use_container_width=True):
+                        st.session_state.gallery_selected = frame_id
+            
+            selected = st.session_state.gallery_selected
+            full_frame = frame_store.read(selected) if selected is not None else None
+            if full_frame:
+                st.image(full_frame, caption=f"{frame_store.caption(selected)} (full size)", use_container_width=True)
+
+@st.fragment
+@timed_panel("commander")
+def render_commander_panel():
+    """Observation, command execution and the last decision"""
+    st.markdown("<div class='section-header'><h3>AI Commander Logic</h3></div>", unsafe_allow_html=True)
+    st.caption("DeepSeek R1 chain-of-thought reasoning engine")
+    
+    st.info(f"**Observation:** {st.session_state.latest_observation}")
+    
+    command_enabled = st.session_state.scan_completed
+    option_cols = st.columns(2)
+    with option_cols[0]:
+        fast_path = st.checkbox("Rules-engine fast path", value=backend.RULES_FAST_PATH,
+                                help="Decide clear-cut cases from the rules of engagement instantly; the LLM confirms in the background")
+    with option_cols[1]:
+        use_cache = st.checkbox("Reuse cached decisions", value=True,
+                                help="Replay the last decision for the same hazard, severity, coverage band and squad states")
+    
+    if st.button(
+        "EXECUTE COMMAND PROTOCOL", 
+        type="primary", 
+        disabled=not command_enabled, 
+        use_container_width=True
+    ):
+        started = time.perf_counter()
+        decision_latency_ms = None
+        
+        think_placeholder = st.empty()
+        cmd_placeholder = st.empty()
+        reasoning_placeholder = st.empty()
+        status_placeholder = st.empty()
+        
+        full_thinking = ""
+        full_command = ""
+        formal_reasoning = ""
+        deployment_info = None  # Change to None instead of {}
+        has_error = False
+        
+        # Token streams arrive far faster than the browser needs; coalesce to UI_MAX_HZ
+        think_throttle = RenderThrottle(lambda text: think_placeholder.markdown(
+            f"<div class='thinking-box'><span class='command-label'>Chain-of-Thought Reasoning:</span>{text}▌</div>", 
+            unsafe_allow_html=True
+        ))
+        cmd_throttle = RenderThrottle(lambda text: cmd_placeholder.markdown(
+            f"<div class='command-box'><span class='command-label'>Structured Response:</span><code style='color: #7fb069; font-size: 12px;'>{text}▌</code></div>", 
+            unsafe_allow_html=True
+        ))
+        
+        mission_id = st.session_state.mission_id
+        squad_versions = dict(st.session_state.squad_versions)
+        command_log = get_command_log()   # Resolved here: on_confirm runs outside the script thread
+        
+        def deploy(squad_name, location):
+            # Compare-and-set against the roster the commander saw; refused if another operator moved the squad
+            return get_squad_store().deploy(mission_id, squad_name, location, expected_version=squad_versions.get(squad_name))
+        
+        def on_confirm(result):
+            # Runs on the confirmer thread: record the LLM's verdict on the rule decision in the command log
+            llm = result["llm_command"]
+            verdict = f"deploy {llm.get('squad_name')} to {llm.get('location')}" if llm.get("action", "").lower() == "deploy" else llm.get("action", "?")
+            command_log.append(
+                mission_id,
+                "confirmed" if result["agree"] else "disputed",
+                squad=result["rule_command"].get("squad_name"),
+                location=result["rule_command"].get("location"),
+                reasoning=f"Rule '{result['rule']}' checked by {result['source']}: {verdict}. {llm.get('reasoning', '')}"
+            )
+        
+        st.session_state.last_decision_cached = None
+        st.session_state.last_decision_rule = None
+        for chunk in backend.stream_commander(st.session_state.latest_observation, st.session_state.squads,
+                                              deploy=deploy, use_cache=use_cache, fast_path=fast_path,
+                                              on_confirm=on_confirm, mission_id=mission_id):
+            if chunk["type"] == "rule":
+                st.session_state.last_decision_rule = chunk
+                st.session_state.last_prompt_usage = None
+                confirming = " · LLM confirming in background" if chunk["confirming"] else ""
+                status_placeholder.info(f"⚡ RULES ENGINE · {chunk['rule']} rule · {chunk['elapsed_us']:.0f} µs{confirming}")
+            
+            elif chunk["type"] == "escalated":
+                status_placeholder.info(f"Escalated to commander LLM: {chunk['content']}")
+            
+            elif chunk["type"] == "cached":
+                st.session_state.last_decision_cached = chunk
+                st.session_state.last_prompt_usage = None
+                status_placeholder.info(f"⚡ CACHED DECISION · same situation decided {chunk['age_s']:.0f}s ago · no LLM call")
+            
+            elif chunk["type"] == "thinking":
+                full_thinking += chunk["content"]
+                think_throttle(full_thinking)
+            
+            elif chunk["type"] == "answer":
+                full_command += chunk["content"]
+                cmd_throttle(full_command)
+            
+            elif chunk["type"] == "reasoning":
+                decision_latency_ms = (time.perf_counter() - started) * 1000
+                # Store deployment info
+                deployment_info = {
+                    "squad": chunk.get("squad", ""),
+                    "location": chunk.get("location", ""),
+                    "action": chunk.get("action", ""),
+                    "applied": chunk.get("applied", True)
+                }
+                formal_reasoning = chunk["content"]
+                
+                # Display reasoning immediately
+                if deployment_info["action"] == "deploy":
+                    reasoning_display = f"""
+                    <div style='background: linear-gradient(145deg, #1a3a2a 0%, #0f2419 100%); padding: 25px; border-radius: 12px; border: 1px solid #4a8a5a; margin: 20px 0;'>
+                        <h3 style='color: #7fb069; margin: 0 0 15px 0; font-size: 18px; font-weight: 700;'>TACTICAL DECISION</h3>
+                        <p style='color: #d0e0d0; font-size: 15px; line-height: 1.8; margin-bottom: 20px;'>{formal_reasoning}</p>
+                        <hr style='border: none; border-top: 1px solid #2d5a3d; margin: 20px 0;'>
+                        <div style='display: grid; grid-template-columns: 1fr 1fr; gap: 15px;'>
+                            <div style='background: rgba(74,138,90,0.2); padding: 15px; border-radius: 8px;'>
+                                <div style='color: #7fb069; font-size: 11px; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 8px;'>Deployed Unit</div>
+                                <div style='color: #ffffff; font-size: 20px; font-weight: 700;'>Squad {deployment_info["squad"]}</div>
+                            </div>
+                            <div style='background: rgba(74,138,90,0.2); padding: 15px; border-radius: 8px;'>
+                                <div style='color: #7fb069; font-size: 11px; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 8px;'>Target Location</div>
+                                <div style='color: #ffffff; font-size: 20px; font-weight: 700;'>{deployment_info["location"]}</div>
+                            </div>
+                        </div>
+                    </div>
+                    """
+                else:
+                    reasoning_display = f"""
+                    <div style='background: linear-gradient(145deg, #2d4a3d 0%, #1a3a2a 100%); padding: 25px; border-radius: 12px; border: 1px solid #5a9a6a; margin: 20px 0;'>
+                        <h3 style='color: #7fb069; margin: 0 0 15px 0; font-size: 18px; font-weight: 700;'>HOLD POSITION</h3>
+                        <p style='color: #d0e0d0; font-size: 15px; line-height: 1.8;'>{formal_reasoning}</p>
+                    </div>
+                    """
+                
+                reasoning_placeholder.markdown(reasoning_display, unsafe_allow_html=True)
+            
+            elif chunk["type"] == "usage":
+                st.session_state.last_prompt_usage = chunk
+            
+            elif chunk["type"] == "error":
+                st.error(f"⚠ Command Protocol Failed: {chunk['content']}")
+                has_error = True
+                break
+            
+            elif chunk["type"] == "status":
+                status_placeholder.success(chunk["content"])
+            
+            elif chunk["type"] == "warning":
+                status_placeholder.warning(chunk["content"])
+        
+        # Always show the final streamed text
+        think_throttle.flush()
+        cmd_throttle.flush()
+        
+        # After streaming completes
+        if not has_error and deployment_info:
+            st.session_state.last_thought = full_thinking
+            st.session_state.last_command = full_command
+            st.session_state.last_reasoning = formal_reasoning
+            if deployment_info["applied"]:
+                st.session_state.last_deployed_squad = deployment_info.get("squad", "")
+            
+            # Persisted, append-only; survives restarts and page refreshes
+            command_log.append(
+                st.session_state.mission_id,
+                deployment_info["action"] if deployment_info["applied"] else "rejected",
+                squad=deployment_info["squad"] or None,
+                location=deployment_info["location"] or None,
+                reasoning=formal_reasoning,
+                latency_ms=decision_latency_ms
+            )
+            st.session_state.command_executed = True
+            st.rerun()
+
+    if not command_enabled:
+        st.caption("⚠ Complete a hazard scan first to enable command execution")
+    
+    # Persistent Display
+    if st.session_state.last_thought:
+        with st.expander("Chain-of-Thought History", expanded=False):
+            st.markdown(f"<div class='thinking-box'>{st.session_state.last_thought}</div>", unsafe_allow_html=True)
+    
+    if st.session_state.last_reasoning:
+        st.markdown(f"""
+        <div style='background: linear-gradient(145deg, #1a3a2a 0%, #0f2419 100%); padding: 20px; border-radius: 10px; border: 1px solid #4a8a5a; margin: 15px 0;'>
+            <h3 style='color: #7fb069; margin: 0 0 12px 0; font-size: 16px;'>LAST COMMAND DECISION</h3>
+            <p style='color: #d0e0d0; font-size: 14px; line-height: 1.7;'>{st.session_state.last_reasoning}</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        with st.expander("View Raw JSON Response", expanded=False):
+            st.code(st.session_state.last_command, language="json")
+        
+        rule = st.session_state.last_decision_rule
+        if rule:
+            st.caption(f"⚡ Rules engine decision ({rule['rule']} rule, {rule['elapsed_us']:.0f} µs); "
+                       "the LLM's verdict is added to the command log")
+        replayed = st.session_state.last_decision_cached
+        if replayed:
+            st.caption(f"⚡ Cached decision, replayed instead of {replayed['saved_s']:.1f}s of LLM reasoning")
+        usage = st.session_state.last_prompt_usage
+        if usage and usage["prompt_tokens"] is not None:
+            cached = f" ({usage['cached_tokens']:,} from prefix cache)" if usage["cached_tokens"] is not None else ""
+            ttft = f" · first token {usage['ttft_ms']:.0f} ms" if usage["ttft_ms"] is not None else ""
+            st.caption(f"Prompt {usage['prompt_tokens']:,} tokens{cached}{ttft}")
+        cache_stats = backend.decision_cache.stats()
+        if cache_stats["hits"] + cache_stats["misses"]:
+            st.caption(f"Decision cache: {cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']} hits "
+                       f"({cache_stats['hit_rate']:.0%}) · {cache_stats['saved_seconds']:.1f}s of reasoning saved · "
+                       f"{cache_stats['entries']} situations cached")
+        rule_stats = backend.rule_confirmer.stats()
+        if rule_stats["agreement_rate"] is not None:
+            st.caption(f"Rules vs LLM: {rule_stats['agreed']} agreed, {rule_stats['disputed']} disputed "
+                       f"({rule_stats['agreement_rate']:.0%} agreement)")
+
+@st.fragment
+@timed_panel("log")
+def render_command_log():
+    """Command history, newest first, one page at a time"""
+    from command_log import format_entry
+    
+    # Command Log
+    st.markdown("<div class='section-header' style='margin-top: 30px;'><h3>Command Log</h3></div>", unsafe_allow_html=True)
+    
+    command_log = get_command_log()
+    total = command_log.count(st.session_state.mission_id)
+    page = 1
+    page_count = (total + COMMAND_LOG_PAGE_SIZE - 1) // COMMAND_LOG_PAGE_SIZE
+    if page_count > 1:
+        page = st.number_input("Log page", min_value=1, max_value=page_count, value=1, step=1, key="command_log_page")
+    
+    log_container = st.container(height=220)
+    with log_container:
+        if total:
+            for entry in command_log.page(st.session_state.mission_id, page - 1, COMMAND_LOG_PAGE_SIZE):
+                color = {"deploy": "#4a8a5a", "disputed": "#ffa500", "rejected": "#cc3333"}.get(entry["action"], "#b0c0b0")
+                latency = f" · {entry['latency_ms'] / 1000:.1f}s" if entry["latency_ms"] is not None else ""
+                st.markdown(
+                    f"<div class='log-entry' style='border-left-color: {color};' title='{html.escape(entry['reasoning'] or '', quote=True)}'>{format_entry(entry)}{latency}</div>", 
+                    unsafe_allow_html=True
+                )
+        else:
+            st.caption("No commands executed yet")
+    if page_count > 1:
+        st.caption(f"{total} commands · page {page} of {page_count}")
+
+@st.fragment
+@timed_panel("map")
+def render_map_panel():
+    """Tactical squad map; map interactions rerun only this panel"""
+    # Map Section
+    st.markdown("<br><br>", unsafe_allow_html=True)
+    st.markdown("<div class='section-header'><h3>Tactical Operations Map</h3></div>", unsafe_allow_html=True)
+    st.caption("Real-time squad positioning and deployment status")
+    
+    # Map with terrain background
+    st.markdown("""
+    <div style='
+        background: linear-gradient(135deg, #1a2f1a 0%, #2d4a2d 50%, #1a2f1a 100%);
+        background-image: 
+            repeating-linear-gradient(0deg, transparent, transparent 50px, rgba(255,255,255,0.02) 50px, rgba(255,255,255,0.02) 51px),
+            repeating-linear-gradient(90deg, transparent, transparent 50px, rgba(255,255,255,0.02) 50px, rgba(255,255,255,0.02) 51px);
+        border-radius: 12px;
+        padding: 25px;
+        border: 1px solid #2d5a3d;
+        margin: 20px 0;
+    '>
+    """, unsafe_allow_html=True)
+    
+    from streamlit_agraph import agraph
+    nodes, edges, config = render_dynamic_map()
+    agraph(nodes=nodes, edges=edges, config=config)
+    
+    st.markdown("</div>", unsafe_allow_html=True)
+
+@st.fragment(run_every=SQUAD_SYNC_SECONDS)
+def render_squad_sync():
+    """Rerun the dashboard when another operator session changes this mission's squads"""
+    if get_squad_store().version(st.session_state.mission_id) != st.session_state.squads_version:
+        st.rerun()
+
 # --- HOME PAGE ---
 def show_home_page():
     render_homepage()
 
 # --- DASHBOARD ---
 def show_dashboard():
+    if st.session_state.frame_store is None:
+        from frame_store import FrameStore
+        st.session_state.frame_store = FrameStore()
+    sync_squads()
+    
     # Sidebar
     with st.sidebar:
         if st.button("← Back to Home", use_container_width=True): 
@@ -530,44 +769,47 @@ def show_dashboard():
         
         st.markdown("---")
         
-        # Hardware Telemetry
-        st.markdown("<div class='section-header'><h3>Hardware Telemetry</h3></div>", unsafe_allow_html=True)
-        
-        gpu_stats = get_gpu_metrics()
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            st.metric("GPU Load", gpu_stats["load"])
-        with col2:
-            st.metric("VRAM Usage", gpu_stats["mem"])
-        
-        try:
-            val = float(gpu_stats["load"].strip('%')) / 100
-        except: 
-            val = 0.0
-        st.progress(val)
-        st.caption(f"**Device:** {gpu_stats['name']}")
+        render_telemetry_panel()
         
         st.markdown("---")
         
         # Mission Controls
         st.markdown("<div class='section-header'><h3>Mission Controls</h3></div>", unsafe_allow_html=True)
         
-        report_pdf = generate_pdf_report()
         download_enabled = st.session_state.command_executed
+        report_path = report_error = None
+        if download_enabled:
+            # Built off the render path; reruns only look up the finished file
+            report_version, report_path, report_error = request_mission_report()
+            if report_path:
+                st.session_state.last_report_path = report_path
+        # While a newer report renders, keep offering the last finished one
+        offered_path = report_path or st.session_state.get("last_report_path")
+        report_pdf = b""
+        if download_enabled and offered_path:
+            try:
+                with open(offered_path, "rb") as f:
+                    report_pdf = f.read()
+            except OSError:
+                offered_path = None
         
         st.download_button(
             "📄 Download Mission Report", 
             report_pdf, 
             f"AeroGuard_Mission_{time.strftime('%Y%m%d_%H%M%S')}.pdf", 
             "application/pdf",
-            disabled=not download_enabled,
+            disabled=not (download_enabled and offered_path),
             help="Execute a command first to enable report download" if not download_enabled else "Download comprehensive mission report",
             use_container_width=True
         )
         
         if not download_enabled:
             st.caption("⚠ Execute a command to enable report download")
+        elif report_error:
+            st.caption(f"⚠ Report generation failed: {report_error}")
+        elif report_path is None:
+            st.caption("Updating mission report..." if offered_path else "Preparing mission report...")
+            render_report_pending(report_version)
         
         st.markdown("---")
         
@@ -575,7 +817,16 @@ def show_dashboard():
         st.markdown("<div class='section-header'><h3>Squad Assets</h3></div>", unsafe_allow_html=True)
         
         with st.expander("View Squad Status", expanded=False):
-            st.json(st.session_state.squads)
+            st.json(st.session_state.squads.to_dict())
+        render_squad_sync()
+        
+        # Fragment panels rerun alone on interaction; "dashboard" is a full script run
+        with st.expander("Render Timings", expanded=False):
+            timings = render_timings_table()
+            if timings:
+                st.dataframe(timings, hide_index=True, use_container_width=True)
+            else:
+                st.caption("No renders recorded yet")
     
     # Main Dashboard
     st.title("AeroGuard Command Center")
@@ -599,11 +850,11 @@ def show_dashboard():
         </div>
         """, unsafe_allow_html=True)
     with col3:
-        active_squads = sum(1 for s in st.session_state.squads.values() if s['status'] != 'Idle')
+        active_squads = st.session_state.squads.active_count
         st.markdown(f"""
         <div class='status-card'>
             <div style='color: #7fb069; font-size: 12px; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 5px;'>Active Squads</div>
-            <div style='color: #7fff00; font-size: 20px; font-weight: 700;'>{active_squads} / 8</div>
+            <div style='color: #7fff00; font-size: 20px; font-weight: 700;'>{active_squads} / {len(st.session_state.squads)}</div>
         </div>
         """, unsafe_allow_html=True)
     
@@ -614,282 +865,15 @@ def show_dashboard():
     
     # LEFT: Vision Analysis
     with row1_col1:
-        st.markdown("<div class='section-header'><h3>Vision Analysis Pipeline</h3></div>", unsafe_allow_html=True)
-        st.caption("Real-time drone feed processing with SAM 2 + CLIP")
-        
-        uploaded_file = st.file_uploader(
-            "Upload Drone Feed", 
-            type=['mp4', 'mov'],
-            help="Upload MP4 or MOV video from drone reconnaissance"
-        )
-        
-        display_slot = st.empty()
-        stats_slot = st.empty()
-        
-        if uploaded_file and st.button("▶ START HAZARD SCAN", type="primary", use_container_width=True):
-            st.session_state.processed_frames = []
-            st.session_state.scan_completed = False
-            st.session_state.command_executed = False
-            
-            MAX_FRAMES_TO_STORE = 50
-            
-            uploaded_file.seek(0) 
-            tfile = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') 
-            tfile.write(uploaded_file.read())
-            video_path = tfile.name
-            tfile.close()
-            
-            try:
-                cap = cv2.VideoCapture(video_path)
-                frame_count = 0
-                SKIP_RATE = 25 
-                error_count = 0
-                MAX_ERRORS = 10
-                
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                
-                while cap.isOpened():
-                    ret, frame = cap.read()
-                    if not ret: break
-                    frame_count += 1
-                    
-                    # Update progress
-                    progress = min(frame_count / total_frames, 1.0)
-                    progress_bar.progress(progress)
-                    status_text.text(f"Processing frame {frame_count}/{total_frames}...")
-                    
-                    if frame_count % SKIP_RATE != 0: continue 
-                    
-                    _, buffer = cv2.imencode('.jpg', frame)
-                    processed_img_bytes, stats = vision.process_frame_realtime(buffer.tobytes())
-                    
-                    if processed_img_bytes and stats:
-                        if len(st.session_state.processed_frames) < MAX_FRAMES_TO_STORE:
-                            st.session_state.processed_frames.append(processed_img_bytes)
-                        
-                        display_slot.image(
-                            processed_img_bytes, 
-                            caption="Real-Time SAM 2 Segmentation", 
-                            use_container_width=True
-                        )
-                        
-                        hazard = stats['hazard_type'].upper()
-                        coverage = stats['coverage_pct']
-                        tag_color = "#cc3333" if coverage > 20 else "#4a8a5a"
-                        
-                        stats_slot.markdown(f"""
-                        <div style='background: linear-gradient(145deg, #1a3a2a 0%, #0f2419 100%); padding: 20px; border-radius: 10px; border: 1px solid {tag_color}; margin-top: 15px;'>
-                            <div style='color: {tag_color}; font-size: 20px; font-weight: 700; margin-bottom: 12px;'>
-                                DETECTED: {hazard}
-                            </div>
-                            <div style='color: #b0c0b0; font-size: 14px; line-height: 1.8;'>
-                                <strong>Coverage:</strong> {coverage}% of impact zone<br>
-                                <strong>Segments:</strong> {stats['mask_count']} active masks<br>
-                                <strong>Confidence:</strong> {stats.get('hazard_confidence', 'N/A')}
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        severity = "CRITICAL" if coverage > 40 else "MODERATE" if coverage > 15 else "MINOR"
-                        st.session_state.hazard_level = severity 
-                        st.session_state.latest_observation = f"Visual Scan: {hazard}. Coverage: {coverage}%. Severity: {severity}. Active Masks: {stats['mask_count']}."
-                    else:
-                        error_count += 1
-                        if error_count >= MAX_ERRORS:
-                            st.warning(f"⚠ Too many frame processing errors ({MAX_ERRORS}). Stopping scan.")
-                            break
-                        continue
-                
-                cap.release()
-                progress_bar.empty()
-                status_text.empty()
-                
-                if len(st.session_state.processed_frames) == MAX_FRAMES_TO_STORE:
-                    st.warning(f"⚠ Frame storage limit reached ({MAX_FRAMES_TO_STORE} frames). Only recent frames saved.")
-                
-                st.session_state.scan_completed = True
-                st.success(f"✓ Scan Complete. Processed {frame_count // SKIP_RATE} frames. Ready for command execution.")
-                
-            finally:
-                if os.path.exists(video_path):
-                    os.unlink(video_path)
-        
-        if st.session_state.processed_frames:
-            with st.expander("📂 Mission Gallery", expanded=False):
-                cols = st.columns(4)
-                for idx, img_bytes in enumerate(st.session_state.processed_frames):
-                    with cols[idx % 4]: 
-                        st.image(img_bytes, caption=f"Frame {idx+1}", use_container_width=True)
+        render_vision_panel()
     
     # RIGHT: AI Commander
     with row1_col2:
-        st.markdown("<div class='section-header'><h3>AI Commander Logic</h3></div>", unsafe_allow_html=True)
-        st.caption("DeepSeek R1 chain-of-thought reasoning engine")
-        
-        st.info(f"**Observation:** {st.session_state.latest_observation}")
-        
-        command_enabled = st.session_state.scan_completed
-        
-        if st.button(
-            "EXECUTE COMMAND PROTOCOL", 
-            type="primary", 
-            disabled=not command_enabled, 
-            use_container_width=True
-        ):
-            timestamp = time.strftime("%H:%M:%S")
-            
-            think_placeholder = st.empty()
-            cmd_placeholder = st.empty()
-            reasoning_placeholder = st.empty()
-            status_placeholder = st.empty()
-            
-            full_thinking = ""
-            full_command = ""
-            formal_reasoning = ""
-            deployment_info = None  # Change to None instead of {}
-            has_error = False
-            
-            for chunk in backend.stream_commander(st.session_state.latest_observation, st.session_state.squads):
-                if chunk["type"] == "thinking":
-                    full_thinking += chunk["content"]
-                    think_placeholder.markdown(
-                        f"<div class='thinking-box'><span class='command-label'>Chain-of-Thought Reasoning:</span>{full_thinking}▌</div>", 
-                        unsafe_allow_html=True
-                    )
-                
-                elif chunk["type"] == "answer":
-                    full_command += chunk["content"]
-                    cmd_placeholder.markdown(
-                        f"<div class='command-box'><span class='command-label'>Structured Response:</span><code style='color: #7fb069; font-size: 12px;'>{full_command}▌</code></div>", 
-                        unsafe_allow_html=True
-                    )
-                
-                elif chunk["type"] == "reasoning":
-                    # Store deployment info
-                    deployment_info = {
-                        "squad": chunk.get("squad", ""),
-                        "location": chunk.get("location", ""),
-                        "action": chunk.get("action", "")
-                    }
-                    formal_reasoning = chunk["content"]
-                    
-                    # Display reasoning immediately
-                    if deployment_info["action"] == "deploy":
-                        reasoning_display = f"""
-                        <div style='background: linear-gradient(145deg, #1a3a2a 0%, #0f2419 100%); padding: 25px; border-radius: 12px; border: 1px solid #4a8a5a; margin: 20px 0;'>
-                            <h3 style='color: #7fb069; margin: 0 0 15px 0; font-size: 18px; font-weight: 700;'>TACTICAL DECISION</h3>
-                            <p style='color: #d0e0d0; font-size: 15px; line-height: 1.8; margin-bottom: 20px;'>{formal_reasoning}</p>
-                            <hr style='border: none; border-top: 1px solid #2d5a3d; margin: 20px 0;'>
-                            <div style='display: grid; grid-template-columns: 1fr 1fr; gap: 15px;'>
-                                <div style='background: rgba(74,138,90,0.2); padding: 15px; border-radius: 8px;'>
-                                    <div style='color: #7fb069; font-size: 11px; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 8px;'>Deployed Unit</div>
-                                    <div style='color: #ffffff; font-size: 20px; font-weight: 700;'>Squad {deployment_info["squad"]}</div>
-                                </div>
-                                <div style='background: rgba(74,138,90,0.2); padding: 15px; border-radius: 8px;'>
-                                    <div style='color: #7fb069; font-size: 11px; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 8px;'>Target Location</div>
-                                    <div style='color: #ffffff; font-size: 20px; font-weight: 700;'>{deployment_info["location"]}</div>
-                                </div>
-                            </div>
-                        </div>
-                        """
-                    else:
-                        reasoning_display = f"""
-                        <div style='background: linear-gradient(145deg, #2d4a3d 0%, #1a3a2a 100%); padding: 25px; border-radius: 12px; border: 1px solid #5a9a6a; margin: 20px 0;'>
-                            <h3 style='color: #7fb069; margin: 0 0 15px 0; font-size: 18px; font-weight: 700;'>HOLD POSITION</h3>
-                            <p style='color: #d0e0d0; font-size: 15px; line-height: 1.8;'>{formal_reasoning}</p>
-                        </div>
-                        """
-                    
-                    reasoning_placeholder.markdown(reasoning_display, unsafe_allow_html=True)
-                
-                elif chunk["type"] == "error":
-                    st.error(f"⚠ Command Protocol Failed: {chunk['content']}")
-                    has_error = True
-                    break
-                
-                elif chunk["type"] == "status":
-                    status_placeholder.success(chunk["content"])
-                
-                elif chunk["type"] == "warning":
-                    status_placeholder.warning(chunk["content"])
-            
-            # After streaming completes
-            if not has_error and deployment_info:
-                st.session_state.last_thought = full_thinking
-                st.session_state.last_command = full_command
-                st.session_state.last_reasoning = formal_reasoning
-                st.session_state.last_deployed_squad = deployment_info.get("squad", "")
-                
-                # Create log entry
-                if deployment_info["action"] == "deploy":
-                    log_entry = f"[{timestamp}] Deployed {deployment_info['squad']} to {deployment_info['location']}"
-                else:
-                    log_entry = f"[{timestamp}] HOLD: All squads maintaining position"
-                
-                st.session_state.command_log.insert(0, log_entry)
-                st.session_state.command_executed = True
-                st.rerun()
-
-        if not command_enabled:
-            st.caption("⚠ Complete a hazard scan first to enable command execution")
-        
-        # Persistent Display
-        if st.session_state.last_thought:
-            with st.expander("Chain-of-Thought History", expanded=False):
-                st.markdown(f"<div class='thinking-box'>{st.session_state.last_thought}</div>", unsafe_allow_html=True)
-        
-        if st.session_state.last_reasoning:
-            st.markdown(f"""
-            <div style='background: linear-gradient(145deg, #1a3a2a 0%, #0f2419 100%); padding: 20px; border-radius: 10px; border: 1px solid #4a8a5a; margin: 15px 0;'>
-                <h3 style='color: #7fb069; margin: 0 0 12px 0; font-size: 16px;'>LAST COMMAND DECISION</h3>
-                <p style='color: #d0e0d0; font-size: 14px; line-height: 1.7;'>{st.session_state.last_reasoning}</p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            with st.expander("View Raw JSON Response", expanded=False):
-                st.code(st.session_state.last_command, language="json")
-        
-        # Command Log
-        st.markdown("<div class='section-header' style='margin-top: 30px;'><h3>Command Log</h3></div>", unsafe_allow_html=True)
+        render_commander_panel()
         
-        log_container = st.container(height=220)
-        with log_container:
-            if st.session_state.command_log:
-                for log_entry in st.session_state.command_log:
-                    color = "#4a8a5a" if "Deployed" in log_entry else "#b0c0b0"
-                    st.markdown(
-                        f"<div class='log-entry' style='border-left-color: {color};'>{log_entry}</div>", 
-                        unsafe_allow_html=True
-                    )
-            else:
-                st.caption("No commands executed yet")
-    
-    # Map Section
-    st.markdown("<br><br>", unsafe_allow_html=True)
-    st.markdown("<div class='section-header'><h3>Tactical Operations Map</h3></div>", unsafe_allow_html=True)
-    st.caption("Real-time squad positioning and deployment status")
+        render_command_log()
     
-    # Map with terrain background
-    st.markdown("""
-    <div style='
-        background: linear-gradient(135deg, #1a2f1a 0%, #2d4a2d 50%, #1a2f1a 100%);
-        background-image: 
-            repeating-linear-gradient(0deg, transparent, transparent 50px, rgba(255,255,255,0.02) 50px, rgba(255,255,255,0.02) 51px),
-            repeating-linear-gradient(90deg, transparent, transparent 50px, rgba(255,255,255,0.02) 50px, rgba(255,255,255,0.02) 51px);
-        border-radius: 12px;
-        padding: 25px;
-        border: 1px solid #2d5a3d;
-        margin: 20px 0;
-    '>
-    """, unsafe_allow_html=True)
-    
-    nodes, edges, config = render_dynamic_map()
-    agraph(nodes=nodes, edges=edges, config=config)
-    
-    st.markdown("</div>", unsafe_allow_html=True)
+    render_map_panel()
     
     # Squad Capabilities
     st.markdown("""
@@ -939,4 +923,5 @@ def show_dashboard():
 if st.session_state.page == "home":
     show_home_page()
 else:
-    show_dashboard()
\ No newline at end of file
+    with record_render_time("dashboard"):
+        show_dashboard()
\ No newline at end of file
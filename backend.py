@@ -1,15 +1,32 @@
 import os
 import json
-from openai import OpenAI
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from commander_prompt import build_messages
+from roster import Roster
+
+log = logging.getLogger(__name__)
 
 # --- CONFIGURATION ---
 # Point to the local vLLM server
 VLLM_API_URL = "http://localhost:8000/v1"
 MODEL_NAME = "deepseek-reasoner"
 API_KEY = "EMPTY" 
+IMPACT_SECTOR = 4   # "Sector 4" is the impact zone: where the rules engine deploys and the map draws the impact site
+
+_client = None
 
-# Initialize OpenAI Client pointing to local vLLM
-client = OpenAI(base_url=VLLM_API_URL, api_key=API_KEY)
+def get_client():
+    """OpenAI client pointing to local vLLM, created (and the SDK imported) on first command"""
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI(base_url=VLLM_API_URL, api_key=API_KEY)
+    return _client
 
 # --- EXPANDED SQUAD ROSTER ---
 SQUADS = {
@@ -23,76 +40,233 @@ SQUADS = {
     "Hotel": {"status": "Busy", "type": "Firefighting", "loc": "Sector 3", "capacity": 10, "equipment": ["Hose", "Extinguisher"]}
 }
 
+# Optional roster file in the same layout (e.g. a full deployment of hundreds of units)
+ROSTER_FILE = os.environ.get("AEROGUARD_ROSTER")
+if ROSTER_FILE:
+    SQUADS = Roster.load(ROSTER_FILE).to_dict()
+
 # --- COMMANDER PERSONALITY & LOGIC ---
-SYSTEM_PROMPT = """
-You are AeroGuard Commander, an autonomous AI responsible for disaster response logistics.
-Your goal is to analyze visual hazard reports and deploy the *most specialized* available squad.
-
-CURRENT ASSETS & SPECIALTIES:
-- Alpha (Ground): General infantry, light medical. Good for clearing roads.
-- Bravo (Aerial): Fast recon drone swarm. Best for assessing large fires or floods from above.
-- Charlie (Medical): *CURRENTLY BUSY at Sector 9*. Specialized in triage.
-- Delta (Engineering): Bridge repair, power generation, rubble clearing.
-- Echo (Rescue): Swift water rescue, high-angle rescue. Carries Lifeboats. BEST FOR FLOODS.
-- Foxtrot (Logistics): Heavy transport (fuel/food).
-- Golf (Recon): Light scouts.
-- Hotel (Firefighting): *CURRENTLY BUSY at Sector 3*. Specialized in fire suppression.
-
-RULES OF ENGAGEMENT:
-1. **Analyze the Hazard:**
-   - If FLOOD detected -> Deploy **Echo** (Lifeboats) or **Bravo** (Aerial view).
-   - If FIRE detected -> Deploy **Hotel** (if free) or **Bravo** (Aerial).
-   - If RUBBLE/BLOCKED ROAD -> Deploy **Delta** (Engineering) to clear it.
-   - If ROAD CLEAR -> Deploy **Alpha** or **Foxtrot** to secure the route.
-
-2. **Check Status:**
-   - Do NOT redeploy squads marked "Busy" unless the new threat is Catastrophic (Severity: CRITICAL).
-   - Prioritize "Idle" squads.
-
-3. **Output Format (STRICT - MUST BE VALID JSON):**
-   You must respond with ONLY a valid JSON object in this exact format:
-   
-   {
-     "reasoning": "Detailed explanation of your decision including: hazard analysis, squad capabilities assessment, and why this squad is optimal",
-     "squad_name": "SquadName",
-     "location": "Sector X",
-     "action": "deploy"
-   }
-   
-   OR if no deployment is needed:
-   
-   {
-     "reasoning": "Explanation of why no deployment is necessary",
-     "action": "hold"
-   }
-   
-   CRITICAL RULES:
-   - Your final output MUST be valid JSON only - no additional text before or after
-   - squad_name must be one of: Alpha, Bravo, Charlie, Delta, Echo, Foxtrot, Golf, Hotel
-   - action must be either "deploy" or "hold"
-   - reasoning should be 2-3 sentences explaining your tactical decision
-   
-   Examples:
-   
-   {
-     "reasoning": "Flood detected with 45% coverage indicates CRITICAL severity. Echo squad has specialized swift water rescue equipment including lifeboats, making them optimal for water-based emergencies. They are currently Idle at Base.",
-     "squad_name": "Echo",
-     "location": "Sector 4",
-     "action": "deploy"
-   }
-   
-   {
-     "reasoning": "Clear road detected with minimal hazards. No immediate deployment required as the sector is secure.",
-     "action": "hold"
-   }
-"""
+# The static, prefix-cached system prompt and the live roster/observation layout: see commander_prompt.py
+
+# --- DECISION CACHE ---
+DECISION_CACHE_TTL = float(os.environ.get("AEROGUARD_DECISION_TTL", "300"))   # Seconds a decision stays reusable
+DECISION_CACHE_SIZE = 256
+COVERAGE_BUCKET_PCT = 10    # Coverage readings within the same 10% band count as the same situation
+
+_OBSERVATION_RE = re.compile(
+    r"Visual Scan:\s*(?P<hazard>[^.]+)\.\s*Coverage:\s*(?P<coverage>[\d.]+)%\.\s*Severity:\s*(?P<severity>\w+)",
+    re.IGNORECASE,
+)
+
+CachedDecision = namedtuple("CachedDecision", ["thinking", "answer", "command", "latency_s", "created_at"])
+
+
+def parse_observation(observation_text):
+    """
+    Structured fields of a scan observation (see HazardAggregator.observation).
+
+    Returns:
+        dict: hazard (upper case), coverage (float %), severity; None for free-form text
+    """
+    match = _OBSERVATION_RE.search(observation_text or "")
+    if not match:
+        return None
+    return {
+        "hazard": match.group("hazard").strip().upper(),
+        "coverage": float(match.group("coverage")),
+        "severity": match.group("severity").upper(),
+    }
+
+
+def situation_fingerprint(observation_text, squads_dict, mission_id=None):
+    """
+    Normalized key of a commander situation.
+
+    Mission, hazard type, severity, coverage bucket and every squad's (status,
+    location): readings that differ only in detail (peak, trend, mask count)
+    share a key, and any squad state change produces a new one. Missions never
+    share decisions, even when their rosters happen to match.
+    """
+    observation = parse_observation(observation_text)
+    if observation is not None:
+        situation = (observation["hazard"], observation["severity"], int(observation["coverage"] // COVERAGE_BUCKET_PCT))
+    else:
+        situation = (" ".join((observation_text or "").lower().split()),)
+    squads = tuple(sorted((name, data["status"], data.get("loc", "")) for name, data in squads_dict.items()))
+    return mission_id, situation, squads
+
+
+class DecisionCache:
+    """
+    Recent commander decisions by situation fingerprint; shared by all sessions.
+
+    Entries expire after `ttl` seconds. Because the fingerprint includes the
+    squad status vector, a state change makes older entries unreachable; the
+    dashboard calls invalidate() whenever a mission's SquadStore version moves,
+    so they are dropped then rather than left to age out.
+    """
+
+    def __init__(self, ttl=DECISION_CACHE_TTL, max_entries=DECISION_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.saved_seconds = 0.0    # LLM time the hits would have cost
+
+    def get(self, fingerprint):
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None and time.time() - entry.created_at > self.ttl:
+                del self._entries[fingerprint]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(fingerprint)
+            self.hits += 1
+            self.saved_seconds += entry.latency_s
+            return entry
+
+    def peek(self, fingerprint):
+        """Like get(), but leaves the counters and LRU order alone (for checks that serve no request)."""
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None or time.time() - entry.created_at > self.ttl:
+                return None
+            return entry
+
+    def put(self, fingerprint, thinking, answer, command, latency_s):
+        with self._lock:
+            self._entries[fingerprint] = CachedDecision(thinking, answer, command, latency_s, time.time())
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, mission_id=None, squads_dict=None):
+        """
+        Drop decisions that no longer apply.
+
+        Args:
+            mission_id: Only touch this mission's entries (None: every mission)
+            squads_dict: Current roster; entries made for any other squad state are
+                dropped (None: drop all of the mission's entries)
+
+        Returns:
+            int: Entries dropped
+        """
+        current = None if squads_dict is None else situation_fingerprint("", squads_dict)[2]
+        with self._lock:
+            stale = [f for f in self._entries
+                     if (mission_id is None or f[0] == mission_id) and (current is None or f[2] != current)]
+            for fingerprint in stale:
+                del self._entries[fingerprint]
+            return len(stale)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "entries": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_seconds": self.saved_seconds,
+            }
+
+
+decision_cache = DecisionCache()
+
+# --- RULES ENGINE (FAST PATH) ---
+RULES_FAST_PATH = os.environ.get("AEROGUARD_RULES_FAST_PATH", "1") != "0"   # Decide clear-cut cases without the LLM
+RULES_CONFIRM = os.environ.get("AEROGUARD_RULES_CONFIRM", "1") != "0"       # Have the LLM check rule decisions afterwards
+RULE_TARGET = f"Sector {IMPACT_SECTOR}"
+CONFIRM_HISTORY = 50
+SEVERITY_LEVELS = ("MINOR", "MODERATE", "CRITICAL")    # As reported by HazardAggregator, least to most severe
+RULE_MIN_SEVERITY = "MODERATE"      # The rules engine never deploys below this severity
+
+# SYSTEM_PROMPT's rules of engagement: (rule, hazard keywords, squad types in order of preference,
+# what to do below RULE_MIN_SEVERITY: "hold" or "escalate" to the LLM)
+HAZARD_RULES = (
+    ("flood", ("FLOOD",), ("Rescue", "Aerial"), "escalate"),
+    ("fire", ("FIRE", "SMOKE"), ("Firefighting", "Aerial"), "escalate"),
+    ("rubble", ("RUBBLE", "DEBRIS", "BLOCKED"), ("Engineering",), "escalate"),
+    ("clear road", ("CLEAR ROAD",), ("Ground", "Logistics"), "hold"),
+)
+
+RuleDecision = namedtuple("RuleDecision", ["command", "rule", "escalate"])
+
+
+def evaluate_rules(observation_text, roster):
+    """
+    Apply the rules of engagement to a structured observation and the roster indexes.
+
+    Only clear-cut cases are decided: exactly one rule matches the hazard, the
+    severity is at least RULE_MIN_SEVERITY and an Idle squad of a preferred type
+    exists (preferring squads at Base, then the largest). Below that severity a
+    clear road is held, as in SYSTEM_PROMPT's example, and minor hazards go to
+    the LLM. Anything else (free-form text, unknown severity, unknown or mixed
+    hazards, or only Busy squads left, where redeploying needs a CRITICAL
+    judgment call) is escalated to the LLM as well.
+
+    Returns:
+        RuleDecision: (command dict or None, rule name, reason for escalating or None)
+    """
+    observation = parse_observation(observation_text)
+    if observation is None:
+        return RuleDecision(None, None, "observation is not a structured scan report")
+    
+    matched = [(rule, types, below) for rule, keywords, types, below in HAZARD_RULES
+               if any(keyword in observation["hazard"] for keyword in keywords)]
+    if not matched:
+        return RuleDecision(None, None, f"no rule covers {observation['hazard']}")
+    if len(matched) > 1:
+        return RuleDecision(None, None, f"{observation['hazard']} matches several rules ({', '.join(rule for rule, _, _ in matched)})")
+    
+    rule, types, below = matched[0]
+    severity = observation["severity"]
+    if severity not in SEVERITY_LEVELS:
+        return RuleDecision(None, rule, f"unknown severity {severity}")
+    if SEVERITY_LEVELS.index(severity) < SEVERITY_LEVELS.index(RULE_MIN_SEVERITY):
+        if below == "hold":
+            return RuleDecision({
+                "reasoning": (f"Rules engine: {observation['hazard']} at {observation['coverage']:.1f}% coverage "
+                              f"({severity}). Below {RULE_MIN_SEVERITY}, the sector is secure; no deployment required."),
+                "action": "hold",
+            }, rule, None)
+        return RuleDecision(None, rule, f"{rule} at {observation['coverage']:.1f}% coverage is only {severity}")
+    
+    for squad_type in types:
+        candidates = roster.query(status="Idle", type=squad_type)
+        if candidates:
+            squad_name = min(candidates, key=lambda name: (roster[name].loc != "Base", -(roster[name].capacity or 0), name))
+            return RuleDecision({
+                "reasoning": (f"Rules engine: {observation['hazard']} at {observation['coverage']:.1f}% coverage "
+                              f"({severity}). {squad_name} is an Idle {squad_type} squad, "
+                              f"first choice available for {rule}."),
+                "squad_name": squad_name,
+                "location": RULE_TARGET,
+                "action": "deploy",
+            }, rule, None)
+    return RuleDecision(None, rule, f"no Idle {' or '.join(types)} squad for {rule} ({severity})")
+
+
+def same_decision(a, b):
+    """Rule and LLM commands agree on the action and, for deployments, the squad."""
+    if a is None or b is None or a.get("action", "").lower() != b.get("action", "").lower():
+        return False
+    return a.get("action", "").lower() != "deploy" or a.get("squad_name") == b.get("squad_name")
 
 def update_squad_state(squads_dict, squad_name, location):
     """
-    Updates squad state in the provided dictionary (which should be st.session_state.squads).
+    Updates squad state in the provided roster.
     
     Args:
-        squads_dict: The squad dictionary to update (typically st.session_state.squads)
+        squads_dict: Roster (indexes are kept in step) or plain {name: squad dict}
         squad_name: Name of the squad to update
         location: New location for the squad
     
@@ -102,8 +276,11 @@ def update_squad_state(squads_dict, squad_name, location):
     if squad_name not in squads_dict:
         return False, f"Unknown squad: {squad_name}"
     
-    squads_dict[squad_name]["status"] = "Deployed"
-    squads_dict[squad_name]["loc"] = location
+    if isinstance(squads_dict, Roster):
+        squads_dict.update(squad_name, status="Deployed", loc=location)
+    else:
+        squads_dict[squad_name]["status"] = "Deployed"
+        squads_dict[squad_name]["loc"] = location
     return True, f"✓ {squad_name} deployed to {location}"
 
 def parse_deployment_command(json_str):
@@ -158,58 +335,194 @@ def parse_deployment_command(json_str):
         print(f"Unexpected parsing error: {e}")
         return None
 
-def stream_commander(observation_text, squads_dict):
+def apply_command(command, roster, squads_dict, deploy=None, source="llm"):
+    """
+    Validate a parsed command and apply it, yielding the same chunks as stream_commander.
+
+    Args:
+        source: Where the command came from ("llm", "cache" or "rules"), passed on in the reasoning chunk
+
+    Returns:
+        bool: True if the command was a well-formed deploy or hold decision
+              (the value of `yield from apply_command(...)`)
+    """
+    action = command.get("action", "").lower()
+    reasoning = command.get("reasoning", "No reasoning provided")
+    
+    if action == "deploy":
+        squad_name = command.get("squad_name", "")
+        location = command.get("location", "")
+        
+        if not squad_name or not location:
+            yield {"type": "warning", "content": "⚠️ JSON missing required fields: squad_name or location"}
+            return False
+        
+        # Validate squad exists
+        if squad_name not in roster:
+            yield {"type": "warning", "content": f"⚠️ Unknown squad: {squad_name}"}
+            return False
+        
+        # Update state
+        if deploy is not None:
+            success, message = deploy(squad_name, location)
+        else:
+            success, message = update_squad_state(squads_dict, squad_name, location)
+        
+        # Yield structured reasoning with deployment info
+        yield {
+            "type": "reasoning",
+            "content": reasoning,
+            "squad": squad_name,
+            "location": location,
+            "action": "deploy",
+            "applied": success,
+            "source": source
+        }
+        
+        if success:
+            yield {"type": "status", "content": message}
+        else:
+            yield {"type": "warning", "content": message}
+        return True
+    
+    if action == "hold":
+        yield {
+            "type": "reasoning",
+            "content": reasoning,
+            "action": "hold",
+            "source": source
+        }
+        yield {"type": "status", "content": "✓ All squads holding position at Base"}
+        return True
+    
+    yield {"type": "warning", "content": f"⚠️ Unknown action: {action}. Expected 'deploy' or 'hold'. Got: {command.get('action', 'N/A')}"}
+    return False
+
+def _stream_llm(observation_text, roster):
+    """
+    One streamed LLM decision: yields thinking/answer/usage chunks.
+
+    Returns:
+        tuple: (reasoning_content, final_content, seconds taken)
+    """
+    started = time.perf_counter()
+    stream = get_client().chat.completions.create(
+        model=MODEL_NAME,
+        messages=build_messages(observation_text, roster),
+        max_tokens=512,
+        temperature=0.1,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+
+    ttft_ms = None
+    usage = None
+    reasoning_content = ""
+    final_content = ""
+
+    for chunk in stream:
+        # The final chunk carries only token usage, with no choices
+        if getattr(chunk, "usage", None) is not None:
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        
+        # 1. Capture "Thinking" (Reasoning)
+        if hasattr(chunk.choices[0], 'delta') and hasattr(chunk.choices[0].delta, 'reasoning_content'):
+            r_chunk = chunk.choices[0].delta.reasoning_content
+            if r_chunk:
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                reasoning_content += r_chunk
+                yield {"type": "thinking", "content": r_chunk}
+
+        # 2. Capture Final Answer (Command)
+        if hasattr(chunk.choices[0], 'delta') and hasattr(chunk.choices[0].delta, 'content'):
+            f_chunk = chunk.choices[0].delta.content
+            if f_chunk:
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                final_content += f_chunk
+                yield {"type": "answer", "content": f_chunk}
+    
+    # Prefix-cache effectiveness: cached_tokens is reported when vLLM runs with --enable-prompt-tokens-details
+    details = getattr(usage, "prompt_tokens_details", None)
+    yield {
+        "type": "usage",
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "cached_tokens": getattr(details, "cached_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+        "ttft_ms": ttft_ms,
+    }
+    return reasoning_content, final_content, time.perf_counter() - started
+
+def stream_commander(observation_text, squads_dict, deploy=None, use_cache=True, fast_path=RULES_FAST_PATH,
+                     on_confirm=None, mission_id=None):
     """
     Streams response from DeepSeek, yielding thoughts (CoT) and final commands.
     
+    Clear-cut situations are decided by the rules engine in microseconds and
+    applied immediately; if RULES_CONFIRM is set, the LLM then checks the rule
+    decision on a background thread (see RuleConfirmer). Other situations
+    already decided within DECISION_CACHE_TTL (same hazard, severity, coverage
+    bucket and squad states, same mission) are replayed from decision_cache; the rest go to
+    the LLM. Every command is applied the same way, whatever its source.
+    
     Args:
         observation_text: The observation/hazard report from vision system
-        squads_dict: The squad dictionary to update (st.session_state.squads)
+        squads_dict: Squad roster the decision is based on
+        deploy: Optional callable(squad_name, location) -> (success, message) that applies
+                a deployment (e.g. SquadStore.deploy); defaults to updating squads_dict in place
+        use_cache: False forces a fresh LLM decision (the result still refreshes the cache)
+        fast_path: Try the rules engine before the LLM
+        on_confirm: Optional callable(confirmation dict) run on the confirmer thread once the
+                    LLM has checked a rule decision (see RuleConfirmer)
+        mission_id: Mission the decision is for; cached decisions are never shared across missions
     
     Yields:
         dict: Chunks with type and content
+            - {"type": "rule", "rule": "...", "elapsed_us": float, "confirming": bool} - rules engine decided
+            - {"type": "escalated", "content": "..."} - rules engine deferred to the LLM, and why
+            - {"type": "cached", "age_s": float, "saved_s": float} - first chunk of a replayed decision
             - {"type": "thinking", "content": "..."} - Real-time CoT reasoning
             - {"type": "answer", "content": "..."} - Raw JSON response (streamed)
-            - {"type": "reasoning", "content": "...", "squad": "...", "location": "...", "action": "..."}
+            - {"type": "usage", "prompt_tokens": int, "cached_tokens": int, "completion_tokens": int, "ttft_ms": float}
+              - once the stream ends; fields are None when the server does not report them
+            - {"type": "reasoning", "content": "...", "squad": "...", "location": "...", "action": "...",
+               "applied": bool, "source": "rules" | "cache" | "llm"}
             - {"type": "error", "content": "..."}
             - {"type": "status", "content": "..."}
             - {"type": "warning", "content": "..."}
     """
     try:
-        # Build a dynamic status report string to feed the LLM
-        squad_status_str = "\n".join([
-            f"- {name}: {data['status']} ({data['type']})" 
-            for name, data in squads_dict.items()
-        ])
-
-        stream = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": f"INCOMING VISUAL REPORT: {observation_text}\n\nCURRENT SQUAD STATUS:\n{squad_status_str}\n\nYOUR COMMAND (respond with valid JSON only):"}
-            ],
-            max_tokens=512,
-            temperature=0.1,
-            stream=True 
-        )
-
-        reasoning_content = ""
-        final_content = ""
-
-        for chunk in stream:
-            # 1. Capture "Thinking" (Reasoning)
-            if hasattr(chunk.choices[0], 'delta') and hasattr(chunk.choices[0].delta, 'reasoning_content'):
-                r_chunk = chunk.choices[0].delta.reasoning_content
-                if r_chunk:
-                    reasoning_content += r_chunk
-                    yield {"type": "thinking", "content": r_chunk}
-
-            # 2. Capture Final Answer (Command)
-            if hasattr(chunk.choices[0], 'delta') and hasattr(chunk.choices[0].delta, 'content'):
-                f_chunk = chunk.choices[0].delta.content
-                if f_chunk:
-                    final_content += f_chunk
-                    yield {"type": "answer", "content": f_chunk}
+        roster = squads_dict if isinstance(squads_dict, Roster) else Roster.from_dict(squads_dict)
+        
+        if fast_path:
+            started = time.perf_counter()
+            decision = evaluate_rules(observation_text, roster)
+            elapsed_us = (time.perf_counter() - started) * 1e6
+            if decision.command is not None:
+                # Judged against the roster the rule saw, before the deployment below changes it
+                state = roster.to_dict()
+                yield {"type": "rule", "rule": decision.rule, "elapsed_us": elapsed_us, "confirming": RULES_CONFIRM}
+                yield {"type": "answer", "content": json.dumps(decision.command, indent=2)}
+                valid = yield from apply_command(decision.command, roster, squads_dict, deploy, source="rules")
+                if valid and RULES_CONFIRM:
+                    rule_confirmer.submit(observation_text, state, decision, on_confirm, mission_id)
+                return
+            yield {"type": "escalated", "content": decision.escalate}
+        
+        fingerprint = situation_fingerprint(observation_text, roster, mission_id)
+        cached = decision_cache.get(fingerprint) if use_cache else None
+        if cached is not None:
+            yield {"type": "cached", "age_s": time.time() - cached.created_at, "saved_s": cached.latency_s}
+            if cached.thinking:
+                yield {"type": "thinking", "content": cached.thinking}
+            yield {"type": "answer", "content": cached.answer}
+            yield from apply_command(cached.command, roster, squads_dict, deploy, source="cache")
+            return
+        
+        reasoning_content, final_content, latency_s = yield from _stream_llm(observation_text, roster)
         
         # --- PARSE JSON RESPONSE ---
         parsed_command = parse_deployment_command(final_content.strip())
@@ -218,53 +531,99 @@ def stream_commander(observation_text, squads_dict):
             yield {"type": "warning", "content": f"⚠️ Could not parse JSON response. Raw output: {final_content[:100]}..."}
             return
         
-        # --- PROCESS COMMAND (NORMALIZE ACTION TO LOWERCASE) ---
-        action = parsed_command.get("action", "").lower()  # <-- FIX: Normalize to lowercase
-        reasoning = parsed_command.get("reasoning", "No reasoning provided")
-        
-        if action == "deploy":
-            squad_name = parsed_command.get("squad_name", "")
-            location = parsed_command.get("location", "")
-            
-            if not squad_name or not location:
-                yield {"type": "warning", "content": "⚠️ JSON missing required fields: squad_name or location"}
-                return
-            
-            # Validate squad exists
-            if squad_name not in squads_dict:
-                yield {"type": "warning", "content": f"⚠️ Unknown squad: {squad_name}"}
-                return
-            
-            # Update state
-            success, message = update_squad_state(squads_dict, squad_name, location)
-            
-            # Yield structured reasoning with deployment info
-            yield {
-                "type": "reasoning",
-                "content": reasoning,
-                "squad": squad_name,
-                "location": location,
-                "action": "deploy"  # <-- Always lowercase
-            }
-            
-            if success:
-                yield {"type": "status", "content": message}
-            else:
-                yield {"type": "warning", "content": message}
-        
-        elif action == "hold":
-            # Yield reasoning for hold decision
-            yield {
-                "type": "reasoning",
-                "content": reasoning,
-                "action": "hold"  # <-- Always lowercase
-            }
-            yield {"type": "status", "content": "✓ All squads holding position at Base"}
-        
-        else:
-            yield {"type": "warning", "content": f"⚠️ Unknown action: {action}. Expected 'deploy' or 'hold'. Got: {parsed_command.get('action', 'N/A')}"} # Added more debug info
+        # --- PROCESS COMMAND ---
+        valid = yield from apply_command(parsed_command, roster, squads_dict, deploy)
+        if valid:
+            decision_cache.put(fingerprint, reasoning_content, final_content, parsed_command, latency_s)
 
     except ConnectionError as e:
         yield {"type": "error", "content": f"Cannot connect to vLLM server at {VLLM_API_URL}. Is it running?"}
     except Exception as e:
-        yield {"type": "error", "content": f"Unexpected error: {str(e)}"}
\ No newline at end of file
+        yield {"type": "error", "content": f"Unexpected error: {str(e)}"}
+
+class RuleConfirmer:
+    """
+    Checks rule-engine decisions against the LLM on a background thread.
+
+    Each confirmation asks what the LLM would have decided for the same
+    observation and roster (reusing decision_cache when it already knows,
+    through peek() so the cache hit rate only counts real requests), records
+    whether it agrees with the rule and logs the outcome; the callback passed
+    to submit() is how a caller records it anywhere else.
+    """
+
+    def __init__(self, history=CONFIRM_HISTORY):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rule-confirm")
+        self._lock = threading.Lock()
+        self.recent = deque(maxlen=history)
+        self.agreed = 0
+        self.disputed = 0
+        self.failed = 0
+
+    def submit(self, observation_text, squads, decision, callback=None, mission_id=None):
+        """Queue a check of `decision`, made from `squads` (a {name: squad dict} snapshot) in `mission_id`."""
+        self._executor.submit(self._confirm, observation_text, squads, decision, callback, mission_id)
+
+    def _confirm(self, observation_text, squads, decision, callback, mission_id):
+        try:
+            roster = Roster.from_dict(squads)
+            fingerprint = situation_fingerprint(observation_text, roster, mission_id)
+            cached = decision_cache.peek(fingerprint)
+            if cached is not None:
+                llm_command, source = cached.command, "cache"
+            else:
+                stream = _stream_llm(observation_text, roster)
+                try:
+                    while True:
+                        next(stream)
+                except StopIteration as done:
+                    thinking, answer, latency_s = done.value
+                llm_command, source = parse_deployment_command(answer.strip()), "llm"
+                if llm_command is None:
+                    raise ValueError(f"unparseable LLM response: {answer[:100]}")
+                decision_cache.put(fingerprint, thinking, answer, llm_command, latency_s)
+        except Exception as e:
+            log.warning("Rule confirmation failed (%s): %s", decision.rule, e)
+            with self._lock:
+                self.failed += 1
+            return
+        
+        agree = same_decision(decision.command, llm_command)
+        result = {
+            "ts": time.time(),
+            "rule": decision.rule,
+            "rule_command": decision.command,
+            "llm_command": llm_command,
+            "agree": agree,
+            "source": source,
+        }
+        with self._lock:
+            self.recent.append(result)
+            if agree:
+                self.agreed += 1
+            else:
+                self.disputed += 1
+        rule_choice = decision.command.get("squad_name") or decision.command.get("action")
+        llm_choice = llm_command.get("squad_name") if llm_command.get("action", "").lower() == "deploy" else llm_command.get("action")
+        if agree:
+            log.info("Rule confirmed (%s): %s", decision.rule, rule_choice)
+        else:
+            log.warning("Rule disputed (%s): rules chose %s, LLM chose %s", decision.rule, rule_choice, llm_choice)
+        if callback is not None:
+            try:
+                callback(result)
+            except Exception:
+                log.exception("Rule confirmation callback failed (%s)", decision.rule)
+
+    def stats(self):
+        with self._lock:
+            checked = self.agreed + self.disputed
+            return {
+                "agreed": self.agreed,
+                "disputed": self.disputed,
+                "failed": self.failed,
+                "agreement_rate": self.agreed / checked if checked else None,
+            }
+
+
+rule_confirmer = RuleConfirmer()
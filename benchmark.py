@@ -0,0 +1,608 @@
+# benchmark.py
+"""
+AeroGuard performance benchmarks.
+
+Usage:
+    python benchmark.py decode [--video clip.mp4] [--stride 25] [--analysis-ms 40]
+    python benchmark.py sampling [--video clip.mp4] [--stride 25]
+    python benchmark.py feeds [--video clip.mp4] [--feeds 1 4 8]
+    python benchmark.py startup [--pages home dashboard] [--top 10]
+    python benchmark.py payload [--pages home dashboard]
+    python benchmark.py map [--squads 8 100 1000]
+    python benchmark.py commandlog [--entries 10000]
+    python benchmark.py squads [--threads 8] [--updates 200]
+    python benchmark.py roster [--squads 8 1000 10000]
+    python benchmark.py prompt [--squads 8 200] [--decisions 24]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+
+
+def make_synthetic_clip(path, frames=1500, width=1920, height=1080, fps=30):
+    """
+    Write a test clip so benchmarks run without real footage.
+
+    The camera hovers for the first third, pans slowly for the second and
+    pans fast for the last, mimicking a typical drone flight.
+    """
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    rng = np.random.default_rng(0)
+    world = cv2.GaussianBlur((rng.random((height, width * 4, 3)) * 255).astype(np.uint8), (31, 31), 0)
+    for _ in range(120):
+        x, y = int(rng.integers(0, width * 4)), int(rng.integers(0, height))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.rectangle(world, (x, y), (x + int(rng.integers(40, 400)), y + int(rng.integers(40, 400))), color, -1)
+
+    offset = 0.0
+    for i in range(frames):
+        phase = 3 * i // frames
+        offset += (0.0, 4.0, 30.0)[phase]
+        x = int(offset) % (width * 3)
+        frame = np.ascontiguousarray(world[:, x:x + width])
+        cv2.putText(frame, f"{i}", (50, 150), cv2.FONT_HERSHEY_SIMPLEX, 4, (255, 255, 255), 8)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def _clip_path(args):
+    if args.video:
+        return args.video
+    path = os.path.join(tempfile.gettempdir(), "aeroguard_bench_clip_v2.mp4")
+    if not os.path.exists(path):
+        print(f"Generating synthetic clip at {path} ...")
+        make_synthetic_clip(path)
+    return path
+
+
+# --- DECODE ---
+def bench_decode(args):
+    from frame_source import FrameSource
+
+    path = _clip_path(args)
+    analysis_s = args.analysis_ms / 1000.0
+
+    # Before: serial read() of every frame on the script thread
+    start = time.perf_counter()
+    cap = cv2.VideoCapture(path)
+    frame_count = sampled = 0
+    while cap.isOpened():
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame_count += 1
+        if frame_count % args.stride != 0:
+            continue
+        sampled += 1
+        time.sleep(analysis_s)   # Stand-in for upload + inference + render
+    cap.release()
+    serial = time.perf_counter() - start
+
+    # After: background decode thread with grab()-based skipping
+    start = time.perf_counter()
+    threaded_sampled = 0
+    with FrameSource(path, stride=args.stride) as source:
+        for _ in source:
+            threaded_sampled += 1
+            time.sleep(analysis_s)
+    threaded = time.perf_counter() - start
+
+    print(f"frames={frame_count} stride={args.stride} sampled={sampled}/{threaded_sampled} analysis={args.analysis_ms}ms")
+    print(f"serial read() loop    : {serial:7.2f} s")
+    print(f"FrameSource (grab)    : {threaded:7.2f} s  ({serial / threaded:.2f}x)")
+
+
+# --- SAMPLING ---
+def bench_sampling(args):
+    from frame_source import AdaptiveSampler, FrameSource
+
+    path = _clip_path(args)
+    results = {}
+    for name, sampler in (("fixed", None), ("adaptive", AdaptiveSampler())):
+        start = time.perf_counter()
+        with FrameSource(path, stride=args.stride, sampler=sampler) as source:
+            for _ in source:
+                pass
+        results[name] = (source.sampled_count, source.baseline_count, time.perf_counter() - start)
+
+    fixed_count, _, fixed_t = results["fixed"]
+    adaptive_count, baseline, adaptive_t = results["adaptive"]
+    print(f"fixed 1-in-{args.stride}: {fixed_count:5d} frames analyzed   decode {fixed_t:6.2f} s")
+    print(f"adaptive      : {adaptive_count:5d} frames analyzed   decode {adaptive_t:6.2f} s"
+          f"  ({adaptive_count / max(baseline, 1):.0%} of fixed-stride baseline {baseline})")
+
+
+# --- FEEDS ---
+def bench_feeds(args):
+    """Needs a running vision server (AEROGUARD_VISION_SERVERS or localhost:9000)."""
+    from frame_store import FrameStore
+    from scan_jobs import ScanJobManager
+
+    path = _clip_path(args)
+    manager = ScanJobManager()
+    for count in args.feeds:
+        store = FrameStore()
+        start = time.perf_counter()
+        job_id = manager.submit([path] * count, store, names=[f"feed-{i}" for i in range(count)])
+        job = manager.get(job_id)
+        while job.active:
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        snap = job.snapshot()
+        per_feed = [f["analyzed"] for f in snap["feeds"]]
+        print(f"{count} feed(s): {snap['analyzed']:5d} frames in {elapsed:6.2f} s = {snap['analyzed'] / elapsed:6.1f} frames/s"
+              f"  (per feed {min(per_feed)}-{max(per_feed)}, status {snap['status']})")
+        store.destroy()
+
+
+# --- STARTUP ---
+def _startup_child(args):
+    """Runs in a fresh interpreter: time the first (cold) and a repeat run of one page."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py"), default_timeout=120)
+    app.session_state["page"] = args.page
+    timings = []
+    for _ in range(1 + args.reruns):
+        start = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - start)
+    errors = [str(e.value) for e in app.exception]
+    print(json.dumps({"cold": timings[0], "rerun": sorted(timings[1:])[len(timings[1:]) // 2] if timings[1:] else None,
+                      "errors": errors}))
+
+
+def _parse_importtime(stderr):
+    """Top-level (directly imported) modules and their cumulative import time in ms."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "):
+            modules.append((int(cumulative) / 1000.0, name.strip()))
+    return modules
+
+
+def bench_startup(args):
+    for page in args.pages:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", os.path.abspath(__file__), "startup-child", "--page", page,
+             "--reruns", str(args.reruns)],
+            capture_output=True, text=True,
+        )
+        if result.returncode != 0 or not result.stdout.strip():
+            print(f"❌ {page}: startup run failed\n{result.stderr[-2000:]}")
+            continue
+        timing = json.loads(result.stdout.strip().splitlines()[-1])
+        imports = sorted(_parse_importtime(result.stderr), reverse=True)
+        print(f"{page:<10} cold {timing['cold'] * 1000:8.1f} ms   rerun {timing['rerun'] * 1000:8.1f} ms"
+              f"   imports {sum(ms for ms, _ in imports):8.1f} ms")
+        for ms, name in imports[:args.top]:
+            print(f"    {ms:8.1f} ms  {name}")
+        for error in timing["errors"]:
+            print(f"    ⚠️ {error}")
+
+
+# --- PAYLOAD ---
+def bench_payload(args):
+    """Bytes of markdown/HTML each rerun sends, and the cacheable static files it links to."""
+    from streamlit.testing.v1 import AppTest
+    from static_assets import STATIC_DIR
+
+    for page in args.pages:
+        app = AppTest.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py"), default_timeout=120)
+        app.session_state["page"] = page
+        app.run()
+        bodies = [m.value for m in app.markdown] + [c.value for c in app.caption]
+        html_bytes = sum(len(body.encode()) for body in bodies)
+        inline_bytes = sum(len(uri) for body in bodies for uri in re.findall(r"data:[^\"')]+", body))
+        linked = set(re.findall(r"app/static/([^?\"]+)", "".join(bodies)))
+        linked_bytes = sum(os.path.getsize(os.path.join(STATIC_DIR, name)) for name in linked
+                           if os.path.exists(os.path.join(STATIC_DIR, name)))
+        print(f"{page:<10} per-rerun HTML {html_bytes / 1024:8.1f} KB (inline data URIs {inline_bytes / 1024:8.1f} KB)"
+              f"   static files {len(linked)} / {linked_bytes / 1024:8.1f} KB fetched once")
+
+
+# --- MAP ---
+def _synthetic_roster(count, seed=0):
+    rng = np.random.default_rng(seed)
+    locations = ["Base", "Base", "Sector 4"] + [f"Sector {n}" for n in range(1, 13)]
+    types = ["Ground", "Aerial", "Medical", "Engineering", "Rescue", "Logistics", "Recon", "Firefighting"]
+    return {
+        f"Unit-{i:04d}": {"status": "Idle", "type": types[i % len(types)], "loc": str(rng.choice(locations))}
+        for i in range(count)
+    }
+
+
+def bench_map(args):
+    from map_layout import TacticalMap
+
+    rounds = 20
+    for count in args.squads:
+        squads = _synthetic_roster(count)
+        names = list(squads)
+
+        start = time.perf_counter()
+        tactical_map = TacticalMap()
+        tactical_map.build(squads, hazard_level="UNKNOWN")
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            tactical_map.build(squads, hazard_level="UNKNOWN")
+        unchanged = (time.perf_counter() - start) / rounds
+
+        start = time.perf_counter()
+        for i in range(rounds):
+            # One deployment per rerun, as the commander does
+            name = names[i % count]
+            squads[name] = dict(squads[name], status="Deployed", loc="Sector 4")
+            tactical_map.build(squads, active_squad=name, hazard_level="CRITICAL")
+        deploy = (time.perf_counter() - start) / rounds
+
+        print(f"{count:5d} squads: cold build {cold * 1000:7.2f} ms   unchanged rerun {unchanged * 1000:6.3f} ms"
+              f"   one deployment {deploy * 1000:6.3f} ms")
+
+
+# --- COMMAND LOG ---
+def bench_commandlog(args):
+    from command_log import CommandLog
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = CommandLog(os.path.join(tmp, "commands.db"))
+        reasoning = "Flood coverage above threshold near the river crossing; Echo carries lifeboats. " * 3
+
+        start = time.perf_counter()
+        for i in range(args.entries):
+            log.append("bench", "deploy", squad="Echo", location=f"Sector {i % 9}", reasoning=reasoning, latency_ms=850.0)
+        single = time.perf_counter() - start
+
+        batch = [{"mission_id": "bench-batch", "action": "deploy", "squad": "Echo", "location": "Sector 4",
+                  "reasoning": reasoning, "latency_ms": 850.0}] * args.entries
+        start = time.perf_counter()
+        for i in range(0, len(batch), 100):
+            log.append_many(batch[i:i + 100])
+        batched = time.perf_counter() - start
+
+        rounds = 200
+        pages = log.count("bench") // 20
+        start = time.perf_counter()
+        for i in range(rounds):
+            log.page("bench", (i * 37) % pages, 20)
+        page_ms = (time.perf_counter() - start) / rounds * 1000
+
+        start = time.perf_counter()
+        streamed = sum(1 for _ in log.iter_entries("bench"))
+        stream_s = time.perf_counter() - start
+
+    print(f"append (one transaction each): {args.entries / single:9.0f} entries/s")
+    print(f"append_many (100 per batch)  : {args.entries / batched:9.0f} entries/s")
+    print(f"page of 20 (random page)     : {page_ms:9.3f} ms")
+    print(f"stream all {streamed} entries    : {stream_s * 1000:9.1f} ms")
+
+
+# --- SQUADS ---
+def bench_squads(args):
+    """Concurrent operator updates: naive shared dict vs SquadStore compare-and-set. Exits 1 on lost updates."""
+    import random
+    import threading
+    import backend
+    from squad_store import SquadStore
+
+    expected = args.threads * args.updates
+    names = list(backend.SQUADS)
+
+    # Before: sessions read-modify-write the shared nested dicts
+    shared = {name: dict(data, deployments=0) for name, data in backend.SQUADS.items()}
+
+    def naive_worker(seed):
+        rng = random.Random(seed)
+        for _ in range(args.updates):
+            squad = shared[rng.choice(names)]
+            count = squad["deployments"]
+            time.sleep(0)   # Another session's rerun gets scheduled here
+            squad["deployments"] = count + 1
+
+    threads = [threading.Thread(target=naive_worker, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    naive_total = sum(squad["deployments"] for squad in shared.values())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SquadStore(os.path.join(tmp, "squads.db"), defaults={n: dict(d, deployments=0) for n, d in backend.SQUADS.items()})
+        store.ensure_mission("bench")
+
+        def store_worker(seed):
+            rng = random.Random(seed)
+            for _ in range(args.updates):
+                store.update("bench", rng.choice(names), lambda d: dict(d, deployments=d["deployments"] + 1))
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=store_worker, args=(i,)) for i in range(args.threads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        snapshot = store.snapshot("bench")
+        store_total = sum(squad["deployments"] for squad in snapshot.squads.values())
+
+        # Two operators deploying the same squad from the same roster version: exactly one wins
+        _, version = store.get("bench", "Echo")
+        results = []
+        racers = [threading.Thread(target=lambda loc: results.append(store.deploy("bench", "Echo", loc, expected_version=version)[0]),
+                                   args=(loc,)) for loc in ("Sector 4", "Sector 7")]
+        for t in racers:
+            t.start()
+        for t in racers:
+            t.join()
+
+    print(f"naive shared dict : {naive_total:6d} / {expected} updates kept ({expected - naive_total} lost)")
+    print(f"SquadStore CAS    : {store_total:6d} / {expected} updates kept,"
+          f" {expected / elapsed:7.0f} updates/s, mission version {snapshot.version}")
+    print(f"same-squad race   : {results.count(True)} of {len(results)} deployments applied")
+    if store_total != expected or results.count(True) != 1:
+        print("❌ SquadStore lost or duplicated updates")
+        raise SystemExit(1)
+
+
+# --- ROSTER ---
+def bench_roster(args):
+    import tracemalloc
+    from roster import Roster
+
+    equipment = ["Rations", "Medical Kit", "Surveillance Drone", "Radio", "Stretcher", "Lifeboat", "Generator", "Hose"]
+    rounds = 200
+    for count in args.squads:
+        squads = _synthetic_roster(count)
+        for i, data in enumerate(squads.values()):
+            data.update(status="Idle" if i % 3 else "Deployed", capacity=4 + i % 12,
+                        equipment=[equipment[i % 8], equipment[(i * 3) % 8]])
+
+        tracemalloc.start()
+        plain = {name: {k: (list(v) if isinstance(v, list) else v) for k, v in data.items()} for name, data in squads.items()}
+        plain_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        tracemalloc.start()
+        roster = Roster.from_dict(squads)
+        roster_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            [n for n, d in plain.items() if d["status"] == "Idle" and d["type"] == "Medical"]
+            [n for n, d in plain.items() if "Lifeboat" in d["equipment"]]
+            sum(1 for d in plain.values() if d["status"] != "Idle")
+        scan = (time.perf_counter() - start) / rounds
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            roster.query(status="Idle", type="Medical")
+            roster.carrying("Lifeboat")
+            roster.active_count
+        indexed = (time.perf_counter() - start) / rounds
+
+        print(f"{count:6d} squads: scan {scan * 1e6:9.1f} us   indexed {indexed * 1e6:7.1f} us"
+              f"   memory dicts {plain_bytes / 1024:8.1f} KB   roster {roster_bytes / 1024:8.1f} KB (with indexes)")
+
+
+# --- PROMPT ---
+class _PrefixCacheStub:
+    """
+    Local OpenAI-compatible streaming endpoint that models vLLM prefix caching.
+
+    Prompts are split into fixed-size token blocks chained by hash, as vLLM
+    does; leading blocks seen before count as cached, and time to first token
+    is a fixed overhead plus prefill time for the uncached tokens only.
+    """
+
+    BLOCK_TOKENS = 16
+    CHARS_PER_TOKEN = 4     # Stand-in tokenizer: rough English/JSON average
+
+    def __init__(self, prefill_ms_per_token, overhead_ms=5.0, capacity_blocks=8192):
+        import threading
+        from collections import OrderedDict
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        self.prefill_ms_per_token = prefill_ms_per_token
+        self.overhead_ms = overhead_ms
+        self.capacity_blocks = capacity_blocks
+        self.blocks = OrderedDict()
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                prompt_tokens, cached = stub.lookup(body["messages"])
+                time.sleep((stub.overhead_ms + (prompt_tokens - cached) * stub.prefill_ms_per_token) / 1000)
+                answer = json.dumps({"reasoning": "Stub decision.", "action": "hold"})
+                events = [
+                    {"choices": [{"index": 0, "delta": {"content": answer}}]},
+                    {"choices": [], "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(answer) // 4,
+                                              "prompt_tokens_details": {"cached_tokens": cached}}},
+                ]
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for event in [json.dumps(e) for e in events] + ["[DONE]"]:
+                    data = f"data: {event}\n\n".encode()
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/chat/completions"
+
+    def lookup(self, messages):
+        import hashlib
+
+        text = "".join(f"<|{m['role']}|>\n{m['content']}\n" for m in messages) + "<|assistant|>\n"
+        block_chars = self.BLOCK_TOKENS * self.CHARS_PER_TOKEN
+        prompt_tokens = -(-len(text) // self.CHARS_PER_TOKEN)
+        cached, parent, hit = 0, b"", True
+        with self.lock:
+            for start in range(0, len(text) - block_chars + 1, block_chars):
+                parent = hashlib.blake2b(parent + text[start:start + block_chars].encode(), digest_size=16).digest()
+                if hit and parent in self.blocks:
+                    cached += self.BLOCK_TOKENS
+                    self.blocks.move_to_end(parent)
+                else:
+                    hit = False
+                    self.blocks[parent] = True
+            while len(self.blocks) > self.capacity_blocks:
+                self.blocks.popitem(last=False)
+        return prompt_tokens, cached
+
+    def close(self):
+        self.server.shutdown()
+
+
+def _legacy_messages(observation_text, squads):
+    # Pre-builder layout: observation ahead of the roster, so the roster was never reused from cache
+    from commander_prompt import SYSTEM_PROMPT
+
+    squad_status_str = "\n".join(f"- {name}: {data['status']} ({data['type']})" for name, data in squads.items())
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"INCOMING VISUAL REPORT: {observation_text}\n\nCURRENT SQUAD STATUS:\n{squad_status_str}\n\nYOUR COMMAND (respond with valid JSON only):"},
+    ]
+
+
+def _commander_usage(observation_text, roster):
+    """Usage chunk of one fresh LLM decision made through backend.stream_commander."""
+    import backend
+
+    usage = None
+    for chunk in backend.stream_commander(observation_text, roster, use_cache=False, fast_path=False):
+        if chunk["type"] == "usage":
+            usage = chunk
+        elif chunk["type"] == "error":
+            raise SystemExit(f"❌ {chunk['content']}")
+    return usage
+
+
+def bench_prompt(args):
+    import backend
+    from hazard_aggregator import HazardAggregator
+    from roster import Roster
+
+    hazards = ["flood water", "fire", "rubble", "clear road"]
+    stub = _PrefixCacheStub(args.prefill_ms_per_token)
+    saved = backend.VLLM_API_URL, backend._client, backend.build_messages
+    backend.VLLM_API_URL, backend._client = stub.url.rsplit("/chat/completions", 1)[0], None
+    try:
+        for count in args.squads:
+            base = _synthetic_roster(count)
+            for i, data in enumerate(base.values()):
+                data.update(capacity=4 + i % 12, equipment=["Radio", ["Lifeboat", "Hose", "Stretcher", "Generator"][i % 4]])
+            for layout, builder in (("legacy", _legacy_messages), ("builder", saved[2])):
+                stub.blocks.clear()
+                backend.build_messages = builder
+                roster = Roster.from_dict(base)
+                names = sorted(roster)
+                aggregator = HazardAggregator()
+                ttfts, prompt_tokens, cached_tokens = [], 0, 0
+                for i in range(args.decisions):
+                    if i and i % args.deploy_every == 0:
+                        # A deployment changes one squad between decisions
+                        roster.update(names[i % count], status="Deployed", loc="Sector 4")
+                    aggregator.add({"hazard_type": hazards[i // 6 % 4], "coverage_pct": 10 + 3.7 * (i % 12),
+                                    "hazard_confidence": 0.8, "mask_count": i % 5 + 1})
+                    usage = _commander_usage(aggregator.observation(), roster)
+                    if i:  # The first call warms the cache for both layouts
+                        ttfts.append(usage["ttft_ms"])
+                        prompt_tokens += usage["prompt_tokens"]
+                        cached_tokens += usage["cached_tokens"]
+                print(f"{count:4d} squads, {layout:7s}: prompt {prompt_tokens / len(ttfts):7.0f} tokens"
+                      f"   prefix-cache hits {cached_tokens / max(prompt_tokens, 1):6.1%}"
+                      f"   TTFT median {np.median(ttfts):6.1f} ms  p90 {np.percentile(ttfts, 90):6.1f} ms")
+    finally:
+        backend.VLLM_API_URL, backend._client, backend.build_messages = saved
+        stub.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AeroGuard performance benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("decode", help="Scan-loop frame decoding: serial read() vs FrameSource")
+    p.add_argument("--video", help="Clip to scan (a synthetic 1080p clip is generated if omitted)")
+    p.add_argument("--stride", type=int, default=25)
+    p.add_argument("--analysis-ms", type=float, default=40.0, help="Simulated per-frame analysis time")
+    p.set_defaults(func=bench_decode)
+
+    p = sub.add_parser("sampling", help="Frames analyzed: fixed stride vs scene-change adaptive sampling")
+    p.add_argument("--video", help="Clip to scan (a synthetic 1080p clip is generated if omitted)")
+    p.add_argument("--stride", type=int, default=25)
+    p.set_defaults(func=bench_sampling)
+
+    p = sub.add_parser("feeds", help="Multi-feed scan throughput against the configured vision server")
+    p.add_argument("--video", help="Clip used for every feed (a synthetic 1080p clip is generated if omitted)")
+    p.add_argument("--feeds", type=int, nargs="+", default=[1, 4, 8])
+    p.set_defaults(func=bench_feeds)
+
+    p = sub.add_parser("startup", help="Cold-start and rerun time of the Streamlit pages, with an import-time breakdown")
+    p.add_argument("--pages", nargs="+", default=["home", "dashboard"])
+    p.add_argument("--reruns", type=int, default=5)
+    p.add_argument("--top", type=int, default=10, help="Slowest top-level imports to list per page")
+    p.set_defaults(func=bench_startup)
+
+    p = sub.add_parser("payload", help="Per-rerun HTML payload of each page vs browser-cached static assets")
+    p.add_argument("--pages", nargs="+", default=["home", "dashboard"])
+    p.set_defaults(func=bench_payload)
+
+    p = sub.add_parser("map", help="Tactical map build time: cold, unchanged rerun and single deployment")
+    p.add_argument("--squads", type=int, nargs="+", default=[8, 100, 1000])
+    p.set_defaults(func=bench_map)
+
+    p = sub.add_parser("commandlog", help="Persistent command log append throughput and page reads")
+    p.add_argument("--entries", type=int, default=10000)
+    p.set_defaults(func=bench_commandlog)
+
+    p = sub.add_parser("squads", help="Multithreaded check that concurrent squad updates are never lost")
+    p.add_argument("--threads", type=int, default=8)
+    p.add_argument("--updates", type=int, default=200, help="Updates per thread")
+    p.set_defaults(func=bench_squads)
+
+    p = sub.add_parser("roster", help="Squad queries: dict scans vs the indexed roster, plus memory")
+    p.add_argument("--squads", type=int, nargs="+", default=[8, 1000, 10000])
+    p.set_defaults(func=bench_roster)
+
+    p = sub.add_parser("prompt", help="Commander prompt: prefix-cache hit rate and TTFT against a local stub server")
+    p.add_argument("--squads", type=int, nargs="+", default=[8, 200])
+    p.add_argument("--decisions", type=int, default=24)
+    p.add_argument("--deploy-every", type=int, default=4, help="Decisions between roster changes")
+    p.add_argument("--prefill-ms-per-token", type=float, default=0.25, help="Stub prefill cost of an uncached token")
+    p.set_defaults(func=bench_prompt)
+
+    p = sub.add_parser("startup-child")
+    p.add_argument("--page", default="home")
+    p.add_argument("--reruns", type=int, default=5)
+    p.set_defaults(func=_startup_child)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
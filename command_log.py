@@ -0,0 +1,134 @@
+# command_log.py
+"""
+Append-only, persistent command history.
+
+Every commander decision is stored as a structured row (timestamp, squad,
+location, action, reasoning, latency) in a local SQLite database in WAL
+mode, so history survives restarts and is shared safely between the
+Streamlit session threads. Entries are grouped by mission id and read
+back a page at a time through the (mission_id, id) index; nothing is ever
+updated or deleted.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+DB_PATH = os.environ.get("AEROGUARD_COMMAND_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "aeroguard_commands.db"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS commands (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    mission_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    squad TEXT,
+    location TEXT,
+    action TEXT NOT NULL,
+    reasoning TEXT,
+    latency_ms REAL
+);
+CREATE INDEX IF NOT EXISTS commands_mission ON commands (mission_id, id);
+"""
+_COLUMNS = ("id", "mission_id", "ts", "squad", "location", "action", "reasoning", "latency_ms")
+
+
+def format_entry(entry):
+    """One-line log text, matching the dashboard's original command log format."""
+    stamp = time.strftime("%H:%M:%S", time.localtime(entry["ts"]))
+    if entry["action"] == "deploy":
+        return f"[{stamp}] Deployed {entry['squad']} to {entry['location']}"
+    if entry["action"] == "rejected":
+        return f"[{stamp}] REJECTED: {entry['squad']} to {entry['location']} (squad changed by another operator)"
+    if entry["action"] in ("confirmed", "disputed"):
+        choice = f"deploying {entry['squad']} to {entry['location']}" if entry["squad"] else "holding position"
+        verdict = "CONFIRMED: LLM agrees" if entry["action"] == "confirmed" else "DISPUTED: LLM disagrees"
+        return f"[{stamp}] {verdict} with rules {choice}"
+    return f"[{stamp}] HOLD: All squads maintaining position"
+
+
+class CommandLog:
+    """
+    SQLite-backed command history; safe to share across threads.
+
+    Each thread gets its own connection, which is what lets WAL readers
+    (dashboard reruns) proceed while another session appends.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Durable at checkpoints; a crash can lose only the last few commits, never corrupt
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, mission_id, action, squad=None, location=None, reasoning=None, latency_ms=None, ts=None):
+        """Record one decision; returns its entry id."""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO commands (mission_id, ts, squad, location, action, reasoning, latency_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (mission_id, ts if ts is not None else time.time(), squad, location, action, reasoning, latency_ms),
+            )
+        return cursor.lastrowid
+
+    def append_many(self, entries):
+        """Record several decisions in one transaction; each entry is a dict of append() fields."""
+        now = time.time()
+        rows = [
+            (e["mission_id"], e.get("ts", now), e.get("squad"), e.get("location"), e["action"],
+             e.get("reasoning"), e.get("latency_ms"))
+            for e in entries
+        ]
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO commands (mission_id, ts, squad, location, action, reasoning, latency_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def count(self, mission_id):
+        return self._connect().execute("SELECT COUNT(*) FROM commands WHERE mission_id = ?", (mission_id,)).fetchone()[0]
+
+    def version(self, mission_id):
+        """(count, newest id): changes on every append, cheap to compare."""
+        row = self._connect().execute(
+            "SELECT COUNT(*), MAX(id) FROM commands WHERE mission_id = ?", (mission_id,)
+        ).fetchone()
+        return row[0], row[1]
+
+    def page(self, mission_id, page_number, page_size):
+        """One page of entries, newest first."""
+        rows = self._connect().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM commands WHERE mission_id = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+            (mission_id, page_size, page_number * page_size),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def iter_entries(self, mission_id, until_id=None, batch_size=500):
+        """Entries oldest first (up to `until_id`), fetched in batches on the calling thread."""
+        last_id = 0
+        until_id = until_id if until_id is not None else 2**63 - 1
+        conn = self._connect()
+        while True:
+            rows = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM commands WHERE mission_id = ? AND id > ? AND id <= ? ORDER BY id LIMIT ?",
+                (mission_id, last_id, until_id, batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            last_id = rows[-1]["id"]
@@ -0,0 +1,137 @@
+# commander_prompt.py
+"""
+Prompt construction for the AeroGuard commander.
+
+vLLM runs with --enable-prefix-caching, which reuses the KV cache of any
+prompt prefix it has already computed, block by block. The prompt is laid
+out so that prefix is as long as possible:
+
+1. SYSTEM_PROMPT: the instructions, byte-identical on every call (no squad
+   names, statuses or timestamps in it).
+2. The squad roster (type, capacity, equipment), which changes only when
+   units join or leave the mission.
+3. Squad status, which changes on deployments. Squads idle at base are
+   left out, so it stays short however large the roster is.
+4. The observation, which changes on every call, last.
+
+Sections 2 and 3 are generated from live state in a canonical compact form
+(sorted by name, fixed field order), so equal states give equal bytes.
+"""
+
+from roster import Roster
+
+SYSTEM_PROMPT = """
+You are AeroGuard Commander, an autonomous AI responsible for disaster response logistics.
+Your goal is to analyze visual hazard reports and deploy the *most specialized* available squad.
+
+SQUAD SPECIALTIES BY TYPE:
+- Ground: General infantry, light medical. Good for clearing roads.
+- Aerial: Fast recon drone swarm. Best for assessing large fires or floods from above.
+- Medical: Specialized in triage.
+- Engineering: Bridge repair, power generation, rubble clearing.
+- Rescue: Swift water rescue, high-angle rescue. Carries Lifeboats. BEST FOR FLOODS.
+- Logistics: Heavy transport (fuel/food).
+- Recon: Light scouts.
+- Firefighting: Specialized in fire suppression.
+
+The live state follows these instructions, one squad per line:
+- SQUAD ROSTER: name|type|capacity|equipment
+- SQUAD STATUS: name|status|location
+Squads not listed in SQUAD STATUS are Idle at Base.
+
+RULES OF ENGAGEMENT:
+1. **Analyze the Hazard:**
+   - If FLOOD detected -> Deploy a **Rescue** squad (Lifeboats) or an **Aerial** squad (Aerial view).
+   - If FIRE detected -> Deploy a **Firefighting** squad (if free) or an **Aerial** squad.
+   - If RUBBLE/BLOCKED ROAD -> Deploy an **Engineering** squad to clear it.
+   - If ROAD CLEAR -> Deploy a **Ground** or **Logistics** squad to secure the route.
+
+2. **Check Status:**
+   - Do NOT redeploy squads marked "Busy" unless the new threat is Catastrophic (Severity: CRITICAL).
+   - Prioritize "Idle" squads.
+
+3. **Output Format (STRICT - MUST BE VALID JSON):**
+   You must respond with ONLY a valid JSON object in this exact format:
+
+   {
+     "reasoning": "Detailed explanation of your decision including: hazard analysis, squad capabilities assessment, and why this squad is optimal",
+     "squad_name": "SquadName",
+     "location": "Sector X",
+     "action": "deploy"
+   }
+
+   OR if no deployment is needed:
+
+   {
+     "reasoning": "Explanation of why no deployment is necessary",
+     "action": "hold"
+   }
+
+   CRITICAL RULES:
+   - Your final output MUST be valid JSON only - no additional text before or after
+   - squad_name must be a name listed in SQUAD ROSTER
+   - action must be either "deploy" or "hold"
+   - reasoning should be 2-3 sentences explaining your tactical decision
+
+   Examples:
+
+   {
+     "reasoning": "Flood detected with 45% coverage indicates CRITICAL severity. Echo squad has specialized swift water rescue equipment including lifeboats, making them optimal for water-based emergencies. They are currently Idle at Base.",
+     "squad_name": "Echo",
+     "location": "Sector 4",
+     "action": "deploy"
+   }
+
+   {
+     "reasoning": "Clear road detected with minimal hazards. No immediate deployment required as the sector is secure.",
+     "action": "hold"
+   }
+"""
+
+def _field(value):
+    # Keep the one-line, pipe-separated layout unambiguous
+    return str(value).replace("|", "/").replace("\n", " ").strip()
+
+
+def roster_section(roster):
+    """What each squad is: name|type|capacity|equipment, sorted by name."""
+    lines = ["SQUAD ROSTER:"]
+    for name in sorted(roster):
+        squad = roster[name]
+        equipment = ",".join(_field(item) for item in squad.get("equipment") or ())
+        lines.append("|".join((_field(name), _field(squad["type"]), _field(squad.get("capacity", "")), equipment)))
+    return "\n".join(lines)
+
+
+def status_section(roster):
+    """Where squads are: name|status|location for every squad not idle at base, sorted by name."""
+    at_rest = roster.query(status="Idle", loc="Base")
+    lines = ["SQUAD STATUS:"]
+    for name in sorted(roster):
+        if name not in at_rest:
+            squad = roster[name]
+            lines.append("|".join((_field(name), _field(squad["status"]), _field(squad["loc"]))))
+    return "\n".join(lines)
+
+
+def user_message(observation_text, squads):
+    """
+    Dynamic tail of the prompt, least to most volatile.
+
+    Args:
+        observation_text: Latest hazard report
+        squads: Roster or {name: {status, type, loc, capacity, equipment}}
+    """
+    roster = squads if isinstance(squads, Roster) else Roster.from_dict(squads)
+    return (f"{roster_section(roster)}\n\n{status_section(roster)}\n\n"
+            f"INCOMING VISUAL REPORT: {observation_text}\n\n"
+            "YOUR COMMAND (respond with valid JSON only):")
+
+
+def build_messages(observation_text, squads):
+    """Chat messages for one commander decision; the system message never changes."""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_message(observation_text, squads)},
+    ]
+
@@ -0,0 +1,22 @@
+# frame_ops.py
+"""
+Frame geometry shared by the dashboard client and the vision server.
+
+Both sides must resize identically so that frames downscaled before upload
+produce the same model input as frames resized on the server.
+"""
+
+import os
+import cv2
+
+TARGET_DIM = int(os.environ.get("AEROGUARD_TARGET_DIM", "512"))   # Long-side resolution the vision models run at
+
+
+def resize_to_long_side(frame, target_dim=TARGET_DIM):
+    """Resize a frame so its longest side equals target_dim (aspect preserved)."""
+    height, width = frame.shape[:2]
+    scale = target_dim / max(height, width)
+    new_size = (int(width * scale), int(height * scale))
+    if new_size == (width, height):
+        return frame
+    return cv2.resize(frame, new_size)
@@ -0,0 +1,206 @@
+# frame_source.py
+"""
+Background video decoding for the hazard scan.
+
+A producer thread walks the clip, using VideoCapture.grab() to step over
+frames that will not be analyzed (demux + decode only, no colour conversion
+or copy into Python) and retrieving just the sampled ones. Sampled frames
+are handed to the analysis stage through a bounded queue, so decoding
+overlaps with uploads and UI updates instead of running serially with them.
+"""
+
+import queue
+import threading
+import cv2
+import numpy as np
+
+QUEUE_SIZE = 8   # Sampled frames buffered ahead of the analysis stage
+
+# --- ADAPTIVE SAMPLING ---
+CHANGE_THRESHOLD = 0.12   # Accumulated change (mean abs diff, 0-1) that triggers analysis
+MIN_INTERVAL = 8          # Never analyze frames closer together than this
+MAX_INTERVAL = 90         # Always analyze at least this often, even on static shots
+PROBE_EVERY = 4           # Decode a thumbnail for change scoring every N frames
+PROBE_SIZE = (64, 36)     # Thumbnail the change score is computed on
+
+_END = object()
+
+
+class AdaptiveSampler:
+    """
+    Scene-change-driven frame selection.
+
+    Frames are probed every PROBE_EVERY frames once MIN_INTERVAL has passed
+    since the last analyzed frame. Each probe scores the mean absolute
+    difference of a small grayscale thumbnail against the previous probe;
+    a frame is sent for analysis when the change accumulated since the last
+    analyzed frame crosses `threshold`, or when MAX_INTERVAL is reached.
+    Hovering shots are therefore sampled sparsely and fast pans densely.
+    """
+
+    def __init__(self, threshold=CHANGE_THRESHOLD, min_interval=MIN_INTERVAL,
+                 max_interval=MAX_INTERVAL, probe_every=PROBE_EVERY):
+        self.threshold = threshold
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.probe_every = max(1, probe_every)
+        self.last_sent = 0
+        self.accumulated = 0.0
+        self._prev = None
+
+    def should_probe(self, frame_number):
+        since = frame_number - self.last_sent
+        if since >= self.max_interval:
+            return True
+        return since >= self.min_interval and frame_number % self.probe_every == 0
+
+    def change_score(self, frame):
+        thumb = cv2.resize(frame, PROBE_SIZE, interpolation=cv2.INTER_AREA)
+        thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY).astype(np.int16)
+        score = 0.0 if self._prev is None else float(np.abs(thumb - self._prev).mean()) / 255.0
+        self._prev = thumb
+        return score
+
+    def decide(self, frame_number, frame):
+        """Score a probed frame; True means send it for analysis."""
+        first = self._prev is None
+        self.accumulated += self.change_score(frame)
+        if first or self.accumulated >= self.threshold or frame_number - self.last_sent >= self.max_interval:
+            self.last_sent = frame_number
+            self.accumulated = 0.0
+            return True
+        return False
+
+
+class FrameSource:
+    """
+    Iterate over every `stride`-th frame of a video, decoded on a worker thread.
+
+    Yields (frame_number, frame) with 1-based frame numbers, matching the
+    scan loop's historical `frame_count % SKIP_RATE == 0` sampling. With an
+    AdaptiveSampler the stride is replaced by scene-change-driven selection
+    and `stride` only serves as the baseline for `baseline_count`.
+    """
+
+    def __init__(self, video_path, stride=25, queue_size=QUEUE_SIZE, start_frame=0, sampler=None):
+        self.video_path = video_path
+        self.stride = max(1, stride)
+        self.start_frame = start_frame
+        self.sampler = sampler
+        self.position = start_frame   # Frames consumed from the clip so far
+        self.sampled_count = 0        # Frames handed to the analysis stage
+        self.finished = False         # Set once poll() has seen the end of the clip
+        self.error = None
+
+        cap = cv2.VideoCapture(video_path)
+        self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        cap.release()
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="frame-source", daemon=True)
+            self._thread.start()
+        return self
+
+    def _put(self, item):
+        # Block while the consumer is behind, but wake up promptly on stop()
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            if self.start_frame:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+            frame_number = self.start_frame
+            while not self._stop.is_set():
+                frame_number += 1
+                if self.sampler is not None:
+                    wanted = self.sampler.should_probe(frame_number)
+                else:
+                    wanted = frame_number % self.stride == 0
+
+                if not wanted:
+                    # Skip without retrieving the decoded image
+                    if not cap.grab():
+                        break
+                    self.position = frame_number
+                    continue
+
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                self.position = frame_number
+                if self.sampler is not None and not self.sampler.decide(frame_number, frame):
+                    continue
+                self.sampled_count += 1
+                if not self._put((frame_number, frame)):
+                    break
+        except Exception as e:
+            self.error = e
+            print(f"⚠️ DECODE ERROR: {e}")
+        finally:
+            cap.release()
+            self._put(_END)
+
+    def __iter__(self):
+        self.start()
+        while True:
+            try:
+                item = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set() or not self._thread.is_alive():
+                    return
+                continue
+            if item is _END:
+                return
+            yield item
+
+    def poll(self):
+        """
+        Non-blocking take for schedulers multiplexing several sources.
+
+        Returns:
+            tuple: (frame_number, frame), or None if no frame is ready yet.
+                   `finished` becomes True once the clip is exhausted.
+        """
+        self.start()
+        if self.finished:
+            return None
+        try:
+            item = self._queue.get_nowait()
+        except queue.Empty:
+            if self._stop.is_set() or (not self._thread.is_alive() and self._queue.empty()):
+                self.finished = True
+            return None
+        if item is _END:
+            self.finished = True
+            return None
+        return item
+
+    @property
+    def baseline_count(self):
+        """Frames a fixed `stride` sampler would have analyzed over the same span."""
+        return (self.position // self.stride) - (self.start_frame // self.stride)
+
+    def stop(self):
+        """Ask the decoder to stop; safe to call more than once."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,170 @@
+# frame_store.py
+"""
+Per-session, disk-backed store for annotated scan frames.
+
+Frames are appended to segment files on disk with an in-memory offset index,
+and a small thumbnail is encoded once at write time so the gallery never has
+to touch full-size images until one is opened. The store is bounded by a
+byte budget; when it is exceeded the oldest segment is dropped as a whole,
+which keeps every segment file strictly append-only.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import weakref
+import cv2
+import numpy as np
+
+STORE_ROOT = os.environ.get("AEROGUARD_FRAME_STORE", os.path.join(tempfile.gettempdir(), "aeroguard_frames"))
+BYTE_BUDGET = int(os.environ.get("AEROGUARD_FRAME_BUDGET_BYTES", str(64 * 1024**2)))   # 64 MB per session
+SEGMENTS_PER_BUDGET = 8     # Eviction granularity: budget / 8 per segment file
+THUMB_DIM = 192             # Long side of gallery thumbnails
+THUMB_QUALITY = 70
+
+
+def make_thumbnail(jpeg_bytes, dim=THUMB_DIM, quality=THUMB_QUALITY):
+    """Decode a JPEG at reduced size and re-encode it as a small thumbnail."""
+    arr = np.frombuffer(jpeg_bytes, np.uint8)
+    # IMREAD_REDUCED_* lets libjpeg skip most of the IDCT work for large frames
+    img = cv2.imdecode(arr, cv2.IMREAD_REDUCED_COLOR_2)
+    if img is None:
+        return b""
+    height, width = img.shape[:2]
+    scale = dim / max(height, width)
+    if scale < 1:
+        img = cv2.resize(img, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes() if ok else b""
+
+
+class FrameStore:
+    """
+    Append-only frame store with oldest-first eviction.
+
+    Frame ids are monotonically increasing and never reused, so ids held by
+    the UI stay valid until their frame is evicted.
+    """
+
+    def __init__(self, root=None, byte_budget=BYTE_BUDGET):
+        self.root = root or os.path.join(STORE_ROOT, uuid.uuid4().hex)
+        os.makedirs(self.root, exist_ok=True)
+        self.byte_budget = byte_budget
+        self.segment_limit = max(1, byte_budget // SEGMENTS_PER_BUDGET)
+
+        self._lock = threading.Lock()
+        self._index = {}        # frame_id -> (segment, offset, length, thumb_offset, thumb_length, caption)
+        self._order = []        # Live frame ids, oldest first
+        self._segments = []     # [segment_number, bytes_written], oldest first
+        self._next_id = 0
+        self.bytes_used = 0
+        self.evicted = 0
+        # Remove the session's files once its store is garbage-collected
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.root, True)
+
+    def _segment_path(self, segment):
+        return os.path.join(self.root, f"segment_{segment:05d}.bin")
+
+    def _evict_oldest_segment(self):
+        segment, size = self._segments.pop(0)
+        dropped = [fid for fid in self._order if self._index[fid][0] == segment]
+        for fid in dropped:
+            del self._index[fid]
+        self._order = self._order[len(dropped):]
+        self.bytes_used -= size
+        self.evicted += len(dropped)
+        try:
+            os.unlink(self._segment_path(segment))
+        except OSError:
+            pass
+
+    def append(self, jpeg_bytes, caption=None):
+        """Store a full-size JPEG (and its thumbnail); returns the new frame id."""
+        thumb = make_thumbnail(jpeg_bytes)
+        record_size = len(jpeg_bytes) + len(thumb)
+
+        with self._lock:
+            if not self._segments or self._segments[-1][1] + record_size > self.segment_limit:
+                number = self._segments[-1][0] + 1 if self._segments else 0
+                self._segments.append([number, 0])
+            segment = self._segments[-1]
+
+            offset = segment[1]
+            with open(self._segment_path(segment[0]), "ab") as f:
+                f.write(jpeg_bytes)
+                f.write(thumb)
+            segment[1] += record_size
+            self.bytes_used += record_size
+
+            frame_id = self._next_id
+            self._next_id += 1
+            self._index[frame_id] = (segment[0], offset, len(jpeg_bytes), offset + len(jpeg_bytes), len(thumb), caption)
+            self._order.append(frame_id)
+
+            # Oldest-first eviction, never dropping the segment just written to
+            while self.bytes_used > self.byte_budget and len(self._segments) > 1:
+                self._evict_oldest_segment()
+            return frame_id
+
+    def _read(self, segment, offset, length):
+        try:
+            with open(self._segment_path(segment), "rb") as f:
+                f.seek(offset)
+                return f.read(length)
+        except FileNotFoundError:
+            # Segment evicted between the index lookup and the read
+            return None
+
+    def read(self, frame_id):
+        """Full-size JPEG bytes for a frame, or None if it was evicted."""
+        with self._lock:
+            entry = self._index.get(frame_id)
+        if entry is None:
+            return None
+        return self._read(entry[0], entry[1], entry[2])
+
+    def thumbnail(self, frame_id):
+        with self._lock:
+            entry = self._index.get(frame_id)
+        if entry is None:
+            return None
+        return self._read(entry[0], entry[3], entry[4])
+
+    def caption(self, frame_id):
+        with self._lock:
+            entry = self._index.get(frame_id)
+        return entry[5] if entry else None
+
+    def page(self, page_number, page_size):
+        """Frame ids on one gallery page, oldest first."""
+        with self._lock:
+            start = page_number * page_size
+            return self._order[start:start + page_size]
+
+    def frame_ids(self):
+        with self._lock:
+            return list(self._order)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._order)
+
+    def clear(self):
+        """Drop every frame and start a fresh set of segments."""
+        with self._lock:
+            for segment, _ in self._segments:
+                try:
+                    os.unlink(self._segment_path(segment))
+                except OSError:
+                    pass
+            self._index.clear()
+            self._order.clear()
+            self._segments.clear()
+            self.bytes_used = 0
+            self.evicted = 0
+
+    def destroy(self):
+        self.clear()
+        self._finalizer()
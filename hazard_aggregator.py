@@ -0,0 +1,140 @@
+# hazard_aggregator.py
+"""
+Constant-memory temporal summary of per-frame hazard stats.
+
+The scan used to report whatever the last frame said. HazardAggregator folds
+every analyzed frame into EMAs, a windowed rolling max, per-hazard counts,
+time spent above the severity thresholds and a trend, and produces the
+observation string for backend.stream_commander plus a clip-level severity.
+to_dict() exposes the state for the dashboard. A resumed scan keeps its
+feeds' live aggregators, so there is no restore path.
+"""
+
+from collections import deque
+
+MODERATE_COVERAGE = 15      # Coverage % above which a frame counts as MODERATE
+CRITICAL_COVERAGE = 40      # Coverage % above which a frame counts as CRITICAL
+EMA_ALPHA = 0.2             # Smoothing for the clip-level coverage estimate
+TREND_FAST_ALPHA = 0.5
+TREND_SLOW_ALPHA = 0.1
+TREND_BAND = 2.0            # Coverage points between fast and slow EMA before calling a trend
+ROLLING_WINDOW = 30         # Samples in the rolling max window
+SUSTAINED_FRACTION = 0.2    # Share of clip time above a threshold that makes it the clip's severity
+
+
+class HazardAggregator:
+    """Streaming aggregate of frame stats; memory is bounded by ROLLING_WINDOW."""
+
+    def __init__(self):
+        self.frames = 0
+        self.duration = 0.0                 # Seconds of footage covered by analyzed samples
+        self.ema_coverage = None
+        self.ema_confidence = None
+        self.fast_ema = None
+        self.slow_ema = None
+        self.peak_coverage = 0.0
+        self.hazard_counts = {}
+        self.seconds_above = {"MODERATE": 0.0, "CRITICAL": 0.0}
+        self.last_mask_count = 0
+        self._window = deque()              # Monotonic (index, coverage) for the rolling max
+
+    @staticmethod
+    def _ema(previous, value, alpha):
+        return value if previous is None else previous + alpha * (value - previous)
+
+    def add(self, stats, dt=1.0):
+        """
+        Fold one frame's stats into the aggregate.
+
+        Args:
+            stats: Stats dict from the vision server (hazard_type, coverage_pct, ...)
+            dt: Seconds of footage this sample stands for (gap since the previous one)
+        """
+        coverage = float(stats.get("coverage_pct", 0.0))
+        confidence = stats.get("hazard_confidence")
+        hazard = str(stats.get("hazard_type", "unknown")).upper()
+
+        self.frames += 1
+        self.duration += dt
+        self.ema_coverage = self._ema(self.ema_coverage, coverage, EMA_ALPHA)
+        if isinstance(confidence, (int, float)):
+            self.ema_confidence = self._ema(self.ema_confidence, float(confidence), EMA_ALPHA)
+        self.fast_ema = self._ema(self.fast_ema, coverage, TREND_FAST_ALPHA)
+        self.slow_ema = self._ema(self.slow_ema, coverage, TREND_SLOW_ALPHA)
+        self.peak_coverage = max(self.peak_coverage, coverage)
+        self.hazard_counts[hazard] = self.hazard_counts.get(hazard, 0) + 1
+        self.last_mask_count = stats.get("mask_count", 0)
+
+        if coverage > MODERATE_COVERAGE:
+            self.seconds_above["MODERATE"] += dt
+        if coverage > CRITICAL_COVERAGE:
+            self.seconds_above["CRITICAL"] += dt
+
+        # Rolling max over the last ROLLING_WINDOW samples
+        while self._window and self._window[-1][1] <= coverage:
+            self._window.pop()
+        self._window.append((self.frames, coverage))
+        while self._window[0][0] <= self.frames - ROLLING_WINDOW:
+            self._window.popleft()
+
+    @property
+    def rolling_max(self):
+        return self._window[0][1] if self._window else 0.0
+
+    @property
+    def trend(self):
+        if self.fast_ema is None:
+            return "steady"
+        delta = self.fast_ema - self.slow_ema
+        return "rising" if delta > TREND_BAND else "falling" if delta < -TREND_BAND else "steady"
+
+    @property
+    def dominant_hazard(self):
+        if not self.hazard_counts:
+            return None
+        return max(self.hazard_counts, key=self.hazard_counts.get)
+
+    @property
+    def severity(self):
+        """Clip-level severity: sustained exposure or the smoothed level, not one frame."""
+        if not self.frames:
+            return None
+        duration = self.duration or 1.0
+        if self.ema_coverage > CRITICAL_COVERAGE or self.seconds_above["CRITICAL"] / duration >= SUSTAINED_FRACTION:
+            return "CRITICAL"
+        if (self.ema_coverage > MODERATE_COVERAGE or self.rolling_max > CRITICAL_COVERAGE
+                or self.seconds_above["MODERATE"] / duration >= SUSTAINED_FRACTION):
+            return "MODERATE"
+        return "MINOR"
+
+    def observation(self):
+        """Observation string for the commander, leading with the legacy fields."""
+        if not self.frames:
+            return None
+        mix = ", ".join(
+            f"{hazard} {100 * count // self.frames}%"
+            for hazard, count in sorted(self.hazard_counts.items(), key=lambda item: -item[1])[:3]
+        )
+        return (
+            f"Visual Scan: {self.dominant_hazard}. Coverage: {self.ema_coverage:.1f}%. "
+            f"Severity: {self.severity}. Active Masks: {self.last_mask_count}. "
+            f"Peak: {self.peak_coverage:.1f}% (recent max {self.rolling_max:.1f}%). Trend: {self.trend}. "
+            f"Time above {CRITICAL_COVERAGE}%: {self.seconds_above['CRITICAL']:.0f}s of {self.duration:.0f}s "
+            f"over {self.frames} frames. Hazard mix: {mix}."
+        )
+
+    def to_dict(self):
+        """JSON-serializable state, for rendering."""
+        return {
+            "frames": self.frames,
+            "duration": self.duration,
+            "ema_coverage": self.ema_coverage,
+            "ema_confidence": self.ema_confidence,
+            "fast_ema": self.fast_ema,
+            "slow_ema": self.slow_ema,
+            "peak_coverage": self.peak_coverage,
+            "hazard_counts": dict(self.hazard_counts),
+            "seconds_above": dict(self.seconds_above),
+            "last_mask_count": self.last_mask_count,
+            "window": [list(item) for item in self._window],
+        }
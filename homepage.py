@@ -4,17 +4,12 @@ Comprehensive landing page for the AeroGuard disaster response system
 """
 
 import streamlit as st
-import os
-import base64
+from static_assets import showcase_image_url, stylesheet_tag
 
-def get_img_as_base64(file_path):
-    if not os.path.exists(file_path): return "" # Return empty if not found
-    with open(file_path, "rb") as f: data = f.read()
-    return base64.b64encode(data).decode()
-
-img1_b64 = get_img_as_base64("images/1.jpeg")
-img2_b64 = get_img_as_base64("images/2.jpeg")
-img3_b64 = get_img_as_base64("images/3.jpeg")
+@st.cache_data(show_spinner=False)
+def get_showcase_image(file_path):
+    """Static URL of the card-sized rendition; resized once per process, not on every render"""
+    return showcase_image_url(file_path)
 
 
 def render_homepage():
@@ -22,290 +17,12 @@ def render_homepage():
     Renders the complete AeroGuard homepage with enhanced visuals and content.
     Call this function from app.py to display the homepage.
     """
+    img1_src = get_showcase_image("images/1.jpeg")
+    img2_src = get_showcase_image("images/2.jpeg")
+    img3_src = get_showcase_image("images/3.jpeg")
     
     # Custom CSS for homepage
-    st.markdown("""
-    <style>
-    /* Hero Section */
-    .hero-section {
-        background: linear-gradient(135deg, #0a1f0a 0%, #1a4d2e 50%, #0a1f0a 100%);
-        padding: 60px 40px;
-        border-radius: 15px;
-        text-align: center;
-        margin-bottom: 40px;
-        border: 2px solid #2d5a2d;
-        box-shadow: 0 10px 40px rgba(0,0,0,0.5);
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .hero-section::before {
-        content: '';
-        position: absolute;
-        top: -50%;
-        left: -50%;
-        width: 200%;
-        height: 200%;
-        background: radial-gradient(circle, rgba(125,255,125,0.03) 0%, transparent 70%);
-        animation: pulse 8s ease-in-out infinite;
-    }
-    
-    @keyframes pulse {
-        0%, 100% { opacity: 0.3; }
-        50% { opacity: 0.6; }
-    }
-    
-    .hero-title {
-        font-size: 56px;
-        font-weight: 900;
-        color: #7fff00;
-        margin-bottom: 15px;
-        text-shadow: 0 0 20px rgba(127,255,0,0.5);
-        letter-spacing: -1px;
-        position: relative;
-        z-index: 1;
-    }
-    
-    .hero-subtitle {
-        font-size: 22px;
-        color: #b0e0b0;
-        margin-bottom: 10px;
-        font-weight: 300;
-        letter-spacing: 1px;
-        position: relative;
-        z-index: 1;
-    }
-    
-    .hero-description {
-        font-size: 16px;
-        color: #90c090;
-        max-width: 800px;
-        margin: 0 auto 30px;
-        line-height: 1.8;
-        position: relative;
-        z-index: 1;
-    }
-    
-    /* Feature Cards */
-    .feature-grid {
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-        gap: 25px;
-        margin: 40px 0;
-    }
-    
-    .feature-card {
-        background: linear-gradient(145deg, #1a3a2a 0%, #0f2419 100%);
-        padding: 30px;
-        border-radius: 12px;
-        border: 1px solid #2d5a3d;
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.3);
-    }
-    
-    .feature-card:hover {
-        transform: translateY(-5px);
-        border-color: #4a8a5a;
-        box-shadow: 0 8px 25px rgba(74,138,90,0.3);
-    }
-    
-    .feature-icon {
-        font-size: 48px;
-        margin-bottom: 15px;
-        display: block;
-    }
-    
-    .feature-title {
-        font-size: 22px;
-        font-weight: 700;
-        color: #7fb069;
-        margin-bottom: 12px;
-    }
-    
-    .feature-description {
-        font-size: 15px;
-        color: #b0c0b0;
-        line-height: 1.7;
-    }
-    
-    /* Tech Specs Section */
-    .tech-section {
-        background: rgba(20, 40, 25, 0.6);
-        padding: 40px;
-        border-radius: 12px;
-        margin: 40px 0;
-        border: 1px solid #2d5a3d;
-    }
-    
-    .section-title {
-        font-size: 32px;
-        font-weight: 800;
-        color: #7fff00;
-        margin-bottom: 25px;
-        text-align: center;
-        text-transform: uppercase;
-        letter-spacing: 2px;
-    }
-    
-    .spec-grid {
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-        gap: 20px;
-        margin-top: 30px;
-    }
-    
-    .spec-item {
-        background: rgba(30, 50, 35, 0.5);
-        padding: 20px;
-        border-radius: 8px;
-        border-left: 4px solid #4a8a5a;
-    }
-    
-    .spec-label {
-        font-size: 13px;
-        color: #7fb069;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-        font-weight: 600;
-        margin-bottom: 8px;
-    }
-    
-    .spec-value {
-        font-size: 20px;
-        color: #d0e0d0;
-        font-weight: 700;
-    }
-    
-    .spec-detail {
-        font-size: 13px;
-        color: #90b090;
-        margin-top: 5px;
-    }
-    
-    /* Architecture Diagram */
-    .architecture-box {
-        background: linear-gradient(135deg, #0f1f15 0%, #1a2f25 100%);
-        padding: 30px;
-        border-radius: 12px;
-        border: 1px solid #3d6d4d;
-        margin: 30px 0;
-    }
-    
-    .arch-component {
-        background: rgba(40, 70, 50, 0.4);
-        padding: 20px;
-        border-radius: 8px;
-        margin: 15px 0;
-        border: 1px solid #4a7a5a;
-    }
-    
-    .arch-component-title {
-        font-size: 18px;
-        font-weight: 700;
-        color: #7fb069;
-        margin-bottom: 10px;
-    }
-    
-    .arch-component-desc {
-        font-size: 14px;
-        color: #b0c0b0;
-        line-height: 1.6;
-    }
-    
-    /* CTA Button */
-    .cta-container {
-        text-align: center;
-        margin: 50px 0 30px;
-    }
-    
-    .launch-button {
-        background: linear-gradient(135deg, #4a8a5a 0%, #357045 100%);
-        color: white;
-        padding: 18px 50px;
-        font-size: 20px;
-        font-weight: 700;
-        border: 2px solid #5a9a6a;
-        border-radius: 8px;
-        cursor: pointer;
-        transition: all 0.3s ease;
-        text-transform: uppercase;
-        letter-spacing: 2px;
-        box-shadow: 0 4px 15px rgba(74,138,90,0.4);
-    }
-    
-    .launch-button:hover {
-        background: linear-gradient(135deg, #5a9a6a 0%, #458055 100%);
-        transform: translateY(-2px);
-        box-shadow: 0 6px 20px rgba(74,138,90,0.6);
-    }
-    
-    /* Stats Bar */
-    .stats-bar {
-        display: flex;
-        justify-content: space-around;
-        margin: 40px 0;
-        padding: 30px;
-        background: rgba(20, 40, 25, 0.4);
-        border-radius: 10px;
-        border: 1px solid #2d5a3d;
-    }
-    
-    .stat-item {
-        text-align: center;
-    }
-    
-    .stat-number {
-        font-size: 42px;
-        font-weight: 900;
-        color: #7fff00;
-        display: block;
-        margin-bottom: 8px;
-    }
-    
-    .stat-label {
-        font-size: 14px;
-        color: #90b090;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-    }
-    
-    /* Use Cases */
-    .use-case {
-        background: linear-gradient(90deg, rgba(26,58,42,0.6) 0%, rgba(15,36,25,0.3) 100%);
-        padding: 25px 30px;
-        border-radius: 10px;
-        margin: 20px 0;
-        border-left: 5px solid #4a8a5a;
-    }
-    
-    .use-case-title {
-        font-size: 20px;
-        font-weight: 700;
-        color: #7fb069;
-        margin-bottom: 12px;
-    }
-    
-    .use-case-desc {
-        font-size: 15px;
-        color: #b0c0b0;
-        line-height: 1.7;
-    }
-    
-    /* Security Badge */
-    .security-badge {
-        display: inline-block;
-        background: rgba(139, 0, 0, 0.2);
-        color: #ff6b6b;
-        padding: 8px 20px;
-        border-radius: 20px;
-        border: 1px solid #8b0000;
-        font-size: 13px;
-        font-weight: 600;
-        letter-spacing: 1px;
-        margin-top: 15px;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(stylesheet_tag("homepage.css"), unsafe_allow_html=True)
     
     # Hero Section
     st.markdown("""
@@ -532,68 +249,10 @@ def render_homepage():
     st.markdown('<div class="section-title" style="margin-top: 60px;">System in Action</div>', unsafe_allow_html=True)
 
     st.markdown(f"""
-    <style>
-    /* Note: CSS braces are doubled {{ }} because this is a Python f-string */
-    .showcase-grid {{
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(320px, 1fr));
-        gap: 30px;
-        margin: 40px 0;
-    }}
-
-    .showcase-item {{
-        background: linear-gradient(145deg, #1a3a2a 0%, #0f2419 100%);
-        border-radius: 12px;
-        overflow: hidden;
-        border: 1px solid #2d5a3d;
-        transition: all 0.3s ease;
-    }}
-
-    .showcase-item:hover {{
-        transform: translateY(-5px);
-        box-shadow: 0 10px 30px rgba(74,138,90,0.4);
-        border-color: #4a8a5a;
-    }}
-
-    /* Updated container for the image */
-    .showcase-image-container {{
-        width: 100%;
-        height: 240px;
-        background: #0a1f0a;
-        border-bottom: 1px solid #2d5a3d;
-        overflow: hidden; /* Ensures image doesn't spill out */
-    }}
-
-    /* The actual image style */
-    .showcase-img {{
-        width: 100%;
-        height: 100%;
-        object-fit: cover; /* Ensures image fills the box without stretching */
-        display: block;
-    }}
-
-    .showcase-content {{
-        padding: 25px;
-    }}
-
-    .showcase-title {{
-        font-size: 20px;
-        font-weight: 700;
-        color: #7fb069;
-        margin-bottom: 12px;
-    }}
-
-    .showcase-description {{
-        font-size: 14px;
-        color: #b0c0b0;
-        line-height: 1.7;
-    }}
-    </style>
-
     <div class="showcase-grid">
         <div class="showcase-item">
             <div class="showcase-image-container">
-                <img src="data:image/jpeg;base64,{img1_b64}" class="showcase-img" alt="Vision Analysis">
+                <img src="{img1_src}" loading="lazy" width="960" height="480" class="showcase-img" alt="Vision Analysis">
             </div>
             <div class="showcase-content">
                 <div class="showcase-title">Real-Time Vision Analysis</div>
@@ -607,7 +266,7 @@ def render_homepage():
         
     <div class="showcase-item">
             <div class="showcase-image-container">
-                <img src="data:image/jpeg;base64,{img2_b64}" class="showcase-img" alt="Tactical Dashboard">
+                <img src="{img2_src}" loading="lazy" width="960" height="480" class="showcase-img" alt="Tactical Dashboard">
             </div>
             <div class="showcase-content">
                 <div class="showcase-title">Tactical Command Dashboard</div>
@@ -621,7 +280,7 @@ def render_homepage():
         
     <div class="showcase-item">
             <div class="showcase-image-container">
-                <img src="data:image/jpeg;base64,{img3_b64}" class="showcase-img" alt="Inference Pipeline">
+                <img src="{img3_src}" loading="lazy" width="960" height="480" class="showcase-img" alt="Inference Pipeline">
             </div>
             <div class="showcase-content">
                 <div class="showcase-title">Multi-Model Inference Pipeline</div>
@@ -0,0 +1,202 @@
+# map_layout.py
+"""
+Deterministic, incremental layout for the tactical operations map.
+
+Every location (HQ, the impact zone, numbered sectors) has a fixed anchor
+point and squads at a location occupy slots on a square spiral around it.
+A squad keeps its slot until it moves, so a deployment only repositions
+the squads that actually changed, and node objects are rebuilt only when
+a squad's state (status, location, type, highlight) differs from the last
+build. Anchors derive from the location text itself, never from Python's
+per-process hash(), so the map looks the same in every session.
+"""
+
+import hashlib
+import heapq
+import re
+
+from backend import IMPACT_SECTOR
+
+MAP_WIDTH = 1000
+MAP_HEIGHT = 700
+MARGIN = 80
+BASE_POS = (150, 150)
+IMPACT_POS = (MAP_WIDTH - 200, MAP_HEIGHT - 200)
+SECTOR_GRID = (4, 3)           # Columns x rows of sector anchors across the map
+SLOT_SPACING = 70              # Distance between neighbouring squads in a cluster
+
+_SECTOR_RE = re.compile(r"\bsector\s*(\d+)\b", re.IGNORECASE)
+_spiral = []                   # Cached slot -> (dx, dy) grid offsets, grown on demand
+
+
+def location_key(loc):
+    """Canonical cluster name for a squad location."""
+    if "base" in loc.lower():
+        return "Base"
+    match = _SECTOR_RE.search(loc)
+    if "impact" in loc.lower() or (match and int(match.group(1)) == IMPACT_SECTOR):
+        return "Impact"
+    if match:
+        return f"Sector {int(match.group(1))}"
+    return loc.strip() or "Unknown"
+
+
+def anchor_position(key):
+    """Fixed map coordinates for a cluster; numbered sectors sit on a grid, others are hashed onto it."""
+    if key == "Base":
+        return BASE_POS
+    if key == "Impact":
+        return IMPACT_POS
+    match = _SECTOR_RE.search(key)
+    if match:
+        cell = int(match.group(1))
+    else:
+        cell = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=4).digest(), "big")
+    cols, rows = SECTOR_GRID
+    col, row = (cell - 1) % cols, ((cell - 1) // cols) % rows
+    x = MARGIN + (col + 0.5) * (MAP_WIDTH - 2 * MARGIN) / cols
+    y = MARGIN + (row + 0.5) * (MAP_HEIGHT - 2 * MARGIN) / rows
+    return int(x), int(y)
+
+
+def spiral_offset(slot):
+    """Grid offset of a slot on square rings around the anchor (ring 1 has 8 slots, ring r has 8r)."""
+    while len(_spiral) <= slot:
+        index, ring = len(_spiral), 1
+        while index >= 8 * ring:
+            index -= 8 * ring
+            ring += 1
+        side, pos = divmod(index, 2 * ring)
+        _spiral.append(((-ring + pos, -ring), (ring, -ring + pos), (ring - pos, ring), (-ring, ring - pos))[side])
+    return _spiral[slot]
+
+
+class _Cluster:
+    """Slot allocator for one location: freed slots are reused lowest-first."""
+
+    def __init__(self, anchor):
+        self.anchor = anchor
+        self.next_slot = 0
+        self.free = []
+
+    def take(self):
+        if self.free:
+            return heapq.heappop(self.free)
+        self.next_slot += 1
+        return self.next_slot - 1
+
+    def release(self, slot):
+        heapq.heappush(self.free, slot)
+
+    def position(self, slot, spacing):
+        dx, dy = spiral_offset(slot)
+        return self.anchor[0] + dx * spacing, self.anchor[1] + dy * spacing
+
+
+def squad_style(loc_key, active):
+    """(color, size, border width) of a squad node."""
+    if active:
+        return "#ffa500", 35, 3
+    if loc_key == "Impact":
+        return "#cc3333", 28, 2
+    if loc_key == "Base":
+        return "#4a7c59", 25, 1
+    return "#6b8e23", 25, 1
+
+
+class TacticalMap:
+    """
+    Cached map nodes for one squad roster.
+
+    Args:
+        node_factory: Callable taking node keyword arguments (streamlit_agraph.Node, or dict)
+        spacing: Distance between squads in a cluster
+    """
+
+    def __init__(self, node_factory=dict, spacing=SLOT_SPACING):
+        self.node_factory = node_factory
+        self.spacing = spacing
+        self._clusters = {}
+        self._placed = {}          # squad -> (cluster key, slot)
+        self._squad_nodes = {}     # squad -> (state key, node)
+        self._fixed_key = None
+        self._fixed_nodes = []
+        self._nodes = []
+        self.last_changed = 0      # Squads rebuilt by the most recent build()
+
+    def _cluster(self, key):
+        cluster = self._clusters.get(key)
+        if cluster is None:
+            cluster = self._clusters[key] = _Cluster(anchor_position(key))
+        return cluster
+
+    def _place(self, name, key):
+        placed = self._placed.get(name)
+        if placed is not None:
+            if placed[0] == key:
+                return placed[1]
+            self._clusters[placed[0]].release(placed[1])
+        slot = self._cluster(key).take()
+        self._placed[name] = (key, slot)
+        return slot
+
+    def _build_fixed(self, hazard_level):
+        hazard_level = hazard_level or ""
+        if "CRITICAL" in hazard_level:
+            color, size, label = "#8b0000", 55, "IMPACT ZONE\n[CRITICAL]"
+        elif "MODERATE" in hazard_level:
+            color, size, label = "#cc5500", 45, "IMPACT ZONE\n[MODERATE]"
+        else:
+            color, size, label = "#555555", 45, "IMPACT ZONE"
+        return [
+            self.node_factory(id="Base", label="HQ", size=45, shape="box", color="#2a5a2a",
+                              font={'color': '#ffffff', 'size': 14, 'face': 'arial'},
+                              x=BASE_POS[0], y=BASE_POS[1], fixed=True),
+            self.node_factory(id="ImpactZone", label=label, size=size, shape="box", color=color,
+                              font={'color': '#ffffff', 'size': 13, 'face': 'arial'},
+                              x=IMPACT_POS[0], y=IMPACT_POS[1], fixed=True),
+        ]
+
+    def build(self, squads, active_squad=None, hazard_level=None):
+        """
+        Return the node list for the current roster, rebuilding only what changed.
+
+        Args:
+            squads: {name: {"status", "type", "loc", ...}} roster
+            active_squad: Name of the squad to highlight (last deployed)
+            hazard_level: Current hazard level, which styles the impact zone
+
+        Returns:
+            list: Nodes; the same list object is returned while nothing changes
+        """
+        changed = 0
+        fixed_key = hazard_level or ""
+        if fixed_key != self._fixed_key:
+            self._fixed_key = fixed_key
+            self._fixed_nodes = self._build_fixed(hazard_level)
+            changed += 1
+
+        for name in [n for n in self._squad_nodes if n not in squads]:
+            key, slot = self._placed.pop(name)
+            self._clusters[key].release(slot)
+            del self._squad_nodes[name]
+            changed += 1
+
+        for name, data in squads.items():
+            state = (data.get("status"), data.get("type"), data.get("loc", ""), name == active_squad)
+            cached = self._squad_nodes.get(name)
+            if cached is not None and cached[0] == state:
+                continue
+            loc_key = location_key(state[2])
+            x, y = self._cluster(loc_key).position(self._place(name, loc_key), self.spacing)
+            color, size, border_width = squad_style(loc_key, state[3])
+            node = self.node_factory(id=name, label=f"{name}\n[{state[1]}]", size=size, shape="dot", color=color,
+                                     font={'color': '#ffffff', 'size': 11, 'face': 'arial'},
+                                     borderWidth=border_width, x=x, y=y, fixed=True)
+            self._squad_nodes[name] = (state, node)
+            changed += 1
+
+        self.last_changed = changed
+        if changed:
+            self._nodes = self._fixed_nodes + [node for _, node in self._squad_nodes.values()]
+        return self._nodes
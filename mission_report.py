@@ -0,0 +1,213 @@
+# mission_report.py
+"""
+Background generation of the PDF mission report.
+
+The report used to be rebuilt with FPDF on every dashboard rerun just to
+feed the download button. ReportBuilder renders it on a worker thread only
+when the mission state changes, keyed by a content version, and keeps the
+finished PDFs on disk so reruns only look up a path. Frame thumbnails are
+read from the FrameStore one at a time while the report is written, and
+the PDF goes straight to a file rather than being held as bytes.
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPORT_DIR = os.environ.get("AEROGUARD_REPORT_DIR", os.path.join(tempfile.gettempdir(), "aeroguard_reports"))
+MAX_REPORTS = 32            # Finished reports kept on disk, oldest evicted first
+REPORT_MAX_FRAMES = 12      # Thumbnails embedded, sampled evenly across the mission
+FRAMES_PER_ROW = 3
+ERROR_RETRY_SECONDS = 30    # A failed build is reported for this long, then retried on the next request
+
+
+def sample_frame_ids(frame_ids, limit=REPORT_MAX_FRAMES):
+    """Up to `limit` ids spread evenly over the mission, always including the latest."""
+    if len(frame_ids) <= limit:
+        return list(frame_ids)
+    step = (len(frame_ids) - 1) / (limit - 1)
+    return [frame_ids[round(i * step)] for i in range(limit)]
+
+
+def report_version(observation, hazard_level, squads, log_version, frame_ids):
+    """
+    Content key of a report; changes whenever anything the report shows changes.
+
+    The command log is append-only, so its (count, newest id) version
+    identifies it without reading every entry.
+    """
+    payload = [observation, hazard_level, squads, list(log_version), list(frame_ids)]
+    return hashlib.blake2b(json.dumps(payload, sort_keys=True, default=str).encode(), digest_size=12).hexdigest()
+
+
+def _latin1(text):
+    # Core PDF fonts only cover Latin-1
+    return str(text).encode("latin-1", "replace").decode("latin-1")
+
+
+def write_report(path, state, frame_store=None):
+    """
+    Render a mission report to `path`.
+
+    Args:
+        path: Output PDF path
+        state: Dict with observation, hazard_level, squads, frame_ids, generated_at and
+            command_log, an iterable of log lines oldest first (consumed once, lazily)
+        frame_store: FrameStore the frame_ids refer to (thumbnails are skipped without it)
+    """
+    from fpdf import FPDF
+
+    generated = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(state["generated_at"]))
+
+    class PDF(FPDF):
+        def header(self):
+            self.set_font('Arial', 'B', 16)
+            self.cell(0, 10, 'AeroGuard Mission Report', 0, 1, 'C')
+            self.set_font('Arial', 'I', 10)
+            self.cell(0, 10, f'Generated: {generated}', 0, 1, 'C')
+            self.ln(5)
+
+        def footer(self):
+            self.set_y(-15)
+            self.set_font('Arial', 'I', 8)
+            self.cell(0, 10, f'Page {self.page_no()} | CONFIDENTIAL | GB10 Edge Gateway', 0, 0, 'C')
+
+    pdf = PDF()
+    pdf.add_page()
+    pdf.set_text_color(0, 0, 0)
+
+    # System Status
+    pdf.set_font('Arial', 'B', 14)
+    pdf.cell(0, 10, '1. SYSTEM STATUS', 0, 1)
+    pdf.set_font('Arial', '', 10)
+    pdf.cell(0, 6, "Latest Observation:", 0, 1)
+    pdf.multi_cell(0, 6, _latin1(state["observation"]))
+    pdf.cell(0, 6, _latin1(f"Hazard Level: {state['hazard_level']}"), 0, 1)
+    pdf.ln(5)
+
+    # Squad Assets
+    pdf.set_font('Arial', 'B', 14)
+    pdf.cell(0, 10, '2. SQUAD DEPLOYMENT STATUS', 0, 1)
+    pdf.set_font('Arial', '', 10)
+    for name, data in state["squads"].items():
+        pdf.cell(0, 6, _latin1(f"  -- {name} ({data['type']}): {data['status']} @ {data['loc']}"), 0, 1)
+    pdf.ln(5)
+
+    # Command Logs, oldest first
+    pdf.set_font('Arial', 'B', 14)
+    pdf.cell(0, 10, '3. COMMAND HISTORY', 0, 1)
+    pdf.set_font('Arial', '', 9)
+    for log in state["command_log"]:
+        pdf.multi_cell(0, 5, _latin1(log))
+        pdf.ln(1)
+
+    # Reconnaissance frames, read from disk one at a time
+    frame_ids = state.get("frame_ids") or []
+    if frame_store is not None and frame_ids:
+        pdf.add_page()
+        pdf.set_font('Arial', 'B', 14)
+        pdf.cell(0, 10, '4. RECONNAISSANCE FRAMES', 0, 1)
+        pdf.set_font('Arial', '', 8)
+        cell_w = (pdf.w - pdf.l_margin - pdf.r_margin) / FRAMES_PER_ROW
+        img_w = cell_w - 4
+        img_h = img_w * 9 / 16
+        column = 0
+        for frame_id in frame_ids:
+            thumb = frame_store.thumbnail(frame_id)
+            if not thumb:
+                continue   # Evicted since the report was requested
+            if column == 0 and pdf.get_y() + img_h + 8 > pdf.h - pdf.b_margin:
+                pdf.add_page()
+            x = pdf.l_margin + column * cell_w
+            y = pdf.get_y()
+            pdf.image(io.BytesIO(thumb), x=x, y=y, w=img_w, h=img_h)
+            pdf.set_xy(x, y + img_h + 1)
+            pdf.cell(img_w, 4, _latin1(frame_store.caption(frame_id) or f"Frame {frame_id}"), 0, 0, 'C')
+            column = (column + 1) % FRAMES_PER_ROW
+            pdf.set_xy(pdf.l_margin, y if column else y + img_h + 8)
+
+    pdf.output(path)
+
+
+class ReportBuilder:
+    """Renders reports on one worker thread; finished PDFs are cached on disk by version."""
+
+    def __init__(self, root=REPORT_DIR, max_reports=MAX_REPORTS):
+        self.root = root
+        self.max_reports = max_reports
+        os.makedirs(root, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mission-report")
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._errors = {}           # version -> (message, time of failure)
+
+    def path(self, version):
+        return os.path.join(self.root, f"mission_{version}.pdf")
+
+    def request(self, version, state, frame_store=None):
+        """Queue a build for `version` unless it is already built or in progress."""
+        if os.path.exists(self.path(version)):
+            os.utime(self.path(version))   # Keep reports in use out of eviction
+            return
+        with self._lock:
+            if version in self._pending or self._error_locked(version) is not None:
+                return
+            self._errors.pop(version, None)
+            self._pending.add(version)
+        self._executor.submit(self._build, version, state, frame_store)
+
+    def get(self, version):
+        """Path of the finished report, or None while it is pending (or failed)."""
+        path = self.path(version)
+        return path if os.path.exists(path) else None
+
+    def error(self, version):
+        """Why the last build of `version` failed, until ERROR_RETRY_SECONDS have passed."""
+        with self._lock:
+            return self._error_locked(version)
+
+    def _error_locked(self, version):
+        failure = self._errors.get(version)
+        if failure is None:
+            return None
+        if time.time() - failure[1] > ERROR_RETRY_SECONDS:
+            del self._errors[version]   # Transient failures (disk full, evicted frame) get another try
+            return None
+        return failure[0]
+
+    def _build(self, version, state, frame_store):
+        path = self.path(version)
+        tmp_path = f"{path}.{threading.get_ident()}.part"
+        try:
+            write_report(tmp_path, state, frame_store)
+            os.replace(tmp_path, path)
+            self._evict(keep=path)
+        except Exception as e:
+            print(f"⚠️ MISSION REPORT FAILED: {e}")
+            with self._lock:
+                self._errors[version] = (str(e), time.time())
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+        finally:
+            with self._lock:
+                self._pending.discard(version)
+
+    def _evict(self, keep):
+        reports = []
+        for name in os.listdir(self.root):
+            if name.endswith(".pdf"):
+                path = os.path.join(self.root, name)
+                if path != keep:
+                    reports.append((os.path.getmtime(path), path))
+        for _, path in sorted(reports)[:max(0, len(reports) + 1 - self.max_reports)]:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
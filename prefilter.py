@@ -0,0 +1,155 @@
+# prefilter.py
+"""
+Cheap frame quality gate that runs before SAM 2 + CLIP.
+
+Black frames, lens-cap frames, heavy motion blur and transition frames are
+rejected on a small grayscale thumbnail so they never reach the GPU.
+
+Blur is measured per tile as the gradient energy in the weakest of four
+directions relative to the tile's variance, and the frame scores as its
+sharpest tile. Motion blur removes detail along one direction and defocus
+along all of them, while a large flat area (sky, water) does not pull a
+sharp frame down. The thumbnail is kept large enough (480 px) that a blur
+of a few percent of the frame width is still visible on it; calibrated on
+temp_drone.jpg, a 61 px (at 1600 px) motion smear or a sigma 10 Gaussian
+blur scores below 1, sharp frames score 4 or more.
+"""
+
+import os
+import threading
+import cv2
+import numpy as np
+
+# --- THRESHOLDS (override via environment) ---
+PREFILTER_ENABLED = os.environ.get("AEROGUARD_PREFILTER", "1") != "0"
+PREFILTER_THUMB_DIM = int(os.environ.get("AEROGUARD_PREFILTER_DIM", "480"))
+SHARPNESS_GRID = 4          # Tiles per side for the blur metric
+SHARPNESS_MIN_STD = 4.0     # Tiles flatter than this (gray std dev) say nothing about blur
+PREFILTER_THRESHOLDS = {
+    "min_brightness": float(os.environ.get("AEROGUARD_MIN_BRIGHTNESS", "12")),    # mean gray level (0-255)
+    "max_brightness": float(os.environ.get("AEROGUARD_MAX_BRIGHTNESS", "245")),   # blown-out / white flash
+    "min_contrast": float(os.environ.get("AEROGUARD_MIN_CONTRAST", "6")),         # gray std dev
+    "min_sharpness": float(os.environ.get("AEROGUARD_MIN_SHARPNESS", "1.2")),     # directional gradient energy / variance
+    "min_entropy": float(os.environ.get("AEROGUARD_MIN_ENTROPY", "2.5")),         # bits, histogram entropy
+}
+
+
+def directional_sharpness(gray, grid=SHARPNESS_GRID, min_std=SHARPNESS_MIN_STD):
+    """
+    Blur metric of a grayscale image: the sharpest tile's weakest-direction gradient energy over its variance.
+
+    Returns:
+        float: Roughly 4-10 for sharp footage, below ~1 for heavy motion or defocus blur;
+               0.0 when every tile is flat
+    """
+    g = gray.astype(np.float32)
+    height, width = g.shape
+    if min(height, width) < 3 * grid:
+        grid = 1
+    th, tw = height // grid, width // grid
+
+    def tile_means(a):
+        return a[:th * grid, :tw * grid].reshape(grid, th, grid, tw).mean(axis=(1, 3))
+
+    gx = cv2.Sobel(g, cv2.CV_32F, 1, 0, ksize=3)
+    gy = cv2.Sobel(g, cv2.CV_32F, 0, 1, ksize=3)
+    energy = np.minimum.reduce([
+        tile_means(gx * gx), tile_means(gy * gy),
+        tile_means((gx + gy) ** 2) / 2, tile_means((gx - gy) ** 2) / 2,   # Diagonals
+    ])
+    variance = tile_means(g * g) - tile_means(g) ** 2
+    textured = variance >= min_std ** 2
+    if not textured.any():
+        return 0.0
+    return float((energy[textured] / variance[textured]).max())
+
+
+def frame_quality(frame, thumb_dim=PREFILTER_THUMB_DIM):
+    """
+    Compute cheap quality metrics on a downscaled grayscale copy of the frame.
+
+    Args:
+        frame: BGR (or grayscale) image as a numpy array
+        thumb_dim: Long-side size of the thumbnail the metrics are computed on
+
+    Returns:
+        dict: brightness, contrast, sharpness (see directional_sharpness), entropy
+    """
+    # Downscale first so the colour conversion only touches the thumbnail
+    height, width = frame.shape[:2]
+    scale = thumb_dim / max(height, width)
+    if scale < 1:
+        frame = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    mean, std = cv2.meanStdDev(gray)
+    sharpness = directional_sharpness(gray)
+
+    hist = cv2.calcHist([gray], [0], None, [64], [0, 256]).ravel()
+    p = hist[hist > 0] / hist.sum()
+    entropy = float(-(p * np.log2(p)).sum()) + 0.0
+
+    return {
+        "brightness": round(float(mean[0][0]), 1),
+        "contrast": round(float(std[0][0]), 1),
+        "sharpness": round(sharpness, 2),
+        "entropy": round(entropy, 2),
+    }
+
+
+def check_frame(frame, thresholds=None):
+    """
+    Decide whether a frame is worth running the models on.
+
+    Args:
+        frame: BGR image as a numpy array
+        thresholds: Optional overrides for PREFILTER_THRESHOLDS
+
+    Returns:
+        tuple: (reason: str or None, metrics: dict)
+               reason is None when the frame is usable.
+    """
+    t = dict(PREFILTER_THRESHOLDS)
+    if thresholds:
+        t.update(thresholds)
+
+    metrics = frame_quality(frame)
+
+    if metrics["brightness"] < t["min_brightness"]:
+        reason = "too dark"
+    elif metrics["brightness"] > t["max_brightness"]:
+        reason = "overexposed"
+    elif metrics["contrast"] < t["min_contrast"]:
+        reason = "low contrast"
+    elif metrics["entropy"] < t["min_entropy"]:
+        reason = "low detail"
+    elif metrics["sharpness"] < t["min_sharpness"]:
+        reason = "motion blur"
+    else:
+        reason = None
+
+    return reason, metrics
+
+
+class SkipCounter:
+    """Thread-safe tally of pre-filter decisions, reported by /health."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.skipped = {}
+
+    def record(self, reason):
+        with self._lock:
+            self.checked += 1
+            if reason:
+                self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checked": self.checked,
+                "skipped_total": sum(self.skipped.values()),
+                "skipped_by_reason": dict(self.skipped),
+            }
@@ -0,0 +1,303 @@
+# roster.py
+"""
+Indexed squad roster.
+
+Squads are stored column-wise: each squad is a row number, the status,
+type, location and equipment columns hold small integer codes into tables
+of the distinct values, and capacity is a plain list. The secondary indexes
+are bitmaps (one Python int per distinct value, bit n set for row n), so
+questions like "idle medical squads" or "who carries a lifeboat" are a few
+integer ANDs instead of scans over every squad, and the whole roster takes
+less memory than the {name: dict} layout it is built from. Query results
+are NameSet views over the resulting bitmap: membership and len() are
+single integer operations and iterating visits only the matching rows, so
+no set of names is built unless the caller asks for one. roster[name]
+returns a lightweight Squad view that answers the dict-style reads
+(squad['loc'], squad.get('type')) the dashboard, map and report code use.
+"""
+
+import json
+import sys
+from array import array
+from collections.abc import Set
+
+FIELDS = ("status", "type", "loc", "capacity", "equipment")
+INDEXED = ("status", "type", "loc")
+
+
+class Squad:
+    """View of one roster row; read like a dict, changed only through Roster.update()."""
+
+    __slots__ = ("_roster", "_row")
+
+    def __init__(self, roster, row):
+        self._roster = roster
+        self._row = row
+
+    @property
+    def name(self):
+        return self._roster._names[self._row]
+
+    @property
+    def status(self):
+        return self._roster._column_value("status", self._row)
+
+    @property
+    def type(self):
+        return self._roster._column_value("type", self._row)
+
+    @property
+    def loc(self):
+        return self._roster._column_value("loc", self._row)
+
+    @property
+    def capacity(self):
+        return self._roster._capacity[self._row]
+
+    @property
+    def equipment(self):
+        return self._roster._kits[self._roster._kit_column[self._row]]
+
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in FIELDS else default
+
+    def to_dict(self):
+        return {"status": self.status, "type": self.type, "loc": self.loc,
+                "capacity": self.capacity, "equipment": list(self.equipment)}
+
+    def __repr__(self):
+        return f"Squad({self.name!r}, {self.to_dict()!r})"
+
+
+class NameSet(Set):
+    """Read-only set of squad names backed by a row bitmap, as of the query that produced it."""
+
+    __slots__ = ("_roster", "_mask")
+
+    def __init__(self, roster, mask):
+        self._roster = roster
+        self._mask = mask
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        # Results of |, -, ^ with other sets are plain sets
+        return set(iterable)
+
+    def __contains__(self, name):
+        row = self._roster._rows.get(name)
+        return row is not None and bool(self._mask & (1 << row))
+
+    def __len__(self):
+        return self._mask.bit_count()
+
+    def __bool__(self):
+        return self._mask != 0
+
+    def __iter__(self):
+        # Walk 64-bit words so each step works on a small int, not the whole bitmap
+        names = self._roster._names
+        data = self._mask.to_bytes((self._mask.bit_length() + 7) // 8, "little")
+        for offset in range(0, len(data), 8):
+            word = int.from_bytes(data[offset:offset + 8], "little")
+            base = offset * 8
+            while word:
+                low = word & -word
+                yield names[base + low.bit_length() - 1]
+                word ^= low
+
+    def __and__(self, other):
+        if isinstance(other, NameSet) and other._roster is self._roster:
+            return NameSet(self._roster, self._mask & other._mask)
+        return super().__and__(other)
+
+    def __repr__(self):
+        return f"NameSet({sorted(self)!r})"
+
+
+class Roster:
+    """
+    Squads by name plus bitmap indexes.
+
+    Index lookups and query() return NameSet views; query() ANDs the bitmaps
+    and never materialises intermediate results.
+
+    Args:
+        squads: Iterable of (name, {status, type, loc, capacity, equipment}) pairs
+    """
+
+    def __init__(self, squads=()):
+        self._names = []
+        self._rows = {}
+        self._capacity = []
+        # Categorical columns: row -> code, code -> value, value -> code
+        self._columns = {field: array("I") for field in INDEXED}
+        self._values = {field: [] for field in INDEXED}
+        self._codes = {field: {} for field in INDEXED}
+        self._kit_column = array("I")
+        self._kits = []
+        self._kit_codes = {}
+        # Bitmaps: value -> int with bit `row` set for every matching squad
+        self._index = {field: {} for field in INDEXED}
+        self._equipment = {}
+        for name, data in squads:
+            self.add(name, **data)
+
+    @classmethod
+    def from_dict(cls, squads):
+        """Build from the {name: {status, type, loc, capacity, equipment}} layout of backend.SQUADS."""
+        return cls(squads.items())
+
+    @classmethod
+    def load(cls, path):
+        """Load a roster JSON file in the backend.SQUADS layout."""
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def to_dict(self):
+        return {name: Squad(self, row).to_dict() for name, row in self._rows.items()}
+
+    # --- Columns ---
+    def _code(self, field, value):
+        codes = self._codes[field]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self._values[field])
+            self._values[field].append(sys.intern(value))
+        return code
+
+    def _kit_code(self, equipment):
+        kit = tuple(sys.intern(item) for item in equipment)
+        code = self._kit_codes.get(kit)
+        if code is None:
+            code = self._kit_codes[kit] = len(self._kits)
+            self._kits.append(kit)
+        return code
+
+    def _column_value(self, field, row):
+        return self._values[field][self._columns[field][row]]
+
+    # --- Index maintenance ---
+    def _link(self, row):
+        bit = 1 << row
+        for field in INDEXED:
+            value = self._column_value(field, row)
+            self._index[field][value] = self._index[field].get(value, 0) | bit
+        for item in self._kits[self._kit_column[row]]:
+            item = item.lower()
+            self._equipment[item] = self._equipment.get(item, 0) | bit
+
+    def _unlink(self, row):
+        bit = 1 << row
+        for field in INDEXED:
+            value = self._column_value(field, row)
+            mask = self._index[field][value] & ~bit
+            if mask:
+                self._index[field][value] = mask
+            else:
+                del self._index[field][value]
+        for item in self._kits[self._kit_column[row]]:
+            item = item.lower()
+            mask = self._equipment[item] & ~bit
+            if mask:
+                self._equipment[item] = mask
+            else:
+                del self._equipment[item]
+
+    def add(self, name, status="Idle", type="Ground", loc="Base", capacity=0, equipment=()):
+        """Add a squad, or replace every field of an existing one."""
+        row = self._rows.get(name)
+        if row is not None:
+            self.update(name, status=status, type=type, loc=loc, capacity=capacity, equipment=equipment)
+            return
+        row = self._rows[name] = len(self._names)
+        self._names.append(name)
+        self._capacity.append(capacity)
+        for field, value in (("status", status), ("type", type), ("loc", loc)):
+            self._columns[field].append(self._code(field, value))
+        self._kit_column.append(self._kit_code(equipment))
+        self._link(row)
+
+    def update(self, name, **fields):
+        """Change a squad's fields, keeping every index in step; returns the squad."""
+        row = self._rows[name]
+        for field in fields:
+            if field not in FIELDS:
+                raise KeyError(field)
+        self._unlink(row)
+        for field, value in fields.items():
+            if field == "equipment":
+                self._kit_column[row] = self._kit_code(value)
+            elif field == "capacity":
+                self._capacity[row] = value
+            else:
+                self._columns[field][row] = self._code(field, value)
+        self._link(row)
+        return Squad(self, row)
+
+    # --- Queries ---
+    def _mask(self, field, value):
+        return self._index[field].get(value, 0)
+
+    def with_status(self, status):
+        return NameSet(self, self._mask("status", status))
+
+    def with_type(self, squad_type):
+        return NameSet(self, self._mask("type", squad_type))
+
+    def at(self, loc):
+        return NameSet(self, self._mask("loc", loc))
+
+    def carrying(self, item):
+        return NameSet(self, self._equipment.get(item.lower(), 0))
+
+    def query(self, status=None, type=None, loc=None, equipment=None):
+        """Names matching every given criterion (equipment: one item or a list, all required)."""
+        masks = []
+        for field, value in (("status", status), ("type", type), ("loc", loc)):
+            if value is not None:
+                masks.append(self._mask(field, value))
+        if equipment is not None:
+            masks.extend(self._equipment.get(item.lower(), 0)
+                         for item in ([equipment] if isinstance(equipment, str) else equipment))
+        if not masks:
+            return NameSet(self, (1 << len(self._names)) - 1)
+        mask = masks[0]
+        for other in masks[1:]:
+            mask &= other
+        return NameSet(self, mask)
+
+    def count(self, status):
+        return self._mask("status", status).bit_count()
+
+    @property
+    def active_count(self):
+        """Squads not idle at base."""
+        return len(self._names) - self.count("Idle")
+
+    # --- Mapping-style access ---
+    def __getitem__(self, name):
+        return Squad(self, self._rows[name])
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get(self, name, default=None):
+        row = self._rows.get(name)
+        return default if row is None else Squad(self, row)
+
+    def items(self):
+        return ((name, Squad(self, row)) for name, row in self._rows.items())
+
+    def values(self):
+        return (Squad(self, row) for row in self._rows.values())
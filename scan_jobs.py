@@ -0,0 +1,337 @@
+# scan_jobs.py
+"""
+Background hazard-scan jobs.
+
+Scans run on worker threads owned by a process-wide ScanJobManager, so a
+Streamlit rerun or browser refresh no longer kills them. The UI polls a
+job's snapshot for progress and partial results, can cancel it, and can
+resume a cancelled or failed job from the last frame it processed.
+
+A job may scan several feeds at once (uploaded clips or local video paths
+standing in for RTSP streams). Each feed decodes into its own bounded queue
+and frames are interleaved into the shared vision pipeline by smooth
+weighted round-robin, with feeds showing more severe hazards weighted up.
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import vision
+from frame_source import AdaptiveSampler, FrameSource
+from hazard_aggregator import HazardAggregator
+
+SKIP_RATE = 25             # Fixed sampling stride (baseline when adaptive sampling is on)
+ADAPTIVE_SAMPLING = True   # Sample on scene change; SKIP_RATE becomes the baseline
+MAX_ERRORS = 10            # Frame processing errors before a feed gives up
+MAX_CONCURRENT_SCANS = 2
+JOB_TTL = 3600             # Seconds a finished job is kept for reattaching sessions
+CANCEL_WAIT = 10.0         # Seconds cancel(wait=True) waits for a running worker to stop
+
+# Scheduling weight per feed, by that feed's aggregated severity
+SEVERITY_WEIGHTS = {None: 1, "MINOR": 1, "MODERATE": 2, "CRITICAL": 4}
+SEVERITY_RANK = {None: 0, "MINOR": 1, "MODERATE": 2, "CRITICAL": 3}
+
+
+class FeedState:
+    """Per-feed progress and latest result within a scan job."""
+
+    def __init__(self, name, video_path):
+        self.name = name
+        self.video_path = video_path
+        self.status = "queued"     # queued | running | completed | failed
+        self.frame_offset = 0      # Last clip frame whose result was recorded (resume point)
+        self.position = 0          # Last clip frame decoded
+        self.total_frames = 0
+        self.analyzed = 0
+        self.baseline = 0
+        self.skipped = 0
+        self.errors = 0
+        self.latest_image = None
+        self.latest_stats = None
+        self.fps = 0.0
+        # Whole-feed hazard summary (severity + observation); kept on the feed, so a resume continues it
+        self.aggregator = HazardAggregator()
+
+    @property
+    def hazard_level(self):
+        return self.aggregator.severity
+
+    def snapshot(self):
+        return {
+            "name": self.name,
+            "status": self.status,
+            "frame_offset": self.frame_offset,
+            "position": self.position,
+            "total_frames": self.total_frames,
+            "progress": min(self.position / self.total_frames, 1.0) if self.total_frames else 0.0,
+            "analyzed": self.analyzed,
+            "baseline": self.baseline,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "hazard_level": self.aggregator.severity,
+            "observation": self.aggregator.observation(),
+            "ema_coverage": self.aggregator.ema_coverage,
+            "aggregate": self.aggregator.to_dict(),
+        }
+
+
+class ScanJob:
+    """State of one scan; mutated by its worker thread, read via snapshot()."""
+
+    def __init__(self, job_id, video_paths, frame_store, names=None, stride=SKIP_RATE, adaptive=ADAPTIVE_SAMPLING):
+        self.id = job_id
+        if isinstance(video_paths, str):
+            video_paths = [video_paths]
+        names = names or [os.path.basename(path) for path in video_paths]
+        self.feeds = [FeedState(name, path) for name, path in zip(names, video_paths)]
+        self.frame_store = frame_store
+        self.stride = stride
+        self.adaptive = adaptive
+
+        self.status = "queued"     # queued | running | completed | cancelled | failed
+        self.latest_image = None
+        self.latest_stats = None
+        self.message = ""
+        self.started_at = None
+        self.finished_at = None
+        self.updated_at = time.time()
+
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._store_lock = threading.Lock()   # Held while the worker writes a frame to frame_store
+        self._done = threading.Event()        # Set when the worker has stopped
+
+    def update(self, feed=None, **fields):
+        """Set job fields, or fields of one feed when `feed` is given."""
+        with self._lock:
+            target = feed if feed is not None else self
+            for key, value in fields.items():
+                setattr(target, key, value)
+            self.updated_at = time.time()
+
+    def record(self, feed, frame_number, stats):
+        """Fold an analyzed frame into its feed's aggregate."""
+        with self._lock:
+            gap = frame_number - feed.frame_offset
+            dt = gap / feed.fps if feed.fps else 1.0
+            feed.aggregator.add(stats, dt=dt)
+            feed.analyzed += 1
+            feed.frame_offset = frame_number
+            feed.latest_stats = stats
+            self.latest_stats = stats
+            self.updated_at = time.time()
+
+    def snapshot(self):
+        """Consistent copy of the job's public state for rendering."""
+        with self._lock:
+            feeds = [feed.snapshot() for feed in self.feeds]
+            # Job-level hazard follows the most severe feed's whole-clip aggregate
+            worst = max(feeds, key=lambda f: (SEVERITY_RANK[f["hazard_level"]], f["ema_coverage"] or 0.0))
+            position = sum(f["position"] for f in feeds)
+            total = sum(f["total_frames"] for f in feeds)
+            elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+            analyzed = sum(f["analyzed"] for f in feeds)
+            return {
+                "id": self.id,
+                "status": self.status,
+                "feeds": feeds,
+                "position": position,
+                "total_frames": total,
+                "progress": min(position / total, 1.0) if total else 0.0,
+                "analyzed": analyzed,
+                "baseline": sum(f["baseline"] for f in feeds),
+                "skipped": sum(f["skipped"] for f in feeds),
+                "errors": sum(f["errors"] for f in feeds),
+                "frames_per_second": analyzed / elapsed if elapsed else 0.0,
+                "latest_image": self.latest_image,
+                "latest_stats": self.latest_stats,
+                "hazard_level": worst["hazard_level"],
+                "observation": worst["observation"],
+                "message": self.message,
+                "updated_at": self.updated_at,
+            }
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def cancel(self):
+        """Stop the scan; once this returns the job writes nothing more to its frame store."""
+        self._cancel.set()
+        with self._store_lock:
+            pass   # Let a frame being written finish; the worker checks _cancel before the next one
+
+    def wait(self, timeout=None):
+        """Block until the worker has stopped; returns False on timeout."""
+        return self._done.wait(timeout)
+
+
+def interleave_feeds(feeds, sources, cancel_event, idle_wait=0.005):
+    """
+    Merge several FrameSources into one stream using smooth weighted round-robin.
+
+    Only feeds with a decoded frame ready compete, so a slow decoder never
+    stalls the others; each feed's weight follows its aggregated severity.
+
+    Yields:
+        tuple: (feed_index, frame_number, frame)
+    """
+    heads = [None] * len(sources)
+    credit = [0] * len(sources)
+    while not cancel_event.is_set():
+        for i, source in enumerate(sources):
+            if heads[i] is None and not source.finished:
+                heads[i] = source.poll()
+
+        ready = [i for i, head in enumerate(heads) if head is not None]
+        if not ready:
+            if all(source.finished for source in sources):
+                return
+            time.sleep(idle_wait)
+            continue
+
+        weights = {i: SEVERITY_WEIGHTS[feeds[i].hazard_level] for i in ready}
+        for i in ready:
+            credit[i] += weights[i]
+        pick = max(ready, key=lambda i: credit[i])
+        credit[pick] -= sum(weights.values())
+
+        frame_number, frame = heads[pick]
+        heads[pick] = None
+        yield pick, frame_number, frame
+
+
+class ScanJobManager:
+    """Runs scan jobs on a small thread pool; shared by every browser session."""
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_SCANS):
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="scan-job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def submit(self, video_paths, frame_store, **options):
+        """Start scanning one clip path or a list of feed paths; returns the new job id."""
+        job = ScanJob(uuid.uuid4().hex[:12], video_paths, frame_store, **options)
+        with self._lock:
+            # Forget long-finished jobs so their frame stores can be released
+            cutoff = time.time() - JOB_TTL
+            for old_id in [j.id for j in self._jobs.values() if not j.active and j.updated_at < cutoff]:
+                del self._jobs[old_id]
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job.id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_paths(self):
+        """Video paths that queued or running jobs have open."""
+        with self._lock:
+            return {feed.video_path for job in self._jobs.values() if job.active for feed in job.feeds}
+
+    def cancel(self, job_id, wait=False):
+        """
+        Cancel a job.
+
+        Args:
+            wait: Also wait (up to CANCEL_WAIT seconds) for a running worker to stop
+
+        Returns:
+            bool: False only if the worker was still running when the wait ran out
+        """
+        job = self.get(job_id)
+        if job is None:
+            return True
+        job.cancel()
+        if wait and job.started_at is not None:
+            return job.wait(CANCEL_WAIT)
+        return True
+
+    def resume(self, job_id):
+        """Restart a cancelled or failed job from the last frame each feed processed."""
+        job = self.get(job_id)
+        if job is None or job.active or job.status == "completed":
+            return False
+        job._cancel.clear()
+        job._done.clear()
+        job.update(status="queued", message="")
+        for feed in job.feeds:
+            if feed.status != "completed":
+                job.update(feed, status="queued", errors=0)
+        self._executor.submit(self._run, job)
+        return True
+
+    def _run(self, job):
+        job.update(status="running", started_at=time.time(), finished_at=None)
+        feeds = [feed for feed in job.feeds if feed.status != "completed"]
+        sources = []
+        for feed in feeds:
+            sampler = AdaptiveSampler() if job.adaptive else None
+            source = FrameSource(feed.video_path, stride=job.stride, sampler=sampler, start_frame=feed.frame_offset)
+            sources.append(source)
+            job.update(feed, status="running", total_frames=source.total_frames, fps=source.fps)
+
+        def sampled_frames():
+            for index, frame_number, frame in interleave_feeds(feeds, sources, job._cancel):
+                feed = feeds[index]
+                if feed.status != "running":
+                    continue
+                job.update(feed, position=frame_number)
+                # Raw frame: the client downscales it and picks shared memory or HTTP
+                yield (index, frame_number), frame
+
+        try:
+            # Pipelined: the next frames are already on the server while this result is recorded
+            for (index, frame_number), processed_img_bytes, stats in vision.get_client().stream(sampled_frames()):
+                feed = feeds[index]
+                if stats and stats.get('skipped'):
+                    job.update(feed, skipped=feed.skipped + 1, frame_offset=frame_number)
+                    continue
+
+                if processed_img_bytes and stats:
+                    caption = f"Frame {frame_number}" if len(job.feeds) == 1 else f"{feed.name} · Frame {frame_number}"
+                    with job._store_lock:
+                        # Results still in flight at cancel are dropped; a resume re-analyzes them
+                        if job._cancel.is_set():
+                            break
+                        # Written to disk with a thumbnail; oldest frames evicted past the byte budget
+                        job.frame_store.append(processed_img_bytes, caption=caption)
+
+                    job.record(feed, frame_number, stats)
+                    job.update(latest_image=processed_img_bytes)
+                else:
+                    job.update(feed, errors=feed.errors + 1, frame_offset=frame_number)
+                    if feed.errors >= MAX_ERRORS:
+                        # Give up on this feed only; the others keep going
+                        job.update(feed, status="failed")
+                        sources[index].stop()
+                        if all(f.status == "failed" for f in feeds):
+                            break
+
+            for feed, source in zip(feeds, sources):
+                job.update(feed, baseline=feed.baseline + source.baseline_count)
+                if feed.status == "running" and not job._cancel.is_set():
+                    job.update(feed, status="completed", frame_offset=source.position)
+
+            failed = [feed.name for feed in job.feeds if feed.status == "failed"]
+            analyzed = sum(feed.analyzed for feed in job.feeds)
+            if job._cancel.is_set():
+                job.update(status="cancelled", message="Scan cancelled. "
+                           + ", ".join(f"{feed.name} at frame {feed.frame_offset}" for feed in feeds) + ".")
+            elif failed:
+                job.update(status="failed", message=f"Too many frame processing errors ({MAX_ERRORS}) on {', '.join(failed)}. Stopping scan.")
+            else:
+                job.update(status="completed", message=f"Scan Complete. Processed {analyzed} frames.")
+
+        except Exception as e:
+            print(f"⚠️ SCAN JOB {job.id} FAILED: {e}")
+            job.update(status="failed", message=f"Scan failed: {e}")
+        finally:
+            for source in sources:
+                source.stop()
+            job.update(finished_at=time.time())
+            job._done.set()
@@ -0,0 +1,180 @@
+# shm_transport.py
+"""
+Shared-memory frame ring for a dashboard and vision server on the same host.
+
+The client owns one shared-memory segment split into fixed slots. Each slot
+holds an input area for the raw BGR frame and an output area the server
+writes the annotated frame into, so only a slot index travels over HTTP.
+
+The server only maps segments that carry the ring's own name prefix and
+that a loopback client announced first, and it keeps a bounded number of
+them mapped, closing the least recently used and any left idle.
+"""
+
+import os
+import queue
+import secrets
+import socket
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from multiprocessing import shared_memory, resource_tracker
+
+RING_PREFIX = "aeroguard_ring_"
+MAX_SEGMENTS = 16              # Client rings a server keeps mapped at once
+SEGMENT_IDLE_SECONDS = 120.0   # Unused this long, a mapping is closed
+
+
+def slot_size(dim):
+    """Bytes per slot: one dim x dim BGR input area plus one output area."""
+    return 2 * dim * dim * 3
+
+
+def input_view(buf, slot, dim, shape):
+    """Zero-copy numpy view of a slot's input frame."""
+    return np.ndarray(shape, dtype=np.uint8, buffer=buf, offset=slot * slot_size(dim))
+
+
+def output_view(buf, slot, dim, shape):
+    """Zero-copy numpy view of a slot's annotated output frame."""
+    return np.ndarray(shape, dtype=np.uint8, buffer=buf, offset=slot * slot_size(dim) + dim * dim * 3)
+
+
+def host_id():
+    """Identify this machine so a client can tell whether the server is co-located."""
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            boot_id = f.read().strip()
+    except OSError:
+        boot_id = ""
+    return f"{socket.gethostname()}:{boot_id}"
+
+
+def is_loopback_host(host):
+    return host in ("localhost", "127.0.0.1", "::1", socket.gethostname())
+
+
+def is_loopback(url):
+    return is_loopback_host(url.split("://", 1)[-1].split("/", 1)[0].rsplit(":", 1)[0].strip("[]"))
+
+
+def is_ring_name(name):
+    """Segment names a FrameRing creates: RING_PREFIX plus a pid and random suffix, nothing else."""
+    suffix = name[len(RING_PREFIX):] if isinstance(name, str) and name.startswith(RING_PREFIX) else ""
+    return bool(suffix) and len(name) <= 64 and all(c.isalnum() or c == "_" for c in suffix)
+
+
+class FrameRing:
+    """Client-side ring of shared-memory frame slots."""
+
+    def __init__(self, slots, dim):
+        self.slots = slots
+        self.dim = dim
+        name = f"{RING_PREFIX}{os.getpid()}_{secrets.token_hex(6)}"
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=slots * slot_size(dim))
+        self.name = self.shm.name
+        self._free = queue.Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+
+    def acquire(self, timeout=None):
+        """Reserve a free slot, or return None if none frees up in time."""
+        try:
+            return self._free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def release(self, slot):
+        self._free.put(slot)
+
+    def fits(self, frame):
+        return frame.ndim == 3 and frame.shape[2] == 3 and max(frame.shape[:2]) <= self.dim
+
+    def write_frame(self, slot, frame):
+        input_view(self.shm.buf, slot, self.dim, frame.shape)[...] = frame
+
+    def read_result(self, slot, shape):
+        return output_view(self.shm.buf, slot, self.dim, tuple(shape))
+
+    def close(self):
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SegmentCache:
+    """
+    Server-side cache of client segments, attached once and reused per frame.
+
+    Args:
+        max_segments: Mappings kept open; the least recently used idle one is closed beyond this
+        idle_seconds: Mappings unused for this long are closed
+    """
+
+    def __init__(self, max_segments=MAX_SEGMENTS, idle_seconds=SEGMENT_IDLE_SECONDS):
+        self.max_segments = max_segments
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._announced = OrderedDict()   # name -> time announced
+        self._segments = OrderedDict()    # name -> [segment, last used, requests using it]
+
+    def announce(self, name):
+        """Allow a client's ring to be attached; callers must only accept this from loopback clients."""
+        if not is_ring_name(name):
+            raise ValueError(f"not a frame ring segment: {name!r}")
+        with self._lock:
+            self._announced[name] = time.monotonic()
+            self._announced.move_to_end(name)
+            while len(self._announced) > 4 * self.max_segments:
+                self._announced.popitem(last=False)
+
+    def acquire(self, name):
+        """Attach (or reuse) an announced segment for one request; pair with release()."""
+        with self._lock:
+            entry = self._segments.get(name)
+            if entry is None:
+                if name not in self._announced:
+                    raise PermissionError(f"segment {name!r} was not announced")
+                segment = shared_memory.SharedMemory(name=name)
+                # The client owns the segment; stop our resource tracker from unlinking it on exit
+                try:
+                    resource_tracker.unregister(segment._name, "shared_memory")
+                except Exception:
+                    pass
+                entry = self._segments[name] = [segment, 0.0, 0]
+            entry[1] = time.monotonic()
+            entry[2] += 1
+            self._segments.move_to_end(name)
+            return entry[0]
+
+    def release(self, name):
+        with self._lock:
+            entry = self._segments[name]
+            entry[1] = time.monotonic()
+            entry[2] -= 1
+            self._evict()
+
+    def close_idle(self):
+        """Close mappings no client has used recently."""
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        now = time.monotonic()
+        for name in list(self._segments):
+            segment, last_used, users = self._segments[name]
+            if users or (len(self._segments) <= self.max_segments and now - last_used < self.idle_seconds):
+                continue
+            try:
+                segment.close()
+            except BufferError:
+                continue   # A frame view is still alive; retry on a later pass
+            # Stays announced: the client keeps its ring and may send another frame after a pause
+            del self._segments[name]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._segments)
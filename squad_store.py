@@ -0,0 +1,198 @@
+# squad_store.py
+"""
+Shared, versioned squad state.
+
+Squad rosters used to live in each browser session as a shallow copy of
+backend.SQUADS, so every session mutated the same nested dicts without
+locking and nothing survived a restart. SquadStore keeps one roster per
+mission in SQLite (WAL mode). Every squad row carries a version number and
+all writes are compare-and-set against it, so concurrent deployments from
+several operator sessions either apply on top of each other or are
+rejected; they are never silently lost. Each mission also has a version
+that bumps on any change.
+
+Readers poll that version instead of being pushed changes: a Streamlit
+session can only re-render from its own script thread, so a callback run on
+another operator's writer thread could not refresh the map, the report or
+the commander anyway. The dashboard checks version() every
+SQUAD_SYNC_SECONDS (one indexed SELECT) and takes a new snapshot() only
+when it has moved.
+"""
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+
+DB_PATH = os.environ.get("AEROGUARD_SQUAD_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "aeroguard_squads.db"))
+MAX_CAS_RETRIES = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS missions (
+    mission_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS squads (
+    mission_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (mission_id, name)
+);
+"""
+
+SquadSnapshot = namedtuple("SquadSnapshot", ["version", "squads", "versions"])
+
+
+class SquadConflict(Exception):
+    """A compare-and-set update kept losing to concurrent writers."""
+
+
+class SquadStore:
+    """
+    Per-mission squad rosters with optimistic concurrency.
+
+    Args:
+        path: SQLite database file
+        defaults: Roster a new mission starts from (deep-copied, never mutated)
+    """
+
+    def __init__(self, path=DB_PATH, defaults=None):
+        self.path = path
+        self.defaults = copy.deepcopy(defaults or {})
+        self._local = threading.local()
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; write transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Reads ---
+    def ensure_mission(self, mission_id):
+        """Seed a mission with the default roster the first time it is seen."""
+        conn = self._connect()
+        if conn.execute("SELECT 1 FROM missions WHERE mission_id = ?", (mission_id,)).fetchone():
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR IGNORE INTO missions (mission_id, version) VALUES (?, 1)", (mission_id,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO squads (mission_id, name, data, version) VALUES (?, ?, ?, 1)",
+                [(mission_id, name, json.dumps(data)) for name, data in self.defaults.items()],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def version(self, mission_id):
+        """Mission version; changes whenever any of its squads does (0 if unknown)."""
+        row = self._connect().execute("SELECT version FROM missions WHERE mission_id = ?", (mission_id,)).fetchone()
+        return row[0] if row else 0
+
+    def snapshot(self, mission_id):
+        """
+        Consistent copy of a mission's roster.
+
+        Returns:
+            SquadSnapshot: (mission version, {name: squad dict}, {name: squad version});
+            the dicts are private copies, so mutating them changes nothing
+        """
+        self.ensure_mission(mission_id)
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            version = conn.execute("SELECT version FROM missions WHERE mission_id = ?", (mission_id,)).fetchone()[0]
+            rows = conn.execute(
+                "SELECT name, data, version FROM squads WHERE mission_id = ? ORDER BY rowid", (mission_id,)
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        return SquadSnapshot(
+            version,
+            {name: json.loads(data) for name, data, _ in rows},
+            {name: squad_version for name, _, squad_version in rows},
+        )
+
+    def get(self, mission_id, name):
+        """(squad dict, squad version), or (None, None) for an unknown squad."""
+        self.ensure_mission(mission_id)
+        row = self._connect().execute(
+            "SELECT data, version FROM squads WHERE mission_id = ? AND name = ?", (mission_id, name)
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else (None, None)
+
+    # --- Writes ---
+    def compare_and_set(self, mission_id, name, expected_version, data):
+        """
+        Replace a squad's state only if it is still at `expected_version`.
+
+        Returns:
+            int or None: The squad's new version, or None if another writer got there first
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            updated = conn.execute(
+                "UPDATE squads SET data = ?, version = version + 1 WHERE mission_id = ? AND name = ? AND version = ?",
+                (json.dumps(data), mission_id, name, expected_version),
+            ).rowcount
+            if not updated:
+                conn.execute("ROLLBACK")
+                return None
+            conn.execute("UPDATE missions SET version = version + 1 WHERE mission_id = ?", (mission_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return expected_version + 1
+
+    def update(self, mission_id, name, change, retries=MAX_CAS_RETRIES):
+        """
+        Apply `change(squad_dict) -> squad_dict` atomically, re-reading and retrying on conflict.
+
+        Returns:
+            tuple: (new squad dict, new version)
+
+        Raises:
+            KeyError: Unknown squad
+            SquadConflict: Still conflicting after `retries` attempts
+        """
+        for _ in range(retries):
+            data, version = self.get(mission_id, name)
+            if data is None:
+                raise KeyError(name)
+            new_data = change(data)
+            new_version = self.compare_and_set(mission_id, name, version, new_data)
+            if new_version is not None:
+                return new_data, new_version
+        raise SquadConflict(f"{name}: {retries} concurrent updates in a row")
+
+    def deploy(self, mission_id, name, location, expected_version=None):
+        """
+        Mark a squad deployed to `location`.
+
+        Args:
+            expected_version: Squad version the decision was based on; if the squad has
+                changed since (another operator moved it), the deployment is refused
+
+        Returns:
+            tuple: (success: bool, message: str), as backend.update_squad_state
+        """
+        data, version = self.get(mission_id, name)
+        if data is None:
+            return False, f"Unknown squad: {name}"
+        if expected_version is not None and version != expected_version:
+            return False, f"⚠️ {name} was reassigned by another operator ({data['status']} @ {data['loc']}); deployment not applied"
+        data.update(status="Deployed", loc=location)
+        if self.compare_and_set(mission_id, name, version, data) is None:
+            return False, f"⚠️ {name} changed during deployment; deployment not applied"
+        return True, f"✓ {name} deployed to {location}"
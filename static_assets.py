@@ -0,0 +1,84 @@
+# static_assets.py
+"""
+Stylesheets and browser-cacheable images for the Streamlit pages.
+
+Showcase images are resized once to WebP under ./static and served by
+Streamlit's static file serving (server.enableStaticServing) at
+app/static/. Every URL carries a ?v=<content hash> query, which makes
+Tornado's static handler send long-lived Cache-Control headers and busts
+the cache whenever the file changes, so pages ship a short <img> tag per
+rerun instead of a base64 image.
+
+Stylesheets cannot go the same way: the static handler sends .css as
+text/plain with X-Content-Type-Options: nosniff, and browsers refuse to
+apply it. They live in ./styles and are inlined as a <style> block, read
+from disk once per process.
+"""
+
+import hashlib
+import os
+
+import streamlit as st
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STYLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "styles")
+STATIC_URL = "app/static"
+GENERATED_DIR = "generated"          # Subfolder of STATIC_DIR for resized images (not committed)
+SHOWCASE_SIZE = (960, 480)           # 2x the 240px-high showcase card, cropped to fill
+SHOWCASE_QUALITY = 80
+
+_versions = {}   # static-relative path -> (mtime, version hash)
+
+
+def _file_version(path):
+    mtime = os.path.getmtime(path)
+    cached = _versions.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, "rb") as f:
+        version = hashlib.blake2b(f.read(), digest_size=6).hexdigest()
+    _versions[path] = (mtime, version)
+    return version
+
+
+def static_url(name):
+    """Versioned URL for a file under STATIC_DIR."""
+    return f"{STATIC_URL}/{name}?v={_file_version(os.path.join(STATIC_DIR, name))}"
+
+
+@st.cache_resource
+def stylesheet_tag(name):
+    """<style> block with a stylesheet under STYLES_DIR, read once per process."""
+    with open(os.path.join(STYLES_DIR, name), encoding="utf-8") as f:
+        return f"<style>\n{f.read()}\n</style>"
+
+
+def showcase_image_url(source_path, size=SHOWCASE_SIZE, quality=SHOWCASE_QUALITY):
+    """
+    Resize a source image to the showcase card size and return its static URL.
+
+    The WebP rendition is written once per source version and reused after.
+
+    Args:
+        source_path: Full-size source image (e.g. images/1.jpeg)
+        size: (width, height) of the rendition; the image is center-cropped to fill it
+        quality: WebP quality
+
+    Returns:
+        str: Versioned URL, or "" if the source image is missing
+    """
+    if not os.path.exists(source_path):
+        return ""
+    from PIL import Image, ImageOps
+
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    name = f"{GENERATED_DIR}/{stem}.{_file_version(source_path)}.{size[0]}x{size[1]}.webp"
+    target = os.path.join(STATIC_DIR, name)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with Image.open(source_path) as img:
+            rendition = ImageOps.fit(img.convert("RGB"), size, Image.LANCZOS)
+        tmp_path = f"{target}.{os.getpid()}.part"
+        rendition.save(tmp_path, "WEBP", quality=quality, method=6)
+        os.replace(tmp_path, target)
+    return static_url(name)
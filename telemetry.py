@@ -0,0 +1,180 @@
+# telemetry.py
+"""
+Background hardware telemetry for the dashboard sidebar.
+
+A single sampler thread polls GPU load and memory through NVML when it is
+available (on unified-memory parts such as GB10, where NVML has no memory
+figure, GPU memory comes from torch or /proc/meminfo instead), plus host CPU, load average and process RSS from /proc, and
+keeps a short ring buffer of samples. Dashboard reruns only read that
+buffer, so rendering never touches the driver or forks nvidia-smi.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
+
+SAMPLE_INTERVAL = float(os.environ.get("AEROGUARD_TELEMETRY_INTERVAL", "1.0"))   # Seconds between samples
+HISTORY_SIZE = 120                                                                 # Samples kept for sparklines
+
+
+def _read_cpu_times():
+    """(busy, total) jiffies across all CPUs from /proc/stat."""
+    with open("/proc/stat") as f:
+        fields = [int(v) for v in f.readline().split()[1:]]
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)   # idle + iowait
+    total = sum(fields[:8])                                    # guest time is already counted in user
+    return total - idle, total
+
+
+def _read_meminfo():
+    """(used, total) bytes of system memory from /proc/meminfo."""
+    fields = {}
+    with open("/proc/meminfo") as f:
+        for line in f:
+            key, value = line.split(":", 1)
+            fields[key] = int(value.split()[0]) * 1024
+    total = fields["MemTotal"]
+    return total - fields.get("MemAvailable", fields.get("MemFree", 0)), total
+
+
+def _read_rss_bytes():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+class TelemetrySampler:
+    """
+    Polls hardware stats on a daemon thread into a fixed-size history.
+
+    Every field of a sample may be None when its source is unavailable
+    (no NVML, no /proc), so readers never need their own fallbacks.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, history=HISTORY_SIZE):
+        self.interval = interval
+        self.device_name = "Simulation Mode"
+        self._history = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._gpu = None
+        self._nvml_memory = True   # False once NVML reports memory info as unsupported
+        self._cpu_prev = None
+
+    def _init_gpu(self):
+        if pynvml is None:
+            return
+        try:
+            pynvml.nvmlInit()
+            self._gpu = pynvml.nvmlDeviceGetHandleByIndex(0)
+            name = pynvml.nvmlDeviceGetName(self._gpu)
+            self.device_name = name.decode() if isinstance(name, bytes) else name
+        except Exception as e:
+            print(f"⚠️ NVML unavailable, GPU telemetry disabled: {e}")
+            self._gpu = None
+
+    def _sample_gpu(self, sample):
+        if self._gpu is None:
+            return
+        try:
+            util = pynvml.nvmlDeviceGetUtilizationRates(self._gpu)
+            sample["gpu_load"] = float(util.gpu)
+        except Exception:
+            pass
+        if self._nvml_memory:
+            try:
+                mem = pynvml.nvmlDeviceGetMemoryInfo(self._gpu)
+                sample["gpu_mem_used"] = mem.used
+                sample["gpu_mem_total"] = mem.total
+                return
+            except pynvml.NVMLError_NotSupported:
+                # Unified-memory parts (e.g. GB10) report no dedicated framebuffer
+                self._nvml_memory = False
+            except Exception:
+                return
+        self._sample_unified_memory(sample)
+
+    def _sample_unified_memory(self, sample):
+        """GPU memory on parts that share system memory: torch's view if CUDA is up, else /proc/meminfo."""
+        torch = sys.modules.get("torch")
+        try:
+            if torch is not None and torch.cuda.is_initialized():
+                free, total = torch.cuda.mem_get_info()
+                used = total - free
+            else:
+                used, total = _read_meminfo()
+        except Exception:
+            return
+        sample["gpu_mem_used"] = used
+        sample["gpu_mem_total"] = total
+        sample["gpu_mem_unified"] = True
+
+    def _sample_host(self, sample):
+        try:
+            busy, total = _read_cpu_times()
+            if self._cpu_prev is not None and total > self._cpu_prev[1]:
+                sample["cpu_load"] = 100.0 * (busy - self._cpu_prev[0]) / (total - self._cpu_prev[1])
+            self._cpu_prev = (busy, total)
+            sample["rss"] = _read_rss_bytes()
+        except OSError:
+            pass
+        try:
+            sample["load_avg"] = os.getloadavg()[0]
+        except OSError:
+            pass
+
+    def sample(self):
+        """Take one sample now and append it to the history."""
+        sample = dict.fromkeys(("gpu_load", "gpu_mem_used", "gpu_mem_total", "gpu_mem_unified", "cpu_load", "rss", "load_avg"))
+        sample["time"] = time.time()
+        self._sample_gpu(sample)
+        self._sample_host(sample)
+        with self._lock:
+            self._history.append(sample)
+        return sample
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        if self._thread is None:
+            self._init_gpu()
+            self.sample()   # Primes the CPU counters so the next sample has a load figure
+            self._thread = threading.Thread(target=self._loop, name="telemetry", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+        if self._gpu is not None:
+            try:
+                pynvml.nvmlShutdown()
+            except Exception:
+                pass
+
+    @property
+    def has_gpu(self):
+        return self._gpu is not None
+
+    def latest(self):
+        """Most recent sample, or an empty dict before the first one."""
+        with self._lock:
+            return dict(self._history[-1]) if self._history else {}
+
+    def history(self, key):
+        """Recorded values of one field, oldest first, skipping gaps."""
+        with self._lock:
+            return [s[key] for s in self._history if s.get(key) is not None]
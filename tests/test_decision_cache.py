@@ -0,0 +1,51 @@
+# test_decision_cache.py
+"""DecisionCache: decisions are per mission and dropped once the squad state they were made for moves on."""
+
+import backend
+from backend import DecisionCache, situation_fingerprint
+from roster import Roster
+
+OBSERVATION = "Visual Scan: FLOOD. Coverage: 45.0%. Severity: CRITICAL."
+HOLD = {"reasoning": "test", "action": "hold"}
+
+
+def test_missions_do_not_share_decisions():
+    cache = DecisionCache()
+    roster = Roster.from_dict(backend.SQUADS)
+    cache.put(situation_fingerprint(OBSERVATION, roster, "m1"), "", "{}", HOLD, 1.0)
+    assert cache.get(situation_fingerprint(OBSERVATION, roster, "m1")) is not None
+    assert cache.get(situation_fingerprint(OBSERVATION, roster, "m2")) is None
+
+
+def test_invalidate_drops_only_stale_entries_of_the_mission():
+    cache = DecisionCache()
+    roster = Roster.from_dict(backend.SQUADS)
+    before = {mission: situation_fingerprint(OBSERVATION, roster, mission) for mission in ("m1", "m2")}
+    for fingerprint in before.values():
+        cache.put(fingerprint, "", "{}", HOLD, 1.0)
+
+    assert cache.invalidate("m1", roster) == 0
+    roster.update("Echo", status="Deployed", loc="Sector 4")
+    current = situation_fingerprint(OBSERVATION, roster, "m1")
+    cache.put(current, "", "{}", HOLD, 1.0)
+
+    assert cache.invalidate("m1", roster) == 1
+    assert cache.get(before["m1"]) is None
+    assert cache.get(current) is not None
+    assert cache.get(before["m2"]) is not None
+    assert cache.invalidate() == 2
+
+
+def test_confirmations_leave_the_hit_and_miss_counters_alone(monkeypatch):
+    cache = DecisionCache()
+    monkeypatch.setattr(backend, "decision_cache", cache)
+    monkeypatch.setattr(backend, "_stream_llm", lambda *args: iter(()))   # No answer: counts as failed
+    roster = Roster.from_dict(backend.SQUADS)
+    decision = backend.evaluate_rules(OBSERVATION, roster)
+    confirmer = backend.RuleConfirmer()
+    cache.put(situation_fingerprint(OBSERVATION, roster, "m1"), "", "{}", decision.command, 1.0)
+
+    confirmer._confirm(OBSERVATION, backend.SQUADS, decision, None, "m1")   # Answered from the cache
+    confirmer._confirm(OBSERVATION, backend.SQUADS, decision, None, "m2")   # Not cached
+    assert confirmer.recent[-1]["source"] == "cache" and confirmer.failed == 1
+    assert (cache.hits, cache.misses, cache.expired) == (0, 0, 0)
@@ -0,0 +1,89 @@
+# test_hazard_aggregator.py
+"""HazardAggregator: EMAs, peak and rolling max, severity, trend and the exported state."""
+
+import json
+
+import pytest
+
+from hazard_aggregator import CRITICAL_COVERAGE, EMA_ALPHA, ROLLING_WINDOW, HazardAggregator
+
+
+def frame(coverage, hazard="flood water", masks=3, confidence=0.8):
+    return {"hazard_type": hazard, "coverage_pct": coverage, "mask_count": masks, "hazard_confidence": confidence}
+
+
+def test_empty_aggregate_reports_nothing():
+    agg = HazardAggregator()
+    assert agg.severity is None and agg.observation() is None and agg.dominant_hazard is None
+
+
+def test_ema_starts_at_first_sample_and_moves_by_alpha():
+    agg = HazardAggregator()
+    agg.add(frame(10.0))
+    assert agg.ema_coverage == 10.0
+    agg.add(frame(60.0))
+    assert agg.ema_coverage == pytest.approx(10.0 + EMA_ALPHA * 50.0)
+    for _ in range(200):
+        agg.add(frame(30.0))
+    assert agg.ema_coverage == pytest.approx(30.0, abs=1e-6)
+
+
+def test_peak_and_rolling_max():
+    agg = HazardAggregator()
+    agg.add(frame(80.0))
+    for _ in range(ROLLING_WINDOW):
+        agg.add(frame(5.0))
+    assert agg.peak_coverage == 80.0          # Whole clip
+    assert agg.rolling_max == 5.0             # The spike has left the window
+    agg.add(frame(12.0))
+    assert agg.rolling_max == 12.0
+
+
+def test_single_spike_does_not_make_the_clip_critical():
+    agg = HazardAggregator()
+    for coverage in [5.0] * 20 + [90.0] + [5.0] * 20:
+        agg.add(frame(coverage))
+    assert agg.peak_coverage == 90.0
+    assert agg.severity == "MODERATE"         # Recent spike: worth a look, not critical
+    for _ in range(ROLLING_WINDOW):
+        agg.add(frame(5.0))
+    assert agg.severity == "MINOR"
+
+
+def test_sustained_exposure_makes_the_clip_critical():
+    agg = HazardAggregator()
+    for coverage in [5.0] * 7 + [CRITICAL_COVERAGE + 10] * 3:
+        agg.add(frame(coverage), dt=2.0)
+    assert agg.seconds_above["CRITICAL"] == 6.0 and agg.duration == 20.0
+    assert agg.severity == "CRITICAL"
+
+
+def test_trend_follows_direction():
+    rising = HazardAggregator()
+    for coverage in range(0, 60, 5):
+        rising.add(frame(float(coverage)))
+    falling = HazardAggregator()
+    for coverage in range(60, 0, -5):
+        falling.add(frame(float(coverage)))
+    assert (rising.trend, falling.trend) == ("rising", "falling")
+
+
+def test_observation_leads_with_the_fields_backend_parses():
+    agg = HazardAggregator()
+    agg.add(frame(45.0, hazard="fire"))
+    agg.add(frame(50.0, hazard="smoke"))
+    agg.add(frame(55.0, hazard="fire"))
+    assert agg.dominant_hazard == "FIRE"
+    assert agg.observation().startswith(f"Visual Scan: FIRE. Coverage: {agg.ema_coverage:.1f}%. Severity: CRITICAL.")
+
+
+def test_to_dict_is_a_json_snapshot():
+    agg = HazardAggregator()
+    for coverage in (5.0, 40.0, 25.0):
+        agg.add(frame(coverage))
+    state = agg.to_dict()
+    assert json.loads(json.dumps(state)) == state
+    assert state["frames"] == 3 and state["peak_coverage"] == 40.0
+    assert state["window"] == [[2, 40.0], [3, 25.0]]
+    agg.add(frame(1.0))
+    assert state["frames"] == 3               # A copy, not a live view
@@ -0,0 +1,61 @@
+# test_prefilter.py
+"""Pre-filter skip/keep decisions on synthetic black, blurred and normal frames."""
+
+import cv2
+import numpy as np
+import pytest
+
+from prefilter import check_frame
+
+
+def scene(seed=0, size=(720, 1280)):
+    """Cluttered 720p frame: filled boxes, discs and lines of random colours on a flat ground."""
+    rng = np.random.default_rng(seed)
+    frame = np.full(size + (3,), (90, 110, 100), np.uint8)
+    height, width = size
+    for _ in range(120):
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        shape = rng.integers(0, 3)
+        if shape == 0:
+            cv2.rectangle(frame, (x, y), (x + int(rng.integers(10, 120)), y + int(rng.integers(10, 120))), color, -1)
+        elif shape == 1:
+            cv2.circle(frame, (x, y), int(rng.integers(5, 60)), color, -1)
+        else:
+            cv2.line(frame, (x, y), (int(rng.integers(0, width)), int(rng.integers(0, height))), color, int(rng.integers(1, 5)))
+    return frame
+
+
+def motion_blur(frame, length, angle=0):
+    kernel = np.zeros((length, length), np.float32)
+    kernel[length // 2, :] = 1
+    if angle:
+        center = (length / 2 - 0.5, length / 2 - 0.5)
+        kernel = cv2.warpAffine(kernel, cv2.getRotationMatrix2D(center, angle, 1), (length, length))
+    return cv2.filter2D(frame, -1, kernel / kernel.sum())
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_normal_frames_are_kept(seed):
+    reason, metrics = check_frame(scene(seed))
+    assert reason is None, metrics
+
+
+def test_mild_blur_is_kept():
+    assert check_frame(cv2.GaussianBlur(scene(), (0, 0), 2))[0] is None
+    assert check_frame(motion_blur(scene(), 15))[0] is None
+
+
+def test_black_frame_is_skipped():
+    assert check_frame(np.zeros((720, 1280, 3), np.uint8))[0] == "too dark"
+
+
+@pytest.mark.parametrize("angle", [0, 45, 90])
+@pytest.mark.parametrize("length", [61, 121])
+def test_motion_blur_is_skipped(length, angle):
+    assert check_frame(motion_blur(scene(), length, angle))[0] == "motion blur"
+
+
+@pytest.mark.parametrize("sigma", [10, 20])
+def test_defocus_is_skipped(sigma):
+    assert check_frame(cv2.GaussianBlur(scene(), (0, 0), sigma))[0] == "motion blur"
@@ -0,0 +1,67 @@
+# test_roster.py
+"""Roster: bitmap indexes stay in step with updates, and the roster is smaller than plain dicts."""
+
+import tracemalloc
+
+from roster import Roster
+
+EQUIPMENT = ["Rations", "Medical Kit", "Lifeboat", "Generator"]
+TYPES = ["Ground", "Medical", "Rescue", "Engineering"]
+
+
+def synthetic(count):
+    return {f"Squad-{i:05d}": {"status": "Idle" if i % 3 else "Deployed", "type": TYPES[i % 4],
+                               "loc": "Base" if i % 3 else f"Sector {i % 9}", "capacity": 4 + i % 12,
+                               "equipment": [EQUIPMENT[i % 4], EQUIPMENT[(i * 3) % 4]]}
+            for i in range(count)}
+
+
+def scan(squads, status=None, type=None, loc=None, equipment=None):
+    return {name for name, d in squads.items()
+            if (status is None or d["status"] == status) and (type is None or d["type"] == type)
+            and (loc is None or d["loc"] == loc) and (equipment is None or equipment in d["equipment"])}
+
+
+def test_queries_match_a_scan_after_updates():
+    squads = synthetic(300)
+    roster = Roster.from_dict(squads)
+    for i, name in enumerate(list(squads)[::7]):
+        change = {"status": "Deployed", "loc": f"Sector {i % 5}", "equipment": ["Radio"]}
+        squads[name].update(change)
+        roster.update(name, **change)
+
+    assert roster.to_dict() == squads
+    assert roster.query(status="Idle", type="Medical") == scan(squads, status="Idle", type="Medical")
+    assert roster.query(status="Deployed", loc="Sector 3") == scan(squads, status="Deployed", loc="Sector 3")
+    assert roster.carrying("lifeboat") == scan(squads, equipment="Lifeboat")
+    assert roster.carrying("Radio") == scan(squads, equipment="Radio")
+    assert roster.query(type="Unknown") == set()
+    assert roster.active_count == len(squads) - len(scan(squads, status="Idle"))
+    assert roster["Squad-00007"]["loc"] == squads["Squad-00007"]["loc"]
+
+
+def test_roster_is_smaller_than_plain_dicts():
+    squads = synthetic(5000)
+    tracemalloc.start()
+    plain = {name: dict(data, equipment=list(data["equipment"])) for name, data in squads.items()}
+    plain_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracemalloc.start()
+    roster = Roster.from_dict(squads)
+    roster_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(roster) == len(plain)
+    assert roster_bytes < plain_bytes
+
+
+def test_query_results_are_views_over_the_bitmap():
+    squads = synthetic(300)
+    roster = Roster.from_dict(squads)
+    idle = roster.query(status="Idle")
+    expected = scan(squads, status="Idle")
+    assert sorted(idle) == sorted(expected)   # Iteration crosses 64-row word boundaries
+    assert len(idle) == len(expected) and bool(idle)
+    assert all(name in idle for name in expected) and "nobody" not in idle
+    assert idle & roster.with_type("Medical") == scan(squads, status="Idle", type="Medical")
+    assert idle | {"nobody"} == expected | {"nobody"}
+    assert not roster.query(type="Unknown") and list(roster.query(type="Unknown")) == []
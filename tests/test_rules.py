@@ -0,0 +1,47 @@
+# test_rules.py
+"""Rules engine fast path: severity decides between deploying, holding and escalating."""
+
+import pytest
+
+import backend
+from backend import RULE_TARGET, evaluate_rules
+from roster import Roster
+
+
+def scan(hazard, coverage, severity):
+    return f"Visual Scan: {hazard}. Coverage: {coverage:.1f}%. Severity: {severity}. Active Masks: 3."
+
+
+@pytest.fixture
+def roster():
+    return Roster.from_dict(backend.SQUADS)
+
+
+@pytest.mark.parametrize("severity", ["MODERATE", "CRITICAL"])
+def test_flood_deploys_rescue_when_severe(roster, severity):
+    decision = evaluate_rules(scan("FLOOD", 45.0, severity), roster)
+    assert decision.command == {"reasoning": decision.command["reasoning"], "squad_name": "Echo",
+                                "location": RULE_TARGET, "action": "deploy"}
+
+
+def test_minor_clear_road_holds(roster):
+    decision = evaluate_rules(scan("CLEAR ROAD", 3.0, "MINOR"), roster)
+    assert decision.command["action"] == "hold" and decision.rule == "clear road"
+
+
+@pytest.mark.parametrize("hazard", ["FLOOD", "FIRE", "RUBBLE"])
+def test_minor_hazards_escalate(roster, hazard):
+    decision = evaluate_rules(scan(hazard, 8.0, "MINOR"), roster)
+    assert decision.command is None and "MINOR" in decision.escalate
+
+
+def test_unknown_severity_escalates(roster):
+    decision = evaluate_rules(scan("FLOOD", 45.0, "SEVERE"), roster)
+    assert decision.command is None and "SEVERE" in decision.escalate
+
+
+def test_no_idle_squad_escalates(roster):
+    for name in roster.query(type="Rescue") | roster.query(type="Aerial"):
+        roster.update(name, status="Busy")
+    decision = evaluate_rules(scan("FLOOD", 45.0, "CRITICAL"), roster)
+    assert decision.command is None and decision.rule == "flood"
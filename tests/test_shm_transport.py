@@ -0,0 +1,214 @@
+# test_shm_transport.py
+"""Shared-memory transport: the server's SegmentCache, and a VisionClient recovering a forgotten ring."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from shm_transport import RING_PREFIX, FrameRing, SegmentCache, host_id, input_view, is_ring_name, output_view
+from vision import VisionClient
+
+
+@pytest.fixture
+def rings():
+    created = []
+
+    def make():
+        ring = FrameRing(2, 16)
+        created.append(ring)
+        return ring
+
+    yield make
+    for ring in created:
+        ring.close()
+
+
+def test_ring_names_carry_the_prefix(rings):
+    ring = rings()
+    assert ring.name.startswith(RING_PREFIX) and is_ring_name(ring.name)
+    assert not is_ring_name("psm_1234")
+    assert not is_ring_name(RING_PREFIX)
+    assert not is_ring_name(RING_PREFIX + "../etc")
+
+
+def test_unannounced_or_foreign_segments_are_refused(rings):
+    cache = SegmentCache()
+    ring = rings()
+    with pytest.raises(PermissionError):
+        cache.acquire(ring.name)
+    with pytest.raises(ValueError):
+        cache.announce("psm_foreign")
+    assert len(cache) == 0
+
+
+def test_announced_segment_shares_the_ring(rings):
+    cache = SegmentCache()
+    ring = rings()
+    cache.announce(ring.name)
+    frame = np.full((8, 8, 3), 7, dtype=np.uint8)
+    ring.write_frame(0, frame)
+    segment = cache.acquire(ring.name)
+    try:
+        assert np.array_equal(np.ndarray((8, 8, 3), dtype=np.uint8, buffer=segment.buf), frame)
+    finally:
+        cache.release(ring.name)
+
+
+def test_least_recently_used_segments_are_closed(rings):
+    cache = SegmentCache(max_segments=2)
+    names = [rings().name for _ in range(3)]
+    for name in names:
+        cache.announce(name)
+        cache.acquire(name)
+        cache.release(name)
+    assert len(cache) == 2
+    # Unmapping keeps the announcement, so the evicted ring can be mapped again
+    cache.acquire(names[0])
+    cache.release(names[0])
+    assert len(cache) == 2
+
+
+def test_announcements_are_bounded(rings):
+    cache = SegmentCache(max_segments=1)
+    names = [rings().name for _ in range(5)]
+    for name in names:
+        cache.announce(name)
+    with pytest.raises(PermissionError):
+        cache.acquire(names[0])
+    cache.acquire(names[-1])
+    cache.release(names[-1])
+
+
+def test_segments_in_use_are_never_closed(rings):
+    cache = SegmentCache(max_segments=1, idle_seconds=0.0)
+    first, second = rings().name, rings().name
+    for name in (first, second):
+        cache.announce(name)
+    cache.acquire(first)
+    cache.acquire(second)
+    cache.release(second)
+    assert len(cache) == 1          # second was idle and closed; first is still in use
+    cache.release(first)
+
+
+def test_idle_segments_are_closed(rings):
+    cache = SegmentCache(idle_seconds=0.05)
+    ring = rings()
+    cache.announce(ring.name)
+    cache.acquire(ring.name)
+    cache.release(ring.name)
+    assert len(cache) == 1
+    time.sleep(0.1)
+    cache.close_idle()
+    assert len(cache) == 0
+
+
+def test_idle_segments_stay_announced(rings):
+    cache = SegmentCache(idle_seconds=0.05)
+    ring = rings()
+    cache.announce(ring.name)
+    cache.acquire(ring.name)
+    cache.release(ring.name)
+    time.sleep(0.1)
+    cache.close_idle()
+    assert len(cache) == 0
+    # The next frame after a pause between scans maps the ring again without a new announcement
+    cache.acquire(ring.name)
+    cache.release(ring.name)
+    assert len(cache) == 1
+
+
+class ShmStubServer:
+    """Co-located vision server stand-in: announces, maps and echoes shared-memory frames like vision_server."""
+
+    def __init__(self, idle_seconds=120):
+        self.cache = SegmentCache(idle_seconds=idle_seconds)
+        self.announced = 0
+        self.shm_frames = 0
+        self.http_frames = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, code, body):
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                stub.cache.close_idle()
+                self._send(200, {"status": "online", "sam2_loaded": True, "target_dim": 64,
+                                 "shm_transport": True, "host_id": host_id()})
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path == "/shm_announce":
+                    stub.cache.announce(json.loads(raw)["name"])
+                    stub.announced += 1
+                    self._send(200, {"announced": True})
+                elif self.path == "/analyze_frame_shm":
+                    req = json.loads(raw)
+                    try:
+                        segment = stub.cache.acquire(req["name"])
+                    except PermissionError as e:
+                        self._send(428, {"error": str(e)})
+                        return
+                    try:
+                        frame = input_view(segment.buf, req["slot"], req["dim"], tuple(req["shape"]))
+                        output_view(segment.buf, req["slot"], req["dim"], frame.shape)[...] = frame
+                        frame = None
+                    finally:
+                        stub.cache.release(req["name"])
+                    stub.shm_frames += 1
+                    self._send(200, {"shape": req["shape"], "stats": {"coverage_pct": 1.0}})
+                else:
+                    stub.http_frames += 1
+                    self._send(200, {"image_base64": "", "stats": {"coverage_pct": 1.0}})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def shm_client():
+    server = ShmStubServer(idle_seconds=0.05)
+    client = VisionClient([server.url], transport="auto")
+    client.negotiate()
+    yield server, client
+    client.close()
+    server.close()
+
+
+def test_client_reannounces_a_forgotten_ring(shm_client):
+    server, client = shm_client
+    frame = np.full((48, 64, 3), 128, np.uint8)
+    assert client.process_frame(frame)[1] is not None
+    assert (server.shm_frames, server.announced) == (1, 1)
+
+    # A long pause: the idle sweep unmaps the ring but keeps it announced
+    time.sleep(0.1)
+    client.refresh_health()
+    assert client.process_frame(frame)[1] is not None
+    assert (server.shm_frames, server.announced) == (2, 1)
+
+    # The server forgets every announcement (e.g. restarted): one re-announce, still shared memory
+    server.cache = SegmentCache()
+    assert client.process_frame(frame)[1] is not None
+    assert (server.shm_frames, server.announced, server.http_frames) == (3, 2, 0)
+    assert client.replicas[0].shm
@@ -0,0 +1,71 @@
+# test_squad_store.py
+"""SquadStore under concurrent writers: no lost updates, and one winner per racing deployment."""
+
+import threading
+
+import pytest
+
+from squad_store import SquadStore
+
+SQUADS = {
+    "Alpha": {"status": "Idle", "type": "Ground", "loc": "Base", "deployments": 0},
+    "Echo": {"status": "Idle", "type": "Rescue", "loc": "Base", "deployments": 0},
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SquadStore(str(tmp_path / "squads.db"), defaults=SQUADS)
+    store.ensure_mission("m1")
+    return store
+
+
+def _run(workers):
+    threads = [threading.Thread(target=worker) for worker in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_concurrent_updates_lose_no_writes(store):
+    threads, updates = 8, 50
+    start = threading.Barrier(threads)
+    start_version = store.version("m1")
+
+    def worker():
+        start.wait()
+        for _ in range(updates):
+            store.update("m1", "Alpha", lambda d: dict(d, deployments=d["deployments"] + 1), retries=10_000)
+
+    _run([worker] * threads)
+    data, version = store.get("m1", "Alpha")
+    assert data["deployments"] == threads * updates
+    assert version == 1 + threads * updates
+    assert store.version("m1") == start_version + threads * updates
+
+
+@pytest.mark.parametrize("attempt", range(10))
+def test_exactly_one_racing_deploy_applies(store, attempt):
+    _, version = store.get("m1", "Echo")
+    start = threading.Barrier(2)
+    results = {}
+
+    def racer(location):
+        def run():
+            start.wait()
+            results[location] = store.deploy("m1", "Echo", location, expected_version=version)
+        return run
+
+    _run([racer("Sector 4"), racer("Sector 7")])
+    winners = [loc for loc, (ok, _) in results.items() if ok]
+    assert len(winners) == 1
+    data, new_version = store.get("m1", "Echo")
+    assert (data["status"], data["loc"]) == ("Deployed", winners[0])
+    assert new_version == version + 1
+
+
+def test_snapshot_is_a_private_copy(store):
+    snapshot = store.snapshot("m1")
+    snapshot.squads["Alpha"]["status"] = "Deployed"
+    assert store.get("m1", "Alpha")[0]["status"] == "Idle"
@@ -0,0 +1,185 @@
+# test_vision_client.py
+"""VisionClient replica routing, ejection, hedging and negotiation against local stub servers."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import vision
+from vision import VisionClient
+
+FRAME = b"\xff\xd8stub-jpeg\xff\xd9"
+
+
+class StubServer:
+    """Minimal vision server: /health and /analyze_frame_fast with adjustable delay and failures."""
+
+    def __init__(self, name, delay=0.0):
+        self.name = name
+        self.delay = delay
+        self.fail = False          # Answer every frame with HTTP 500
+        self.slow_next = 0.0       # Extra delay for the next frame only
+        self.healthy = True
+        self.target_dim = 512
+        self.requests = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, code, body):
+                data = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if not stub.healthy:
+                    self._send(503, "starting")
+                    return
+                self._send(200, {"status": "online", "sam2_loaded": True, "target_dim": stub.target_dim})
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stub.lock:
+                    stub.requests += 1
+                    delay, stub.slow_next = stub.delay + stub.slow_next, 0.0
+                time.sleep(delay)
+                if stub.fail:
+                    self._send(500, {"error": "stub failure"})
+                    return
+                self._send(200, {"image_base64": "", "stats": {"server": stub.name, "coverage_pct": 1.0}})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stubs():
+    servers = []
+
+    def make(name, delay=0.0):
+        server = StubServer(name, delay)
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.close()
+
+
+def make_client(servers, **kwargs):
+    client = VisionClient([s.url for s in servers], transport="http", **kwargs)
+    client._last_health = time.monotonic()   # Start with fresh health so probes don't race the test
+    return client
+
+
+def test_concurrent_frames_spread_across_replicas(stubs):
+    a, b = stubs("a", delay=0.05), stubs("b", delay=0.05)
+    client = make_client([a, b], max_in_flight=4)
+    try:
+        results = list(client.stream((i, FRAME) for i in range(16)))
+    finally:
+        client.close()
+    assert [tag for tag, _, _ in results] == list(range(16))
+    assert all(stats and stats["server"] in ("a", "b") for _, _, stats in results)
+    assert a.requests >= 4 and b.requests >= 4
+
+
+def test_unready_replica_is_not_routed(stubs):
+    a, b = stubs("a"), stubs("b")
+    client = make_client([a, b])
+    try:
+        client.replicas[0].ready = False
+        servers = {client.process_frame(FRAME)[1]["server"] for _ in range(5)}
+    finally:
+        client.close()
+    assert servers == {"b"}
+    assert a.requests == 0
+
+
+def test_failing_replica_is_ejected_and_frames_still_succeed(stubs):
+    a, b = stubs("a"), stubs("b")
+    a.fail = True
+    client = make_client([a, b])
+    try:
+        client.replicas[1].outstanding = 1          # Steer the first frames to the failing replica
+        for _ in range(vision.EJECT_AFTER_FAILURES):
+            _, stats = client.process_frame(FRAME)
+            assert stats["server"] == "b"            # Retried on the healthy replica
+        assert client.replicas[0].ejected_until > time.monotonic()
+        client.replicas[1].outstanding = 0
+        before = a.requests
+        for _ in range(5):
+            assert client.process_frame(FRAME)[1]["server"] == "b"
+    finally:
+        client.close()
+    assert a.requests == before
+
+
+def test_slow_replica_is_ejected(stubs):
+    a, b = stubs("a", delay=0.12), stubs("b", delay=0.01)
+    client = make_client([a, b], max_in_flight=2)
+    try:
+        list(client.stream((i, FRAME) for i in range(40)))
+    finally:
+        client.close()
+    assert client.replicas[0].ejected_until > time.monotonic()
+    assert client.replicas[1].ejected_until == 0.0
+
+
+def test_hedge_sends_a_stalled_frame_to_another_replica(stubs, monkeypatch):
+    monkeypatch.setattr(vision, "SLOW_FACTOR", 1000.0)   # Keep both replicas in rotation despite jitter
+    a, b = stubs("a", delay=0.01), stubs("b", delay=0.01)
+    client = make_client([a, b], hedge=True)
+    try:
+        for _ in range(vision.HEDGE_MIN_SAMPLES + 5):
+            client.process_frame(FRAME)
+        assert client.hedge_deadline() is not None
+        # Stall whichever replica routing will pick next; the hedge must answer from the other
+        primary = min(client.replicas, key=lambda r: (r.outstanding, r.median_latency() or 0.0))
+        stalled, other = (a, "b") if primary.url == a.url else (b, "a")
+        stalled.slow_next = 1.0
+        hedged = client.hedged_count
+        start = time.monotonic()
+        _, stats = client.process_frame(FRAME)
+        elapsed = time.monotonic() - start
+    finally:
+        client.close()
+    assert client.hedged_count == hedged + 1
+    assert stats["server"] == other
+    assert elapsed < 0.5
+
+
+def test_negotiation_retries_after_health_was_down(stubs, monkeypatch):
+    monkeypatch.setattr(vision, "HEALTH_INTERVAL", 0.0)
+    a = stubs("a")
+    a.healthy = False
+    a.target_dim = 640
+    client = VisionClient(a.url, transport="http")
+    try:
+        assert client.negotiate() == vision.TARGET_DIM      # Local fallback while /health is down
+        assert not client.replicas[0].negotiated
+        a.healthy = True
+        deadline = time.monotonic() + 2.0
+        while client.target_dim != 640 and time.monotonic() < deadline:
+            client.process_frame(FRAME)                      # Routing schedules the background probe
+            time.sleep(0.02)
+    finally:
+        client.close()
+    assert client.target_dim == 640
+    assert client.replicas[0].negotiated
@@ -0,0 +1,126 @@
+# upload_cache.py
+"""
+Spool uploaded drone clips to disk once, keyed by content hash.
+
+Uploads are hashed and written in fixed-size chunks straight from the
+upload buffer, so no second full in-memory copy of the clip is made, and a
+clip that is scanned again (or re-uploaded) reuses the file already on disk.
+
+This avoids the second copy only: Streamlit's UploadedFile already holds
+the whole clip in memory, so peak memory still grows with clip size. Large
+recordings are allowed by server.maxUploadSize in .streamlit/config.toml.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+CHUNK_SIZE = 8 * 1024 * 1024   # 8 MB
+CACHE_DIR = os.environ.get("AEROGUARD_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "aeroguard_uploads"))
+CACHE_MAX_BYTES = int(os.environ.get("AEROGUARD_UPLOAD_CACHE_BYTES", str(20 * 1024**3)))   # 20 GB
+MAX_TRACKED_UPLOADS = 256      # Upload ids remembered to skip re-hashing
+
+_lock = threading.Lock()
+_paths_by_upload = OrderedDict()   # Streamlit upload id -> spooled path, skips re-hashing on reruns
+
+
+def _chunks(fileobj):
+    """Yield the upload in CHUNK_SIZE pieces without materialising a full copy."""
+    getbuffer = getattr(fileobj, "getbuffer", None)
+    if getbuffer is not None:
+        view = getbuffer()
+        for start in range(0, len(view), CHUNK_SIZE):
+            yield view[start:start + CHUNK_SIZE]
+        return
+    fileobj.seek(0)
+    while True:
+        chunk = fileobj.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def content_hash(fileobj):
+    digest = hashlib.blake2b(digest_size=20)
+    for chunk in _chunks(fileobj):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _evict(keep, in_use=()):
+    """Drop least-recently-used spooled clips until the cache fits its budget, sparing clips in use."""
+    in_use = {os.path.abspath(path) for path in in_use}
+    entries = []
+    pinned = os.path.getsize(keep)
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        if path == keep or name.endswith(".part"):
+            continue
+        stat = os.stat(path)
+        if os.path.abspath(path) in in_use:
+            pinned += stat.st_size
+        else:
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries) + pinned
+    for _, size, path in sorted(entries):
+        if total <= CACHE_MAX_BYTES:
+            break
+        try:
+            os.unlink(path)
+            total -= size
+        except OSError:
+            continue
+        with _lock:
+            for upload_id in [u for u, p in _paths_by_upload.items() if p == path]:
+                del _paths_by_upload[upload_id]
+
+
+def spool_upload(uploaded_file, suffix=None, in_use=()):
+    """
+    Return a local path holding the upload's bytes, writing it only if needed.
+
+    Streams from the upload's own buffer without copying it again; the buffer
+    itself (the whole clip) stays in memory for as long as Streamlit keeps it.
+
+    Args:
+        uploaded_file: Streamlit UploadedFile (or any seekable binary file object)
+        suffix: Extension for the spooled file so decoders can sniff the container;
+                defaults to the upload's own extension (.mp4 if it has none)
+        in_use: Paths open elsewhere (e.g. by running scans) that eviction must not delete
+
+    Returns:
+        str: Path to the spooled clip (owned by the cache; do not delete)
+    """
+    if suffix is None:
+        suffix = os.path.splitext(getattr(uploaded_file, "name", "") or "")[1].lower() or ".mp4"
+    upload_id = getattr(uploaded_file, "file_id", None)
+    with _lock:
+        path = _paths_by_upload.get(upload_id)
+        if path:
+            _paths_by_upload.move_to_end(upload_id)
+    if path and os.path.exists(path):
+        os.utime(path)
+        return path
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, content_hash(uploaded_file) + suffix)
+
+    if os.path.exists(path):
+        os.utime(path)
+    else:
+        tmp_path = f"{path}.{threading.get_ident()}.part"
+        with open(tmp_path, "wb") as f:
+            for chunk in _chunks(uploaded_file):
+                f.write(chunk)
+        os.replace(tmp_path, path)
+        _evict(keep=path, in_use=in_use)
+
+    if upload_id is not None:
+        with _lock:
+            _paths_by_upload[upload_id] = path
+            _paths_by_upload.move_to_end(upload_id)
+            while len(_paths_by_upload) > MAX_TRACKED_UPLOADS:
+                _paths_by_upload.popitem(last=False)
+    return path
@@ -1,64 +1,549 @@
 # vision.py
 
+import os
+import atexit
+import time
 import requests
 import base64
+import threading
+import cv2
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
+from frame_ops import TARGET_DIM, resize_to_long_side
+from shm_transport import FrameRing, host_id, is_loopback
 
 SERVER_URL = "http://localhost:9000"
 
+# Comma-separated list of vision server replicas, e.g.
+# AEROGUARD_VISION_SERVERS="http://gpu-a:9000,http://gpu-b:9000"
+SERVER_URLS = [u.strip() for u in os.environ.get("AEROGUARD_VISION_SERVERS", SERVER_URL).split(",") if u.strip()]
+
+# --- CLIENT TUNING ---
+MAX_IN_FLIGHT = 4          # Frames submitted to the server concurrently
+POOL_SIZE = 8              # Keep-alive connections held per server
+CONNECT_TIMEOUT = 3.05     # Seconds to establish a TCP connection
+READ_TIMEOUT = 30          # Seconds to wait for a heavy frame to be analyzed
+
+# --- UPLOAD ENCODING ---
+CLIENT_RESIZE = True       # Downscale to the server's model resolution before JPEG encoding
+JPEG_QUALITY = int(os.environ.get("AEROGUARD_JPEG_QUALITY", "95"))   # Same as the pre-resize encoder, so the model sees the same quality
+
+# --- TRANSPORT ---
+# "auto" hands raw frames to a co-located server through shared memory and
+# uses HTTP uploads otherwise; "http" always uploads JPEGs.
+TRANSPORT = os.environ.get("AEROGUARD_TRANSPORT", "auto")
+
+# --- REPLICA MANAGEMENT ---
+HEALTH_INTERVAL = 5.0      # Seconds between /health readiness probes
+EJECT_AFTER_FAILURES = 3   # Consecutive failures before a replica is ejected
+EJECT_SECONDS = 15.0       # How long an ejected replica sits out
+SLOW_FACTOR = 3.0          # Eject a replica whose median latency is this many times the fleet's best
+HEDGE_MIN_SAMPLES = 20     # Latency samples required before hedging kicks in
+
+
+def _parse_response(response):
+    """
+    Validate an /analyze_frame_fast response and decode it.
+
+    Returns:
+        tuple: (Annotated Image Bytes or None, Stats Dictionary or None)
+    """
+    # --- IMPROVED: Check for Server Errors ---
+    if response.status_code != 200:
+        try:
+            error_msg = response.json().get('error', response.text)
+        except:
+            error_msg = response.text
+        print(f"❌ SERVER ERROR ({response.status_code}): {error_msg}")
+        return None, None
+
+    data = response.json()
+
+    # --- Frame rejected by the server pre-filter ---
+    if 'skipped' in data:
+        stats = data.get('stats', {})
+        stats['skipped'] = data['skipped']
+        return None, stats
+
+    # --- IMPROVED: Verify Data Integrity ---
+    if 'image_base64' not in data:
+        print(f"❌ INVALID RESPONSE: Missing 'image_base64'. Keys received: {list(data.keys())}")
+        return None, None
+
+    if 'stats' not in data:
+        print(f"❌ INVALID RESPONSE: Missing 'stats'. Keys received: {list(data.keys())}")
+        return None, None
+
+    # Decode
+    try:
+        img_bytes = base64.b64decode(data['image_base64'])
+    except Exception as e:
+        print(f"❌ BASE64 DECODE ERROR: {e}")
+        return None, None
+
+    stats = data['stats']
+
+    return img_bytes, stats
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+class Replica:
+    """Routing state for one vision server endpoint."""
+
+    def __init__(self, url):
+        self.url = url
+        self.outstanding = 0
+        self.ready = True
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.latencies = deque(maxlen=100)
+        self.shm = False    # Server is co-located and accepts shared-memory frames
+        self.negotiated = False   # /health capabilities read since the replica was last seen healthy
+        self.shm_announced = False   # Our ring is registered with the server (/shm_announce)
+
+    def available(self, now):
+        return self.ready and now >= self.ejected_until
+
+    def median_latency(self):
+        return _percentile(self.latencies, 0.5)
+
+
+class VisionClient:
+    """
+    Pooled, keep-alive client for one or more vision server replicas.
+
+    A single requests.Session is shared by a small worker pool so TCP
+    connections are reused across frames, and up to `max_in_flight` frames
+    can be on the wire at once while results are still delivered in order.
+
+    With several replicas each frame goes to the ready replica with the
+    fewest outstanding requests. Replicas that fail repeatedly or run far
+    slower than the rest are ejected for EJECT_SECONDS, and with
+    `hedge=True` a frame still pending after the fleet's p95 latency is
+    re-sent to a second replica, keeping whichever answer arrives first.
+    """
+
+    def __init__(self, servers=None, max_in_flight=MAX_IN_FLIGHT, pool_size=POOL_SIZE,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, hedge=False,
+                 client_resize=CLIENT_RESIZE, jpeg_quality=JPEG_QUALITY, transport=TRANSPORT):
+        if servers is None:
+            servers = SERVER_URLS
+        elif isinstance(servers, str):
+            servers = [servers]
+        self.replicas = [Replica(url.rstrip("/")) for url in servers]
+        self.server_url = self.replicas[0].url
+        self.max_in_flight = max_in_flight
+        self.timeout = (connect_timeout, read_timeout)
+        self.hedge = hedge
+        self.client_resize = client_resize
+        self.jpeg_quality = jpeg_quality
+        self.transport = transport
+        self.target_dim = None   # Negotiated from /health on first frame
+        self._dim_negotiated = False   # False while target_dim is only the local fallback
+        self._ring = None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.replicas),
+                              pool_maxsize=max(pool_size, max_in_flight), max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=200)
+        self._last_health = 0.0
+        self._health_running = False
+        self.hedged_count = 0
+
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="vision-client")
+        # Separate pool for individual HTTP attempts so hedges never starve the pipeline
+        self._attempts = ThreadPoolExecutor(max_workers=max_in_flight * 2, thread_name_prefix="vision-attempt")
+
+    # --- REPLICA HEALTH ---
+    def refresh_health(self):
+        """
+        Probe /health on every replica and update readiness.
+
+        A replica that answers for the first time, or again after being
+        unready or ejected, is re-negotiated from the same response.
+        """
+        for replica in self.replicas:
+            try:
+                data = self.session.get(f"{replica.url}/health", timeout=(CONNECT_TIMEOUT, 2)).json()
+                ready = data.get("status") == "online" and data.get("sam2_loaded", True)
+            except Exception:
+                ready = False
+            if ready and not replica.negotiated:
+                self._apply_health(replica, data)
+            with self._lock:
+                replica.ready = ready
+                if not ready:
+                    replica.negotiated = False
+        with self._lock:
+            self._last_health = time.monotonic()
+            self._health_running = False
+
+    def _apply_health(self, replica, data):
+        """Record a replica's model resolution and whether it can take shared-memory frames."""
+        shm = bool(self.transport != "http" and is_loopback(replica.url)
+                   and data.get("shm_transport", False) and data.get("host_id") == host_id())
+        with self._lock:
+            replica.shm = shm
+            replica.shm_announced = False   # A restarted server has forgotten our ring
+            replica.negotiated = True
+            if data.get("target_dim") and not self._dim_negotiated:
+                self.target_dim = int(data["target_dim"])
+                self._dim_negotiated = True
+
+    def negotiate(self):
+        """
+        Ask the servers which long-side resolution their models run at and
+        whether they share this host (enabling the shared-memory transport).
+
+        Falls back to the locally configured TARGET_DIM and HTTP when a
+        server is unreachable or predates these health fields; unreachable
+        replicas are negotiated later by the background health probe.
+        """
+        for replica in self.replicas:
+            try:
+                data = self.session.get(f"{replica.url}/health", timeout=(CONNECT_TIMEOUT, 2)).json()
+            except Exception:
+                continue
+            self._apply_health(replica, data)
+        with self._lock:
+            if self.target_dim is None:
+                self.target_dim = TARGET_DIM
+            return self.target_dim
+
+    def _downscale(self, frame):
+        """Resize to the server's model resolution using the server's own resize."""
+        if self.target_dim is None:
+            self.negotiate()
+        # Only ever downscale; the server still upsamples small frames itself
+        if self.client_resize and max(frame.shape[:2]) > self.target_dim:
+            frame = resize_to_long_side(frame, self.target_dim)
+        return frame
+
+    def encode_frame(self, frame):
+        """
+        JPEG-encode a decoded BGR frame for upload.
+
+        Frames larger than the server's model resolution are resized first,
+        using the same resize the server applies, so the model input is
+        unchanged while encode time and upload bytes shrink.
+
+        Returns:
+            bytes: JPEG data, or None if encoding failed
+        """
+        frame = self._downscale(frame)
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        return buffer.tobytes() if ok else None
+
+    def _get_ring(self):
+        with self._lock:
+            if self._ring is None:
+                # One slot per possible in-flight attempt, hedges included
+                self._ring = FrameRing(self.max_in_flight * 2, self.target_dim)
+            return self._ring
+
+    def _maybe_refresh_health(self):
+        # A lone replica needs probing only until it has been negotiated
+        if len(self.replicas) == 1 and self.replicas[0].negotiated:
+            return
+        with self._lock:
+            if self._health_running or time.monotonic() - self._last_health < HEALTH_INTERVAL:
+                return
+            self._health_running = True
+        threading.Thread(target=self.refresh_health, daemon=True).start()
+
+    def _acquire_replica(self, exclude=None):
+        """Pick the available replica with the fewest outstanding requests."""
+        self._maybe_refresh_health()
+        now = time.monotonic()
+        with self._lock:
+            candidates = [r for r in self.replicas if r is not exclude and r.available(now)]
+            if not candidates:
+                # Everything is ejected or unready: fall back to whoever is due back soonest
+                candidates = [r for r in self.replicas if r is not exclude]
+                if not candidates:
+                    return None
+                candidates = [min(candidates, key=lambda r: r.ejected_until)]
+            replica = min(candidates, key=lambda r: (r.outstanding, r.median_latency() or 0.0))
+            replica.outstanding += 1
+            return replica
+
+    def _release_replica(self, replica, ok, latency):
+        now = time.monotonic()
+        with self._lock:
+            replica.outstanding -= 1
+            if not ok:
+                replica.failures += 1
+                if replica.failures >= EJECT_AFTER_FAILURES and len(self.replicas) > 1:
+                    print(f"⚠️ EJECTING REPLICA {replica.url} after {replica.failures} failures")
+                    replica.ejected_until = now + EJECT_SECONDS
+                    replica.failures = 0
+                    replica.negotiated = False   # It may come back restarted, elsewhere or without shm
+                return
+
+            replica.failures = 0
+            replica.latencies.append(latency)
+            self._latencies.append(latency)
+
+            # Slow-replica ejection: compare against the fastest healthy peer
+            medians = [r.median_latency() for r in self.replicas if len(r.latencies) >= 5]
+            mine = replica.median_latency()
+            if len(medians) > 1 and len(replica.latencies) >= 5 and mine > SLOW_FACTOR * min(medians):
+                print(f"⚠️ EJECTING SLOW REPLICA {replica.url} (median {mine:.2f}s)")
+                replica.ejected_until = now + EJECT_SECONDS
+                replica.latencies.clear()
+
+    def hedge_deadline(self):
+        """p95 of recent latencies, or None until enough samples exist."""
+        with self._lock:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            return _percentile(self._latencies, 0.95)
+
+    # --- REQUESTS ---
+    def _post_shm(self, replica, frame):
+        """
+        Hand a raw frame to a co-located server through the shared-memory ring.
+
+        Returns:
+            tuple: (Annotated Image Bytes or None, Stats Dictionary or None), or
+                   None when the frame should go over HTTP instead.
+        """
+        ring = self._get_ring()
+        if not ring.fits(frame):
+            return None
+        if not replica.shm_announced and not self._announce_ring(replica, ring):
+            return None
+        slot = ring.acquire(timeout=0.5)
+        if slot is None:
+            return None
+        try:
+            ring.write_frame(slot, frame)
+            response = self.session.post(
+                f"{replica.url}/analyze_frame_shm",
+                json={"name": ring.name, "slot": slot, "dim": ring.dim, "shape": list(frame.shape)},
+                timeout=self.timeout
+            )
+            if response.status_code == 428:
+                # The server no longer knows our ring (restarted, or its announcement list rolled over): announce once more
+                replica.shm_announced = False
+                if not self._announce_ring(replica, ring):
+                    return None
+                response = self.session.post(
+                    f"{replica.url}/analyze_frame_shm",
+                    json={"name": ring.name, "slot": slot, "dim": ring.dim, "shape": list(frame.shape)},
+                    timeout=self.timeout
+                )
+                if response.status_code == 428:
+                    return None
+            if response.status_code == 409:
+                # Server cannot see our segment (not actually co-located): stay on HTTP
+                print(f"⚠️ SHARED MEMORY UNAVAILABLE on {replica.url}, falling back to HTTP")
+                replica.shm = False
+                replica.shm_announced = False
+                return None
+            if response.status_code != 200:
+                return _parse_response(response)
+
+            data = response.json()
+            if 'skipped' in data:
+                stats = data.get('stats', {})
+                stats['skipped'] = data['skipped']
+                return None, stats
+
+            # Encode straight from the slot; the slot is reused once released
+            ok, buffer = cv2.imencode('.jpg', ring.read_result(slot, data['shape']),
+                                      [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok:
+                print("❌ ENCODE ERROR: Could not encode shared-memory result")
+                return None, None
+            return buffer.tobytes(), data['stats']
+        finally:
+            ring.release(slot)
+
+    def _announce_ring(self, replica, ring):
+        """Register our ring with a co-located server; the server only maps announced segments."""
+        try:
+            response = self.session.post(f"{replica.url}/shm_announce", json={"name": ring.name}, timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            return False
+        if response.status_code != 200:
+            print(f"⚠️ SHARED MEMORY REFUSED by {replica.url} ({response.status_code}), falling back to HTTP")
+            replica.shm = False
+            return False
+        replica.shm_announced = True
+        return True
+
+    def _attempt(self, replica, frame):
+        """
+        One attempt against one replica.
+
+        Args:
+            frame: JPEG bytes, or a downscaled BGR array (sent through shared
+                   memory when the replica is co-located, JPEG-encoded otherwise)
+
+        Returns:
+            tuple: (Annotated Image Bytes or None, Stats Dictionary or None, ok: bool)
+        """
+        start = time.monotonic()
+        ok = False
+        try:
+            if not isinstance(frame, (bytes, bytearray)):
+                if replica.shm:
+                    result = self._post_shm(replica, frame)
+                    if result is not None:
+                        img_bytes, stats = result
+                        ok = stats is not None
+                        return img_bytes, stats, ok
+                ok_enc, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                if not ok_enc:
+                    print("❌ ENCODE ERROR: Could not JPEG-encode frame")
+                    return None, None, False
+                frame = buffer.tobytes()
+
+            files = {"file": frame}
+            response = self.session.post(f"{replica.url}/analyze_frame_fast", files=files, timeout=self.timeout)
+            img_bytes, stats = _parse_response(response)
+            ok = stats is not None
+            return img_bytes, stats, ok
+
+        except requests.exceptions.Timeout:
+            print(f"⚠️ TIMEOUT: Server took longer than {self.timeout[1]} seconds to respond")
+            return None, None, False
+        except requests.exceptions.ConnectionError as e:
+            print(f"⚠️ CONNECTION ERROR: Cannot reach server at {replica.url}. Is it running?")
+            return None, None, False
+        except Exception as e:
+            print(f"⚠️ UNEXPECTED ERROR: {e}")
+            return None, None, False
+        finally:
+            self._release_replica(replica, ok, time.monotonic() - start)
+
+    def process_frame(self, frame):
+        """
+        Sends a single frame to the server and waits for the result.
+
+        Args:
+            frame: Raw image bytes, or a decoded BGR numpy array (preferred:
+                   it is downscaled before upload and can use shared memory)
+
+        Returns:
+            tuple: (Annotated Image Bytes or None, Stats Dictionary or None)
+        """
+        if not isinstance(frame, (bytes, bytearray)):
+            frame = self._downscale(frame)
+
+        primary = self._acquire_replica()
+        deadline = self.hedge_deadline() if self.hedge and len(self.replicas) > 1 else None
+
+        if deadline is None:
+            img_bytes, stats, ok = self._attempt(primary, frame)
+            if not ok and len(self.replicas) > 1:
+                # One retry on a different replica before giving up on the frame
+                secondary = self._acquire_replica(exclude=primary)
+                if secondary is not None:
+                    img_bytes, stats, _ = self._attempt(secondary, frame)
+            return img_bytes, stats
+
+        attempts = [self._attempts.submit(self._attempt, primary, frame)]
+        done, _ = wait(attempts, timeout=deadline)
+        if not done:
+            secondary = self._acquire_replica(exclude=primary)
+            if secondary is not None:
+                with self._lock:
+                    self.hedged_count += 1
+                attempts.append(self._attempts.submit(self._attempt, secondary, frame))
+
+        # First successful answer wins; fall back to whatever failed last
+        pending = set(attempts)
+        result = (None, None)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                img_bytes, stats, ok = future.result()
+                if ok:
+                    return img_bytes, stats
+                result = (img_bytes, stats)
+        return result
+
+    def submit(self, frame):
+        """Queue a frame (bytes or BGR array) for analysis; returns a Future resolving to (image, stats)."""
+        return self._executor.submit(self.process_frame, frame)
+
+    def stream(self, frames, on_result=None):
+        """
+        Pipeline frames through the server with up to `max_in_flight` outstanding.
+
+        Args:
+            frames: Iterable of (tag, frame) where frame is JPEG bytes or a BGR
+                    array; the tag is passed back untouched
+            on_result: Optional callback(tag, image_bytes, stats) invoked per result
+
+        Yields:
+            tuple: (tag, Annotated Image Bytes or None, Stats Dictionary or None)
+                   in the same order the frames were produced.
+        """
+        pending = deque()
+        for tag, frame in frames:
+            pending.append((tag, self.submit(frame)))
+            # Only block once the pipeline is full
+            while len(pending) >= self.max_in_flight or (pending and pending[0][1].done()):
+                tag_done, future = pending.popleft()
+                img_bytes, stats = future.result()
+                if on_result:
+                    on_result(tag_done, img_bytes, stats)
+                yield tag_done, img_bytes, stats
+
+        while pending:
+            tag_done, future = pending.popleft()
+            img_bytes, stats = future.result()
+            if on_result:
+                on_result(tag_done, img_bytes, stats)
+            yield tag_done, img_bytes, stats
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._attempts.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+        if self._ring is not None:
+            self._ring.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_client():
+    """Return the process-wide VisionClient, creating it on first use."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = VisionClient()
+            atexit.register(_default_client.close)
+        return _default_client
+
+
 def process_frame_realtime(frame_bytes):
     """
     Sends a single raw frame bytes to the server.
-    
+
     Args:
         frame_bytes: Raw image bytes
-    
+
     Returns:
         tuple: (Annotated Image Bytes or None, Stats Dictionary or None)
-        
+
     Error cases return (None, None) which the caller must handle.
+    Frames rejected by the server pre-filter return (None, stats) where
+    stats["skipped"] holds the reason.
     """
-    files = {"file": frame_bytes}
-    try:
-        # Increase timeout slightly for heavy frames
-        response = requests.post(f"{SERVER_URL}/analyze_frame_fast", files=files, timeout=30)
-        
-        # --- IMPROVED: Check for Server Errors ---
-        if response.status_code != 200:
-            try:
-                error_msg = response.json().get('error', response.text)
-            except:
-                error_msg = response.text
-            print(f"❌ SERVER ERROR ({response.status_code}): {error_msg}")
-            return None, None
-
-        data = response.json()
-        
-        # --- IMPROVED: Verify Data Integrity ---
-        if 'image_base64' not in data:
-            print(f"❌ INVALID RESPONSE: Missing 'image_base64'. Keys received: {list(data.keys())}")
-            return None, None
-        
-        if 'stats' not in data:
-            print(f"❌ INVALID RESPONSE: Missing 'stats'. Keys received: {list(data.keys())}")
-            return None, None
-            
-        # Decode
-        try:
-            img_bytes = base64.b64decode(data['image_base64'])
-        except Exception as e:
-            print(f"❌ BASE64 DECODE ERROR: {e}")
-            return None, None
-            
-        stats = data['stats']
-        
-        return img_bytes, stats
-        
-    except requests.exceptions.Timeout:
-        print(f"⚠️ TIMEOUT: Server took longer than 30 seconds to respond")
-        return None, None
-    except requests.exceptions.ConnectionError as e:
-        print(f"⚠️ CONNECTION ERROR: Cannot reach server at {SERVER_URL}. Is it running?")
-        return None, None
-    except Exception as e:
-        print(f"⚠️ UNEXPECTED ERROR: {e}")
-        return None, None
\ No newline at end of file
+    return get_client().process_frame(frame_bytes)
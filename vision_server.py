@@ -1,6 +1,8 @@
 # vision_server.py
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, Request
 from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import List
 import uvicorn
 import os
 import torch
@@ -10,6 +12,9 @@ from PIL import Image
 from transformers import CLIPProcessor, CLIPModel
 import base64
 import logging
+from frame_ops import TARGET_DIM, resize_to_long_side
+from prefilter import PREFILTER_ENABLED, PREFILTER_THRESHOLDS, SkipCounter, check_frame
+from shm_transport import SegmentCache, host_id, input_view, is_loopback_host, output_view
 
 # --- SILENCE LOGS ---
 torch._logging.set_logs(dynamo=logging.ERROR, inductor=logging.ERROR)
@@ -86,6 +91,9 @@ HAZARD_LABELS = [
     "collapsed building rubble", "military vehicles", "dense forest"
 ]
 
+prefilter_counter = SkipCounter()
+shm_segments = SegmentCache()
+
 def mat_to_base64(mat):
     """Convert OpenCV image matrix to base64 string"""
     _, buffer = cv2.imencode('.jpg', mat)
@@ -106,6 +114,97 @@ def apply_masks_to_frame(frame, masks):
     
     return overlay
 
+def analyze_decoded_frame(frame):
+    """
+    Run the pre-filter, CLIP and SAM 2 on an already-decoded BGR frame.
+
+    Shared by the HTTP upload endpoint and the shared-memory endpoint.
+
+    Returns:
+        tuple: (annotated frame or None, response body dict, HTTP status code)
+               The body holds either "stats", "skipped" + "stats", or "error".
+    """
+    # PRE-FILTER (skip frames not worth a SAM 2 + CLIP pass)
+    if PREFILTER_ENABLED:
+        skip_reason, quality = check_frame(frame)
+        prefilter_counter.record(skip_reason)
+        if skip_reason:
+            return None, {
+                "skipped": skip_reason,
+                "stats": {"quality": quality}
+            }, 200
+
+    # RESIZE (512p for faster processing; a no-op when the client already downscaled)
+    frame_resized = resize_to_long_side(frame, TARGET_DIM)
+
+    frame_rgb = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB)
+    pil_image = Image.fromarray(frame_rgb)
+
+    # INFERENCE
+    with torch.inference_mode(), torch.autocast("cuda", dtype=torch.bfloat16):
+        # CLIP - Hazard Classification
+        try:
+            inputs = clip_processor(
+                text=HAZARD_LABELS, 
+                images=pil_image, 
+                return_tensors="pt", 
+                padding=True
+            ).to(DEVICE)
+            outputs = clip_model(**inputs)
+            probs = outputs.logits_per_image.softmax(dim=1)
+            best_idx = probs.argmax().item()
+            detected_hazard = HAZARD_LABELS[best_idx]
+            confidence = probs[0][best_idx].item()
+        except Exception as clip_error:
+            print(f"CLIP Error: {clip_error}")
+            return None, {
+                "error": f"CLIP classification failed: {str(clip_error)}"
+            }, 500
+
+        # SAM 2 - Segmentation with error handling
+        try:
+            masks = mask_generator.generate(frame_rgb)
+        except torch.cuda.OutOfMemoryError:
+            print("SAM2 OOM Error: GPU memory exhausted")
+            return None, {
+                "error": "GPU out of memory during segmentation. Try smaller image or restart server."
+            }, 500
+        except Exception as sam_error:
+            print(f"SAM2 Generation Error: {sam_error}")
+            return None, {
+                "error": f"SAM2 mask generation failed: {str(sam_error)}"
+            }, 500
+
+    # --- IMPROVED MASK AREA CALCULATION ---
+    # Calculate true coverage by combining overlapping masks
+    total_area = frame_resized.shape[0] * frame_resized.shape[1]
+
+    if len(masks) > 0:
+        # Stack all boolean masks into a 3D array [num_masks, height, width]
+        all_masks = np.stack([m['segmentation'] for m in masks], axis=0)
+        # Logical OR across mask dimension: pixel is True if ANY mask covers it
+        union_mask = np.any(all_masks, axis=0)
+        # Sum unique covered pixels
+        covered_area = np.sum(union_mask)
+    else:
+        covered_area = 0
+
+    coverage_ratio = round((covered_area / total_area) * 100, 1)
+
+    # Apply visual annotations
+    annotated_frame = apply_masks_to_frame(frame_resized, masks)
+
+
+    return annotated_frame, {
+        "stats": {
+            "hazard_type": detected_hazard,
+            "hazard_confidence": round(confidence, 2),
+            "coverage_pct": coverage_ratio,
+            "mask_count": len(masks),
+            "survivors": "N/A"  # Placeholder for future person detection
+        }
+    }, 200
+
 @app.post("/analyze_frame_fast")
 async def analyze_frame_fast(file: UploadFile = File(...)):
     """
@@ -114,6 +213,11 @@ async def analyze_frame_fast(file: UploadFile = File(...)):
     Returns JSON with:
     - image_base64: Annotated image with colored masks
     - stats: Dictionary containing hazard info and coverage metrics
+
+    Unusable frames (black, blown out, blurred) are rejected by the pre-filter
+    before any model runs and return only:
+    - skipped: Reason the frame was rejected
+    - stats: Dictionary containing the frame quality metrics
     """
     if not SAM2_AVAILABLE or mask_generator is None:
         return JSONResponse({
@@ -131,79 +235,13 @@ async def analyze_frame_fast(file: UploadFile = File(...)):
                 "error": "Failed to decode image. Invalid format or corrupted data."
             }, status_code=400)
 
-        # RESIZE (512p for faster processing)
-        height, width = frame.shape[:2]
-        target_dim = 512
-        scale = target_dim / max(height, width)
-        new_size = (int(width * scale), int(height * scale))
-        frame_resized = cv2.resize(frame, new_size)
-        
-        frame_rgb = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB)
-        pil_image = Image.fromarray(frame_rgb)
-
-        # INFERENCE
-        with torch.inference_mode(), torch.autocast("cuda", dtype=torch.bfloat16):
-            # CLIP - Hazard Classification
-            try:
-                inputs = clip_processor(
-                    text=HAZARD_LABELS, 
-                    images=pil_image, 
-                    return_tensors="pt", 
-                    padding=True
-                ).to(DEVICE)
-                outputs = clip_model(**inputs)
-                probs = outputs.logits_per_image.softmax(dim=1)
-                best_idx = probs.argmax().item()
-                detected_hazard = HAZARD_LABELS[best_idx]
-                confidence = probs[0][best_idx].item()
-            except Exception as clip_error:
-                print(f"CLIP Error: {clip_error}")
-                return JSONResponse({
-                    "error": f"CLIP classification failed: {str(clip_error)}"
-                }, status_code=500)
-
-            # SAM 2 - Segmentation with error handling
-            try:
-                masks = mask_generator.generate(frame_rgb)
-            except torch.cuda.OutOfMemoryError:
-                print("SAM2 OOM Error: GPU memory exhausted")
-                return JSONResponse({
-                    "error": "GPU out of memory during segmentation. Try smaller image or restart server."
-                }, status_code=500)
-            except Exception as sam_error:
-                print(f"SAM2 Generation Error: {sam_error}")
-                return JSONResponse({
-                    "error": f"SAM2 mask generation failed: {str(sam_error)}"
-                }, status_code=500)
-
-        # --- IMPROVED MASK AREA CALCULATION ---
-        # Calculate true coverage by combining overlapping masks
-        total_area = frame_resized.shape[0] * frame_resized.shape[1]
-        
-        if len(masks) > 0:
-            # Stack all boolean masks into a 3D array [num_masks, height, width]
-            all_masks = np.stack([m['segmentation'] for m in masks], axis=0)
-            # Logical OR across mask dimension: pixel is True if ANY mask covers it
-            union_mask = np.any(all_masks, axis=0)
-            # Sum unique covered pixels
-            covered_area = np.sum(union_mask)
-        else:
-            covered_area = 0
-            
-        coverage_ratio = round((covered_area / total_area) * 100, 1)
-
-        # Apply visual annotations
-        annotated_frame = apply_masks_to_frame(frame_resized, masks)
+        annotated_frame, body, status_code = analyze_decoded_frame(frame)
+        if annotated_frame is None:
+            return JSONResponse(body, status_code=status_code)
         
         return JSONResponse({
             "image_base64": mat_to_base64(annotated_frame),
-            "stats": {
-                "hazard_type": detected_hazard,
-                "hazard_confidence": round(confidence, 2),
-                "coverage_pct": coverage_ratio,
-                "mask_count": len(masks),
-                "survivors": "N/A"  # Placeholder for future person detection
-            }
+            "stats": body["stats"]
         })
         
     except Exception as e:
@@ -214,14 +252,115 @@ async def analyze_frame_fast(file: UploadFile = File(...)):
             "error": f"Unexpected server error: {str(e)}"
         }, status_code=500)
 
+class ShmAnnounceRequest(BaseModel):
+    name: str          # Shared-memory segment created by the client
+
+class ShmFrameRequest(BaseModel):
+    name: str          # Shared-memory segment created by the client
+    slot: int          # Ring slot holding the frame
+    dim: int           # Slot dimension the ring was sized for
+    shape: List[int]   # [height, width, 3] of the frame in the slot
+
+def _is_local_client(request):
+    return request.client is not None and is_loopback_host(request.client.host)
+
+@app.post("/shm_announce")
+async def shm_announce(req: ShmAnnounceRequest, request: Request):
+    """
+    Register a client's frame ring before its first shared-memory frame.
+
+    Only loopback clients may announce, and only segments named like a
+    FrameRing; /analyze_frame_shm refuses anything not announced.
+    """
+    if not _is_local_client(request):
+        return JSONResponse({"error": "Shared memory is only offered to local clients"}, status_code=403)
+    try:
+        shm_segments.announce(req.name)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return {"announced": req.name}
+
+@app.post("/analyze_frame_shm")
+async def analyze_frame_shm(req: ShmFrameRequest, request: Request):
+    """
+    Analyze a raw BGR frame that a co-located client placed in shared memory.
+
+    The frame is read in place from the client's ring slot and the annotated
+    frame is written back into the same slot, so no image data crosses HTTP.
+
+    Returns JSON with:
+    - shape: [height, width, 3] of the annotated frame in the slot
+    - stats: Dictionary containing hazard info and coverage metrics
+    (or skipped / error exactly as /analyze_frame_fast)
+
+    A 428 response means the segment has not been announced (again) via
+    /shm_announce. A 409 response means shared memory cannot work for this
+    client (not local, or the segment is not visible here) and the client
+    should fall back to /analyze_frame_fast.
+    """
+    if not _is_local_client(request):
+        return JSONResponse({"error": "Shared memory is only offered to local clients"}, status_code=409)
+
+    if not SAM2_AVAILABLE or mask_generator is None:
+        return JSONResponse({
+            "error": "SAM 2 not loaded. Check server logs for details."
+        }, status_code=500)
+
+    try:
+        segment = shm_segments.acquire(req.name)
+    except PermissionError as e:
+        return JSONResponse({"error": str(e)}, status_code=428)
+    except Exception as e:
+        return JSONResponse({
+            "error": f"Shared memory unavailable: {str(e)}"
+        }, status_code=409)
+
+    try:
+        frame = input_view(segment.buf, req.slot, req.dim, tuple(req.shape))
+        annotated_frame, body, status_code = analyze_decoded_frame(frame)
+        if annotated_frame is None:
+            return JSONResponse(body, status_code=status_code)
+
+        if max(annotated_frame.shape[:2]) > req.dim:
+            return JSONResponse({
+                "error": f"Annotated frame {annotated_frame.shape} does not fit slot dim {req.dim}"
+            }, status_code=409)
+
+        output_view(segment.buf, req.slot, req.dim, annotated_frame.shape)[...] = annotated_frame
+        return JSONResponse({
+            "shape": list(annotated_frame.shape),
+            "stats": body["stats"]
+        })
+
+    except Exception as e:
+        print(f"Unexpected error processing shared-memory frame: {e}")
+        import traceback
+        traceback.print_exc()
+        return JSONResponse({
+            "error": f"Unexpected server error: {str(e)}"
+        }, status_code=500)
+    finally:
+        # Drop our views of the segment so it can be closed once idle
+        frame = annotated_frame = None
+        shm_segments.release(req.name)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring"""
+    shm_segments.close_idle()   # Clients poll this regularly, so idle rings get unmapped
     return {
         "status": "online",
         "device": DEVICE,
         "sam2_loaded": mask_generator is not None,
-        "clip_loaded": clip_model is not None
+        "clip_loaded": clip_model is not None,
+        "target_dim": TARGET_DIM,
+        "shm_transport": True,
+        "host_id": host_id(),
+        "prefilter": {
+            "enabled": PREFILTER_ENABLED,
+            "thresholds": PREFILTER_THRESHOLDS,
+            **prefilter_counter.snapshot()
+        }
     }
 
 if __name__ == "__main__":